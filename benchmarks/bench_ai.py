@@ -0,0 +1,73 @@
+"""Benchmark placement search and lookahead search decisions per second
+on boards of placement agent games. Lookahead is measured with empty
+transposition table and in the game of agent, that replans with the
+same table every time gravity moves figure
+
+Usage: python benchmarks/bench_ai.py
+"""
+import sys
+import copy
+import pathlib
+import timeit
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from ai import (
+    PlacementAgent,
+    TranspositionTable,
+    best_placement,
+    lookahead_placement,
+    get_state_tables,
+        )
+from blocks import Grid, BitGrid
+from engine import Engine
+
+
+def boards(grid_class: type[Grid], games: int = 4, every: int = 300) -> list[Engine]:
+    """Get engines at every n-th tick of placement agent games
+    """
+    engines = []
+    for seed in range(games):
+        engine = Engine(grid_class, seed)
+        agent = PlacementAgent()
+        tick = 0
+        while not engine.is_game_over:
+            engine.step(agent(engine))
+            tick += 1
+            if tick % every == 0:
+                engines.append(copy.deepcopy(engine))
+    return engines
+
+
+if __name__ == '__main__':
+    get_state_tables(Grid.cells)
+    for grid_class in [Grid, BitGrid]:
+        engines = boards(grid_class)
+        seconds = min(timeit.repeat(
+            lambda: [best_placement(engine) for engine in engines],
+            number=5,
+            repeat=3,
+                ))
+        decisions = len(engines) * 5
+        print(
+            f'{grid_class.__name__:8} {len(engines)} boards, '
+            f'{decisions / seconds:7.0f} decisions/s'
+                )
+
+    engines = boards(BitGrid)
+    seconds = min(timeit.repeat(
+        lambda: [lookahead_placement(engine, TranspositionTable()) for engine in engines],
+        number=1,
+        repeat=3,
+            ))
+    print(f'lookahead, empty table  {len(engines) / seconds:7.0f} decisions/s')
+    agent = PlacementAgent(lookahead=True)
+    engine = Engine(BitGrid, 0)
+    start = timeit.default_timer()
+    while not engine.is_game_over:
+        engine.step(agent(engine))
+    seconds = timeit.default_timer() - start
+    table = agent.table
+    print(
+        f'lookahead agent game     {table.hits + table.misses} table lookups, '
+        f'{table.hits / (table.hits + table.misses):.0%} hits, {seconds:.1f} s'
+            )
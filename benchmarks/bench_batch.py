@@ -0,0 +1,74 @@
+"""Benchmark one BatchEngine step over N boards against steps of N
+independent Grid engines with the same seeded random actions
+
+Usage: python benchmarks/bench_batch.py
+"""
+import sys
+import random
+import pathlib
+import timeit
+from functools import partial
+from typing import Optional
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from batch import BatchEngine
+from blocks import Grid
+from engine import Engine
+from constraints import Action
+
+
+GAMES = 64
+TICKS = 200
+
+
+def make_actions(seed: int = 1) -> list[list[Optional[Action]]]:
+    """Make seeded random actions of every game per tick
+    """
+    rnd = random.Random(seed)
+    actions = [None] * 3 + list(Action)
+    return [[rnd.choice(actions) for _ in range(GAMES)] for _ in range(TICKS)]
+
+
+def play_batch(cells: int, ticks: list[list[Optional[Action]]]) -> float:
+    """Get seconds of batch steps over fresh games
+    """
+    batch = BatchEngine(GAMES, 0, cells)
+    start = timeit.default_timer()
+    for actions in ticks:
+        batch.step(actions)
+    return timeit.default_timer() - start
+
+
+def play_engines(cells: int, ticks: list[list[Optional[Action]]]) -> float:
+    """Get seconds of steps of independent fresh games
+    """
+    engines = [Engine(partial(Grid, cells=cells), i) for i in range(GAMES)]
+    start = timeit.default_timer()
+    for actions in ticks:
+        for engine, action in zip(engines, actions):
+            if not engine.is_game_over:
+                engine.step(action)
+    return timeit.default_timer() - start
+
+
+def bench(cells: int, repeat: int = 7) -> tuple[float, float]:
+    """Get best times of game tick of batch and of engines in microseconds.
+    Batch and engines are played by turns, so noise of shared machine
+    affects both
+    """
+    ticks = make_actions()
+    batch_times, engines_times = [], []
+    for _ in range(repeat):
+        batch_times.append(play_batch(cells, ticks))
+        engines_times.append(play_engines(cells, ticks))
+    return min(batch_times) / TICKS / GAMES * 1e6, min(engines_times) / TICKS / GAMES * 1e6
+
+
+if __name__ == '__main__':
+    for cells in [34, 128]:
+        batch_time, engines_time = bench(cells)
+        print(
+            f'{cells:3} cells, {GAMES} games: batch step {batch_time:.1f} us, '
+            f'engines {engines_time:.1f} us per game tick, '
+            f'ratio {batch_time / engines_time:.2f}'
+                )
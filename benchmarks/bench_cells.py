@@ -0,0 +1,83 @@
+"""Benchmark per-grid memory and per-frame cell attribute access
+of slotted cells against cells with instance dict
+
+Usage: python benchmarks/bench_cells.py
+"""
+import sys
+import pathlib
+import timeit
+import tracemalloc
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from blocks import Grid, BitGrid
+from constraints import CellState
+
+
+class DictCell:
+    """Cell with instance dict and enum equality, like before slots
+    """
+
+    def __init__(self, x: int, y: int, grid: Grid) -> None:
+        self.x = x
+        self.y = y
+        self.state = CellState.CLEAR
+        self.grid = grid
+        self._pos = (x, y)
+
+    @property
+    def pos(self) -> tuple[int, int]:
+        return self._pos
+
+    @property
+    def is_frozen(self) -> bool:
+        return self.state == CellState.FR0ZEN
+
+    @property
+    def is_blocked(self) -> bool:
+        return self.state == CellState.BLOCK
+
+
+class DictGrid(Grid):
+    """Grid of dict cells
+    """
+
+    def _make_grid(self) -> list[list[DictCell]]:
+        return [
+            [DictCell(x, y, self) for y in range(self.cells)]
+            for x in range(self.cells)
+                ]
+
+
+def grid_memory(grid_class: type[Grid], grids: int = 20) -> float:
+    """Get allocated memory per grid in KiB
+    """
+    tracemalloc.start()
+    keep = [grid_class() for _ in range(grids)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return size / grids / 1024
+
+
+def frame_access(grid_class: type[Grid], number: int = 200) -> float:
+    """Get time of one draw-like pass over all cells in microseconds
+    """
+    grid = grid_class()
+
+    def frame() -> None:
+        for row in grid.grid:
+            for cell in row:
+                cell.pos
+                cell.is_blocked
+                cell.is_frozen
+
+    seconds = min(timeit.repeat(frame, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+if __name__ == '__main__':
+    for grid_class in [DictGrid, Grid, BitGrid]:
+        print(
+            f'{grid_class.__name__:8} memory per grid: {grid_memory(grid_class):7.1f} KiB, '
+            f'frame access: {frame_access(grid_class):7.1f} us'
+                )
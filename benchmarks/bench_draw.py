@@ -0,0 +1,61 @@
+"""Benchmark frame draw time with static UI redrawn every frame
+against static UI baked once in image bank. Runs headless
+with SDL dummy drivers
+
+Usage: python benchmarks/bench_draw.py
+"""
+import os
+import sys
+import pathlib
+import timeit
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+KEKTRIS = pathlib.Path(__file__).parents[1] / 'src' / 'kektris'
+sys.path.insert(0, str(KEKTRIS))
+os.chdir(KEKTRIS)
+
+import pyxel
+import render
+from kektris import Game
+
+
+def redraw(game: Game) -> None:
+    """Draw frame with static UI redrawn every frame, like before baking
+    """
+    pyxel.cls(0)
+    render.draw_controls(pyxel)
+    game.draw_toggles()
+    render.draw_aside_labels(pyxel)
+    game.draw_aside()
+    render.draw_grid(pyxel, game.grid_higlight)
+    game.mark_grid()
+    game.draw_cells()
+
+
+def make_game() -> Game:
+    """Make game without running pyxel loop
+    """
+    run, pyxel.run = pyxel.run, lambda *args: None
+    try:
+        return Game()
+    finally:
+        pyxel.run = run
+
+
+def frame_time(draw, number: int = 500) -> float:
+    """Get time of one frame draw in microseconds
+    """
+    seconds = min(timeit.repeat(draw, number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+if __name__ == '__main__':
+    game = make_game()
+    for grid_higlight in [False, True]:
+        game.grid_higlight = grid_higlight
+        redrawn = frame_time(lambda: redraw(game))
+        baked = frame_time(game.draw)
+        print(
+            f'grid highlight: {grid_higlight!s:5}, frame draw redrawn: {redrawn:7.1f} us, '
+            f'baked: {baked:7.1f} us'
+                )
@@ -0,0 +1,98 @@
+"""Benchmark line detection on dense boards: grid line search with
+frozen runs ranges against bitmask runs
+
+Usage: python benchmarks/bench_lines.py
+"""
+import sys
+import random
+import pathlib
+import timeit
+from typing import Optional
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from blocks import Grid
+
+
+class RangesGrid(Grid):
+    """Grid, that gets line to clear from frozen runs ranges,
+    like before bitmask runs
+    """
+
+    def frozen_runs(self, dimension: int, n: int) -> list[tuple[int, int]]:
+        """Get sorted runs of frozen cells of line with pos[dimension] == n
+        as (start, stop) ranges
+        """
+        mask = self.frozen_lines[dimension][n]
+        runs = []
+        k = 0
+        while mask:
+            if mask & 1:
+                start = k
+                while mask & 1:
+                    mask >>= 1
+                    k += 1
+                runs.append((start, k))
+            else:
+                mask >>= 1
+                k += 1
+        return runs
+
+    def get_line_to_clear(
+        self,
+        dimension: int,
+        n: int,
+        line_lenght: int,
+            ) -> Optional[list[tuple[int, int]]]:
+        to_clear = [
+            k for start, stop in self.frozen_runs(dimension, n)
+            if stop - start >= line_lenght
+            for k in range(start, stop)
+                ]
+        if to_clear:
+            if dimension:
+                return [(k, n) for k in to_clear]
+            return [(n, k) for k in to_clear]
+
+
+def dense_board(seed: int, fill: float) -> list[tuple[int, int]]:
+    """Get random frozen positions without runs of 10 cells,
+    so the search goes over all lines
+    """
+    rnd = random.Random(seed)
+    return [
+        (x, y)
+        for x in range(Grid.cells)
+        for y in range(Grid.cells)
+        if rnd.random() < fill and x % 9 != 8 and y % 9 != 8
+            ]
+
+
+def bench_lines(grid_class: type[Grid], boards: list, number: int = 20) -> float:
+    """Get mean time of line search over all lines per board in microseconds
+    """
+    grids = []
+    for frozen_pos in boards:
+        grid = grid_class()
+        for x, y in frozen_pos:
+            grid.grid[x][y].freeze()
+        grids.append(grid)
+
+    def search() -> None:
+        for grid in grids:
+            for dim in [0, 1]:
+                for n in range(grid.cells):
+                    grid.get_line_to_clear(dim, n, 10)
+
+    seconds = min(timeit.repeat(search, number=number, repeat=5))
+    return seconds / number / len(grids) * 1e6
+
+
+if __name__ == '__main__':
+    for fill in [0.6, 0.8, 0.95]:
+        boards = [dense_board(seed, fill) for seed in range(10)]
+        ranges = bench_lines(RangesGrid, boards)
+        runs = bench_lines(Grid, boards)
+        print(
+            f'fill {fill:.2f} all lines ranges:   {ranges:8.1f} us, '
+            f'bitmask runs: {runs:7.1f} us, speedup: {ranges / runs:.1f}x'
+                )
@@ -0,0 +1,65 @@
+"""Benchmark per-move figure validation with list and set quarters
+
+Usage: python benchmarks/bench_quarter.py
+"""
+import sys
+import pathlib
+import timeit
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from blocks import Grid, Figure, Window
+from constraints import Direction, FigureOrientation, get_board
+
+
+class ListWindow(Window):
+    """Window with quarters as lists, like before quarters became sets
+    """
+
+    @property
+    def quarter(self) -> list[tuple[int, int]]:
+        return LIST_QUARTERS[self.move_direction]
+
+    def is_in_quarter(self) -> bool:
+        for pos in self.window_figure_pos:
+            if pos not in self.quarter:
+                return False
+        return True
+
+
+LIST_QUARTERS = {
+    direction: sorted(quarter) for direction, quarter in get_board().quarters.items()
+        }
+
+
+def make_windows(window_class: type[Window]) -> list[Window]:
+    """Make windows for every orientation and move direction
+    """
+    grid = Grid()
+    return [
+        window_class((x, 15), orientation, grid, direction)
+        for orientation in FigureOrientation
+        for direction in Direction
+        for x in range(0, 30, 3)
+            ]
+
+
+def bench(window_class: type[Window], number: int = 20) -> float:
+    """Get mean time of is_valid_figure per window in microseconds
+    """
+    windows = make_windows(window_class)
+    figure = Figure(windows[0])
+
+    def validate() -> None:
+        for window in windows:
+            figure.is_valid_figure(window)
+
+    seconds = min(timeit.repeat(validate, number=number, repeat=5))
+    return seconds / number / len(windows) * 1e6
+
+
+if __name__ == '__main__':
+    list_time = bench(ListWindow)
+    set_time = bench(Window)
+    print(f'is_valid_figure with list quarters: {list_time:.2f} us')
+    print(f'is_valid_figure with set quarters:  {set_time:.2f} us')
+    print(f'speedup: {list_time / set_time:.1f}x')
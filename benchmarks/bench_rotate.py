@@ -0,0 +1,76 @@
+"""Benchmark figure rotation with rotations table and with orientation
+name built from strings, like before rotations table
+
+Usage: python benchmarks/bench_rotate.py
+"""
+import sys
+import pathlib
+import timeit
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+
+from blocks import Grid, Figure, Window
+from constraints import Direction, FigureOrientation, Orientation
+
+
+class StringFigure(Figure):
+    """Figure with rotation by built orientation name, that signals
+    square and wrong direction with ValueError
+    """
+
+    def _choose_orientation(self, direction: Direction) -> Orientation:
+        """Choose orientation of figure after rotation
+        """
+        if self.window.orientation == FigureOrientation.O:
+            raise ValueError("Square can't be rotated - is a square!")
+        ind = Orientation[self.window.orientation.name[2]].value
+        match direction, ind:
+            case Direction.RIGHT, 4:
+                return Orientation(1)
+            case Direction.RIGHT, o if o < 4:
+                return Orientation(ind+1)
+            case Direction.LEFT, 1:
+                return Orientation(4)
+            case Direction.LEFT, o if o > 1:
+                return Orientation(ind-1)
+            case _:
+                raise ValueError('Wrong direction!')
+
+    def rotate_figure(self, direction: Direction) -> Window:
+        try:
+            return Window(
+                self.window.top_left,
+                FigureOrientation[
+                    self.shape + '_' + self._choose_orientation(direction).name
+                        ],
+                self.window.grid,
+                self.window.move_direction
+                    )
+        except ValueError:
+            return self.window
+
+
+def bench(figure_class: type[Figure], number: int = 200) -> float:
+    """Get mean time of rotate_figure per rotation in microseconds
+    """
+    grid = Grid()
+    figures = [
+        figure_class(Window((10, 10), orientation, grid, Direction.DOWN))
+        for orientation in FigureOrientation
+            ]
+    directions = [Direction.LEFT, Direction.RIGHT]
+
+    def rotate() -> None:
+        for figure in figures:
+            for direction in directions:
+                figure.rotate_figure(direction)
+
+    seconds = min(timeit.repeat(rotate, number=number, repeat=5))
+    return seconds / number / len(figures) / len(directions) * 1e6
+
+
+if __name__ == '__main__':
+    string_time = bench(StringFigure)
+    table_time = bench(Figure)
+    print(f'rotate_figure with string names:    {string_time:.2f} us')
+    print(f'rotate_figure with rotations table: {table_time:.2f} us')
+    print(f'speedup: {string_time / table_time:.1f}x')
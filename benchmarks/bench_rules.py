@@ -0,0 +1,231 @@
+"""pytest-benchmark suite of rules hot paths on fixed seed boards:
+empty, half-full and near game over.
+
+Run and compare with stored baseline, fail on regression of median time
+over 100%. The threshold is wide, because medians of the same code
+on shared machines differ up to 80%:
+    make bench-check
+Store new baseline after intended performance changes:
+    make bench-save
+"""
+import sys
+import random
+import pathlib
+from functools import partial
+import pytest
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'src' / 'kektris'))
+pytest.importorskip('pytest_benchmark')
+
+from blocks import Grid, Figure, Window
+from engine import Engine
+from constraints import Action, Direction, FigureOrientation
+from constraints import GameConst as const
+
+
+# scenario name: frozen fill of board
+SCENARIOS: dict[str, float] = {
+    'empty': 0.0,
+    'half-full': 0.7,
+    'near-game-over': 0.97,
+        }
+TICKS = 2000
+# fresh engines per round of benchmarks, that change the board
+ENGINES = 10
+
+
+def make_engine(scenario: str, seed: int = 0) -> Engine:
+    """Make engine with seeded random frozen board of scenario. Every
+    6th line is left clear, so board has no lines ready to clear
+    """
+    engine = Engine(Grid, seed)
+    rnd = random.Random(seed)
+    fill = SCENARIOS[scenario]
+    for x in range(const.CELLS):
+        for y in range(const.CELLS):
+            if rnd.random() < fill and x % 6 != 5 and y % 6 != 5:
+                engine.grid.grid[x][y].freeze()
+    return engine
+
+
+def make_states(seed: int = 0) -> list[tuple[tuple[int, int], FigureOrientation, Direction]]:
+    """Make seeded random figure states over the grid
+    """
+    rnd = random.Random(seed)
+    return [
+        (
+            (rnd.randrange(-3, const.CELLS), rnd.randrange(-3, const.CELLS)),
+            rnd.choice(FigureOrientation.get_includes()),
+            rnd.choice(list(Direction)),
+                )
+        for _ in range(200)
+            ]
+
+
+@pytest.fixture(params=list(SCENARIOS))
+def scenario(request) -> str:
+    return request.param
+
+
+@pytest.fixture
+def engine(scenario: str) -> Engine:
+    """Make fresh engine of scenario for every benchmark
+    """
+    return make_engine(scenario)
+
+
+def test_window_construction(benchmark, engine: Engine) -> None:
+    """Benchmark construction of windows with figure cells
+    """
+    states = make_states()
+
+    def construct() -> list[Window]:
+        windows = []
+        for top_left, orientation, direction in states:
+            window = Window(top_left, orientation, engine.grid, direction)
+            window.map_window
+            windows.append(window)
+        return windows
+
+    assert len(benchmark(construct)) == len(states)
+
+
+def test_is_valid_figure(benchmark, engine: Engine) -> None:
+    """Benchmark validation of new windows
+    """
+    states = make_states()
+    figure = Figure(Window(*states[0][:2], engine.grid, states[0][2]))
+
+    def setup() -> tuple[tuple[list[Window]], dict]:
+        return ([
+            Window(top_left, orientation, engine.grid, direction)
+            for top_left, orientation, direction in states
+                ], ), {}
+
+    def validate(windows: list[Window]) -> int:
+        return sum(figure.is_valid_figure(window) for window in windows)
+
+    benchmark.pedantic(validate, setup=setup, rounds=200)
+
+
+def test_is_valid_state(benchmark, engine: Engine) -> None:
+    """Benchmark validation of candidate states without windows
+    """
+    states = make_states()
+    figure = Figure(Window(*states[0][:2], engine.grid, states[0][2]))
+
+    def validate() -> int:
+        return sum(
+            figure.is_valid_state((top_left, orientation))
+            for top_left, orientation, _ in states
+                )
+
+    benchmark(validate)
+
+
+def test_block_figure(benchmark, engine: Engine) -> None:
+    """Benchmark blocking of figure cells in two windows by turns
+    """
+    windows = [
+        Window((x, 14), FigureOrientation.T_U, engine.grid, Direction.DOWN)
+        for x in [14, 15]
+            ]
+    figure = Figure(windows[0])
+
+    def block() -> None:
+        for window in windows:
+            figure.block_figure(window)
+
+    benchmark(block)
+    engine.grid.clear_blocked()
+
+
+def test_find_line(benchmark, scenario: str) -> None:
+    """Benchmark line search over all touched lines of fresh boards
+    without lines
+    """
+
+    def setup() -> tuple[tuple[list[Engine]], dict]:
+        return ([make_engine(scenario) for _ in range(ENGINES)], ), {}
+
+    def find(engines: list[Engine]) -> None:
+        for engine in engines:
+            assert engine.find_line() is None
+
+    benchmark.pedantic(find, setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize('direction', [Direction.DOWN, Direction.LEFT])
+def test_clear_lines(benchmark, scenario: str, direction: Direction) -> None:
+    """Benchmark clear of line in the middle of quarter of fresh boards
+    with search over all touched lines and shift of chained frozen cells
+    """
+
+    def make_line_engine() -> Engine:
+        engine = make_engine(scenario)
+        engine.figure.window.move_direction = direction
+        engine.figure.window._quarter = None
+        for n in range(11, 23):
+            pos = (n, 11) if direction == Direction.DOWN else (22, n)
+            engine.grid.grid[pos[0]][pos[1]].freeze()
+        return engine
+
+    def setup() -> tuple[tuple[list[Engine]], dict]:
+        return ([make_line_engine() for _ in range(ENGINES)], ), {}
+
+    def clear(engines: list[Engine]) -> None:
+        for engine in engines:
+            assert engine.clear_lines().lines
+
+    benchmark.pedantic(clear, setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize('direction', [Direction.DOWN, Direction.LEFT])
+def test_get_shifted_frozen(benchmark, engine: Engine, direction: Direction) -> None:
+    """Benchmark search of frozen cells chained to line, cleared
+    in the middle of quarter
+    """
+    engine.figure.window.move_direction = direction
+    engine.figure.window._quarter = None
+    if direction == Direction.DOWN:
+        line = [(x, 11) for x in range(11, 23)]
+    else:
+        line = [(22, y) for y in range(11, 23)]
+    benchmark(engine.get_shifted_frozen, line)
+
+
+@pytest.mark.parametrize('seed', [1])
+def test_ticks(benchmark, seed: int) -> None:
+    """Benchmark seeded random game from empty board, ticks per second
+    are stored as extra info
+    """
+    actions = [None] * 3 + list(Action)
+
+    def setup() -> tuple[tuple[Engine, random.Random], dict]:
+        return (Engine(Grid, seed), random.Random(seed)), {}
+
+    def play(engine: Engine, rnd: random.Random) -> None:
+        for _ in range(TICKS):
+            engine.step(rnd.choice(actions))
+            if engine.is_game_over:
+                engine.reset()
+
+    benchmark.pedantic(play, setup=setup, rounds=10)
+    benchmark.extra_info['ticks_per_second'] = TICKS / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize('cells', [128, 256])
+def test_large_board_ticks(benchmark, cells: int) -> None:
+    """Benchmark seeded random game on large board, ticks per second
+    are stored as extra info
+    """
+    actions = [None] * 3 + list(Action)
+
+    def setup() -> tuple[tuple[Engine, random.Random], dict]:
+        return (Engine(partial(Grid, cells=cells), 1), random.Random(1)), {}
+
+    def play(engine: Engine, rnd: random.Random) -> None:
+        for _ in range(TICKS):
+            engine.step(rnd.choice(actions))
+
+    benchmark.pedantic(play, setup=setup, rounds=10)
+    benchmark.extra_info['ticks_per_second'] = TICKS / benchmark.stats.stats.mean
@@ -0,0 +1,667 @@
+"""Placement search bot: enumerates every final placement of current
+figure, that is reachable with player moves, rotations and gravity,
+scores placements with heuristic and plays input sequence to the best one.
+
+Search states are (top_left, orientation) of figure. States of one
+orientation are bits of an int bitboard, so breadth first search expands
+all states of a layer with a few shifts and ands. Bit of top left (x, y)
+is (x + 4) * span + y + 4, span covers positions -4..cells+4, and grid
+cell (x, y) has the same bit on padded frozen bitboard.
+
+Lookahead search places the next figure on every board left by the best
+placements of current figure. Evaluated boards are kept in transposition
+table keyed by zobrist hash of frozen cells, that Grid updates with cells.
+"""
+from collections import deque, OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional
+from blocks import (
+    Grid,
+    Pos,
+    State,
+    STEPS,
+    OPPOSITE,
+    ROTATIONS,
+    get_figure_mask,
+    get_runs,
+        )
+from engine import Engine
+from constraints import Action, CellState, Direction, FigureOrientation, get_board
+
+
+# heuristic weights
+LINE_WEIGHT = 10.0
+DEPTH_WEIGHT = -0.5
+HOLE_WEIGHT = -2.0
+GAME_OVER_SCORE = -1000.0
+
+# count of best placements of current figure, that are searched
+# with the next figure
+LOOKAHEAD_WIDTH = 8
+MISSING = object()
+
+
+ORIENTATIONS: tuple[FigureOrientation, ...] = tuple(FigureOrientation)
+ORIENTATION_CODES: dict[FigureOrientation, int] = {
+    orientation: n for n, orientation in enumerate(ORIENTATIONS)
+        }
+ROTATE_ACTIONS: tuple[Action, Action] = (Action.ROTATE_LEFT, Action.ROTATE_RIGHT)
+
+
+def shift(bits: int, step: int) -> int:
+    """Shift bitboard by step
+    """
+    if step >= 0:
+        return bits << step
+    return bits >> -step
+
+
+def to_bits(flags: list[bool]) -> int:
+    """Make bitboard with bits of true flags
+    """
+    return int(''.join('1' if flag else '0' for flag in reversed(flags)) or '0', 2)
+
+
+def ready_cells(frozen: int, line_lenght: int, span: int) -> int:
+    """Get bitboard of padded frozen bitboard cells, that are in lines
+    ready to clear
+    """
+    return get_runs(frozen, line_lenght) | get_runs(frozen, line_lenght, span)
+
+
+class TranspositionTable:
+    """Bounded cache of evaluated search states. The least recently used
+    entry is dropped, when table is full
+    """
+
+    def __init__(self, maxsize: int = 1 << 16) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value of key and mark it as recently used
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value of key, drop the least recently used entry
+        if table is full
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class StateTables(NamedTuple):
+    """Tables of search states of grid with given cells count.
+    State code is orientation code * span ** 2 + top left bit
+    """
+    cells: int
+    span: int
+    offsets: list[tuple[Pos, ...]]
+    on_grid: list[int]
+    full_on_grid: list[int]
+    figures: list[int]
+    rotations: list[tuple[int, int]]
+    quarters: dict[Direction, list[int]]
+    quarter_cells: dict[Direction, int]
+    depths: dict[Direction, list[int]]
+    column: int
+    row: int
+
+    def depth(self, direction: Direction, state: int) -> int:
+        """Get sum of distances of figure cells from the center to the far
+        side of quarter of given move direction. Figure is fully on grid,
+        so depth changes by 4 per step of top left along direction axis
+        """
+        o, top = divmod(state, self.span ** 2)
+        if direction in [Direction.LEFT, Direction.RIGHT]:
+            top //= self.span
+        else:
+            top %= self.span
+        if direction in [Direction.RIGHT, Direction.DOWN]:
+            return self.depths[direction][o] - 4 * top
+        return self.depths[direction][o] + 4 * top
+
+
+STATE_TABLES: dict[int, StateTables] = {}
+
+
+def get_state_tables(cells: int) -> StateTables:
+    """Get state tables of grid with given cells count, make them once.
+    Bitboards of all top lefts are made from bitboards of positions
+    shifted by figure cells, so tables don't keep state per position
+    """
+    tables = STATE_TABLES.get(cells)
+    if tables is not None:
+        return tables
+
+    span = cells + 9
+    tops = [(x, y) for x in range(-4, cells + 5) for y in range(-4, cells + 5)]
+    offsets = [
+        get_figure_mask(orientation, (0, 0), cells).positions
+        for orientation in ORIENTATIONS
+            ]
+    figures = [sum(1 << (x * span + y) for x, y in cells_pos) for cells_pos in offsets]
+    rotations = [
+        (
+            ORIENTATION_CODES[ROTATIONS[orientation, Direction.LEFT]],
+            ORIENTATION_CODES[ROTATIONS[orientation, Direction.RIGHT]],
+                )
+        for orientation in ORIENTATIONS
+            ]
+
+    # top lefts, where position of figure cell with offset is in span
+    in_span = {
+        (dx, dy): to_bits([x + dx <= cells + 4 and y + dy <= cells + 4 for x, y in tops])
+        for dx in range(4)
+        for dy in range(4)
+            }
+
+    def of_cells(positions: int, o: int) -> list[int]:
+        """Get bitboards of top lefts, where each figure cell of orientation
+        code o is in positions bitboard
+        """
+        return [
+            positions >> (dx * span + dy) & in_span[dx, dy]
+            for dx, dy in offsets[o]
+                ]
+
+    grid = to_bits([(cells > x >= 0) and (cells > y >= 0) for x, y in tops])
+    on_grid = []
+    full_on_grid = []
+    for o in range(len(ORIENTATIONS)):
+        bits = of_cells(grid, o)
+        on_grid.append(bits[0] | bits[1] | bits[2] | bits[3])
+        full_on_grid.append(bits[0] & bits[1] & bits[2] & bits[3])
+
+    quarters = {}
+    quarter_cells = {}
+    depths = {}
+    center = cells // 2
+    for direction, quarter in get_board(cells).quarters.items():
+        positions = to_bits([pos in quarter for pos in tops])
+        quarters[direction] = []
+        for o in range(len(ORIENTATIONS)):
+            bits = of_cells(positions, o)
+            quarters[direction].append(bits[0] & bits[1] & bits[2] & bits[3])
+        quarter_cells[direction] = positions & grid
+        # depths of figures with top left bit 0, at position (-4, -4)
+        axis = 0 if direction in [Direction.LEFT, Direction.RIGHT] else 1
+        if direction in [Direction.RIGHT, Direction.DOWN]:
+            depths[direction] = [
+                sum(center - 1 - (pos[axis] - 4) for pos in cells_pos) for cells_pos in offsets
+                    ]
+        else:
+            depths[direction] = [
+                sum(pos[axis] - 4 - center for pos in cells_pos) for cells_pos in offsets
+                    ]
+
+    tables = STATE_TABLES[cells] = StateTables(
+        cells,
+        span,
+        offsets,
+        on_grid,
+        full_on_grid,
+        figures,
+        rotations,
+        quarters,
+        quarter_cells,
+        depths,
+        to_bits([x == 0 and cells > y >= 0 for x, y in tops]),
+        to_bits([y == 0 and cells > x >= 0 for x, y in tops]),
+            )
+    return tables
+
+
+class Placement(NamedTuple):
+    """Final figure placement with input sequence leading to it.
+    Action None is waiting for gravity, while figure isn't on grid
+    """
+    top_left: Pos
+    orientation: FigureOrientation
+    actions: tuple[Optional[Action], ...]
+    states: tuple[State, ...]
+    score: float
+
+
+class PlacementSearch:
+    """Breadth first search over bitboards of (top_left, orientation)
+    states of figure with given move direction. Padded frozen bitboard
+    is made from grid, if it isn't given
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        move_direction: Direction,
+        frozen: Optional[int] = None,
+            ) -> None:
+        self.grid = grid
+        self.move_direction = move_direction
+        self.tables = tables = get_state_tables(grid.cells)
+        span = tables.span
+        dx, dy = STEPS[move_direction]
+        self.forward = dx * span + dy
+        self.forward_action = Action[move_direction.name]
+        self.moves: list[tuple[Action, int]] = [
+            (Action[direction.name], step[0] * span + step[1])
+            for direction, step in STEPS.items()
+            if direction not in [move_direction, OPPOSITE[move_direction]]
+                ]
+
+        # padded frozen bitboard
+        if frozen is None:
+            frozen = 0
+            for x in range(grid.cells):
+                line = grid.frozen_line(0, x)
+                if line:
+                    frozen |= line << ((x + 4) * span + 4)
+        self.frozen: int = frozen
+        self.valid: dict[int, int] = {}
+        self.near_full: dict[int, int] = {}
+
+    def encode(self, top_left: Pos, orientation: FigureOrientation) -> int:
+        """Get state code
+        """
+        span = self.tables.span
+        return (ORIENTATION_CODES[orientation] * span + top_left[0] + 4) * span \
+            + top_left[1] + 4
+
+    def decode(self, state: int) -> State:
+        """Get top left and orientation of state code
+        """
+        span = self.tables.span
+        rest, y = divmod(state, span)
+        o, x = divmod(rest, span)
+        return (x - 4, y - 4), ORIENTATIONS[o]
+
+    def get_valid(self, o: int) -> int:
+        """Get bitboard of top lefts of orientation code o, where figure
+        is in quarter and has no frozen cells
+        """
+        try:
+            return self.valid[o]
+        except KeyError:
+            collisions = 0
+            figure = self.tables.figures[o]
+            while figure:
+                low = figure & -figure
+                collisions |= self.frozen >> (low.bit_length() - 1)
+                figure ^= low
+            valid = self.valid[o] = \
+                self.tables.quarters[self.move_direction][o] & ~collisions
+            return valid
+
+    def get_near_full(self, line_lenght: int) -> int:
+        """Get bitboard of lines, where figure can make line ready to clear,
+        i.e. lines with at least line_lenght - 4 frozen cells
+        """
+        try:
+            return self.near_full[line_lenght]
+        except KeyError:
+            tables = self.tables
+            near_full = 0
+            for n in range(self.grid.cells):
+                column = tables.column << (n * tables.span)
+                if (self.frozen & column).bit_count() >= line_lenght - 4:
+                    near_full |= column
+                row = tables.row << n
+                if (self.frozen & row).bit_count() >= line_lenght - 4:
+                    near_full |= row
+            self.near_full[line_lenght] = near_full
+            return near_full
+
+    def _get_group(self, o: int) -> set[int]:
+        """Get orientation codes reached from orientation code o by rotations
+        """
+        rotations = self.tables.rotations
+        group = {o}
+        while True:
+            rotated = {r for g in group for r in rotations[g]} - group
+            if not rotated:
+                return group
+            group |= rotated
+
+    def _expand(
+        self,
+        frontier: dict[int, int],
+        valid: dict[int, int],
+        valid_on: dict[int, int],
+            ) -> dict[int, int]:
+        """Get states after one move or rotation from frontier states
+        as orientation code to bitboard, reached states aren't excluded
+        """
+        on_grid = self.tables.on_grid
+        rotations = self.tables.rotations
+        forward = self.forward
+        lateral = abs(self.moves[0][1])
+        new = {g: 0 for g in valid}
+        for o, bits in frontier.items():
+            if forward > 0:
+                moved = bits << forward
+            else:
+                moved = bits >> -forward
+            moved &= valid[o]
+            on = bits & on_grid[o]
+            if on:
+                moved |= (on << lateral | on >> lateral) & valid_on[o]
+                left, right = rotations[o]
+                if left != o:
+                    new[left] |= on & valid_on[left]
+                    new[right] |= on & valid_on[right]
+            new[o] |= moved
+        return new
+
+    def _get_finals(self, reached: dict[int, int]) -> list[int]:
+        """Get final states of reached states, where figure is fully
+        on grid and can't move forward
+        """
+        span2 = self.tables.span ** 2
+        finals = []
+        for o, bits in reached.items():
+            bits &= self.tables.full_on_grid[o] & ~shift(self.get_valid(o), -self.forward)
+            while bits:
+                low = bits & -bits
+                finals.append(o * span2 + low.bit_length() - 1)
+                bits ^= low
+        return finals
+
+    def search(self, start: int) -> tuple[list[dict[int, int]], list[int]]:
+        """Get layers of reached states by moves count from start
+        as orientation code to bitboard and final states, where figure
+        is frozen
+        """
+        o, top = divmod(start, self.tables.span ** 2)
+        if not self.get_valid(o) >> top & 1:
+            return [], []
+
+        # valid states and valid states on grid of figure orientations
+        group = self._get_group(o)
+        valid = {g: self.get_valid(g) for g in group}
+        valid_on = {g: valid[g] & self.tables.on_grid[g] for g in group}
+
+        reached = {g: 0 for g in group}
+        reached[o] = 1 << top
+        frontier = {o: 1 << top}
+        layers = [frontier]
+        while frontier:
+            new = self._expand(frontier, valid, valid_on)
+            frontier = {}
+            for o, bits in new.items():
+                bits &= ~reached[o]
+                if bits:
+                    reached[o] |= bits
+                    frontier[o] = bits
+            if frontier:
+                layers.append(frontier)
+        return layers, self._get_finals(reached)
+
+    def score(self, state: int, line_lenght: int) -> float:
+        """Score final state: lines ready to clear, depth of figure cells
+        from the quarter center side and clear cells covered by figure
+        """
+        return self.scores([state], line_lenght)[0]
+
+    def scores(self, states: list[int], line_lenght: int) -> list[float]:
+        """Score final states
+        """
+        tables = self.tables
+        span = tables.span
+        span2 = span ** 2
+        figures = tables.figures
+        direction = self.move_direction
+        quarter = tables.quarter_cells[direction]
+        depths = tables.depths[direction]
+        if direction in [Direction.LEFT, Direction.RIGHT]:
+            axis_span = span
+        else:
+            axis_span = 1
+        step = -4 if direction in [Direction.RIGHT, Direction.DOWN] else 4
+        near_full = self.get_near_full(line_lenght)
+        forward = self.forward
+        frozen_grid = self.frozen
+        scores = []
+        for state in states:
+            o, top = divmod(state, span2)
+            figure = figures[o] << top
+            frozen = frozen_grid | figure
+
+            lines = 0
+            if figure & near_full:
+                runs = frozen
+                for _ in range(line_lenght - 1):
+                    runs &= runs >> 1
+                lines += runs.bit_count()
+                runs = frozen
+                for _ in range(line_lenght - 1):
+                    runs &= runs >> span
+                lines += runs.bit_count()
+
+            if forward > 0:
+                covered = figure << forward
+            else:
+                covered = figure >> -forward
+            covered &= quarter & ~frozen
+
+            scores.append(
+                LINE_WEIGHT * lines
+                + DEPTH_WEIGHT * (depths[o] + step * (top // axis_span % span))
+                + HOLE_WEIGHT * covered.bit_count()
+                    )
+        return scores
+
+    def place(self, state: int, line_lenght: int) -> int:
+        """Get padded frozen bitboard after figure is frozen in final state
+        and lines ready to clear are cleared. Cleared lines aren't shifted
+        """
+        span = self.tables.span
+        o, top = divmod(state, span ** 2)
+        frozen = self.frozen | self.tables.figures[o] << top
+        return frozen & ~ready_cells(frozen, line_lenght, span)
+
+    def hash_change(self, changed: int) -> int:
+        """Get change of frozen zobrist hash of grid, when frozen state
+        of changed cells of padded bitboard is flipped
+        """
+        span = self.tables.span
+        cells = self.grid.cells
+        keys = self.grid.zobrist_keys[CellState.FR0ZEN]
+        change = 0
+        while changed:
+            low = changed & -changed
+            x, y = divmod(low.bit_length() - 1, span)
+            change ^= keys[(x - 4) * cells + y - 4]
+            changed ^= low
+        return change
+
+    def placement(
+        self,
+        layers: list[dict[int, int]],
+        final: int,
+        score: float,
+            ) -> Placement:
+        """Make placement with input sequence from the start to final state
+        """
+        span2 = self.tables.span ** 2
+        on_grid = self.tables.on_grid
+        o, top = divmod(final, span2)
+        d = next(d for d, layer in enumerate(layers) if layer.get(o, 0) >> top & 1)
+        actions = []
+        states = []
+        while d:
+            states.append(self.decode(o * span2 + top))
+            previous = layers[d - 1]
+            d -= 1
+            if previous.get(o, 0) >> (top - self.forward) & 1:
+                top -= self.forward
+                actions.append(self.forward_action if on_grid[o] >> top & 1 else None)
+                continue
+            if on_grid[o] >> top & 1:
+                for action, step in self.moves:
+                    if (previous.get(o, 0) & on_grid[o]) >> (top - step) & 1:
+                        top -= step
+                        actions.append(action)
+                        break
+                else:
+                    for rotated, (left, right) in enumerate(self.tables.rotations):
+                        if rotated != o and o in (left, right) \
+                                and (previous.get(rotated, 0) & on_grid[rotated]) >> top & 1:
+                            actions.append(ROTATE_ACTIONS[(left, right).index(o)])
+                            o = rotated
+                            break
+        top_left, orientation = self.decode(final)
+        return Placement(
+            top_left,
+            orientation,
+            tuple(reversed(actions)),
+            tuple(reversed(states)),
+            score,
+                )
+
+    def placements(self, start: State, line_lenght: int) -> list[Placement]:
+        """Get all reachable final placements with scores
+        """
+        layers, finals = self.search(self.encode(*start))
+        return [
+            self.placement(layers, final, score)
+            for final, score in zip(finals, self.scores(finals, line_lenght))
+                ]
+
+    def best_placement(self, start: State, line_lenght: int) -> Optional[Placement]:
+        """Get the best of reachable final placements
+        """
+        layers, finals = self.search(self.encode(*start))
+        if finals:
+            scores = self.scores(finals, line_lenght)
+            score = max(scores)
+            return self.placement(layers, finals[scores.index(score)], score)
+
+
+def best_placement(engine: Engine) -> Optional[Placement]:
+    """Get best placement of current figure
+    """
+    window = engine.figure.window
+    return PlacementSearch(engine.grid, window.move_direction).best_placement(
+        (window.top_left, window.orientation),
+        engine.line_lenght,
+            )
+
+
+def lookahead_placement(
+    engine: Engine,
+    table: TranspositionTable,
+    width: int = LOOKAHEAD_WIDTH,
+        ) -> Optional[Placement]:
+    """Get placement of current figure with the best sum of its score
+    and the best score of the next figure on the board it leaves.
+    Only the width best placements of current figure are searched further.
+    Results are stored in transposition table
+    """
+    window = engine.figure.window
+    next_window = engine.figure_next.window
+    next_state = (next_window.top_left, next_window.orientation)
+    frozen_hash = engine.grid.frozen_hash
+    line_lenght = engine.line_lenght
+    key = (
+        frozen_hash,
+        window.top_left,
+        window.orientation,
+        window.move_direction,
+        next_state,
+        next_window.move_direction,
+        line_lenght,
+            )
+    placement = table.get(key, MISSING)
+    if placement is not MISSING:
+        return placement
+
+    search = PlacementSearch(engine.grid, window.move_direction)
+    layers, finals = search.search(search.encode(window.top_left, window.orientation))
+    placement = None
+    if finals:
+        scores = search.scores(finals, line_lenght)
+        best = sorted(range(len(finals)), key=scores.__getitem__, reverse=True)
+        totals = []
+        for i in best[:width]:
+            frozen = search.place(finals[i], line_lenght)
+            child_key = (
+                frozen_hash ^ search.hash_change(frozen ^ search.frozen),
+                next_state,
+                next_window.move_direction,
+                line_lenght,
+                    )
+            score = table.get(child_key, MISSING)
+            if score is MISSING:
+                child = PlacementSearch(engine.grid, next_window.move_direction, frozen)
+                _, child_finals = child.search(child.encode(*next_state))
+                score = max(child.scores(child_finals, line_lenght), default=GAME_OVER_SCORE)
+                table.put(child_key, score)
+            totals.append(scores[i] + score)
+        total = max(totals)
+        placement = search.placement(layers, finals[best[totals.index(total)]], total)
+    table.put(key, placement)
+    return placement
+
+
+class PlacementAgent:
+    """Agent, that plays input sequence to the best placement. Placement
+    is searched again, when figure is changed or gravity moved it.
+    Lookahead agent searches the next figure too and keeps results
+    in its transposition table
+    """
+
+    def __init__(self, lookahead: bool = False, table_size: int = 1 << 16) -> None:
+        self.actions: deque[Optional[Action]] = deque()
+        self.states: deque[State] = deque()
+        self.expected: Optional[State] = None
+        self.table: Optional[TranspositionTable] = \
+            TranspositionTable(table_size) if lookahead else None
+
+    def __call__(self, engine: Engine) -> Optional[Action]:
+        window = engine.figure.window
+        state = (window.top_left, window.orientation)
+        if state != self.expected:
+            if self.table is None:
+                placement = best_placement(engine)
+            else:
+                placement = lookahead_placement(engine, self.table)
+            if placement is None:
+                self.actions.clear()
+                self.states.clear()
+            else:
+                self.actions = deque(placement.actions)
+                self.states = deque(placement.states)
+            self.expected = state
+
+        if not self.actions or self.actions[0] is None:
+            return None
+        self.expected = self.states.popleft()
+        return self.actions.popleft()
+
+
+def placement_agent(seed: int) -> PlacementAgent:
+    """Placement search agent factory
+    """
+    return PlacementAgent()
+
+
+def lookahead_agent(seed: int) -> PlacementAgent:
+    """Placement search agent with next figure lookahead factory
+    """
+    return PlacementAgent(lookahead=True)
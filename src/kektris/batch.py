@@ -0,0 +1,107 @@
+"""Many games in lockstep over shared array storage. Requires numpy,
+that isn't a game dependency: pip install numpy
+"""
+from functools import partial
+from typing import Optional, Sequence
+import numpy as np
+from engine import Engine
+from ndgrid import NumpyGrid
+from constraints import ACTIONS, Action, FigureOrientation
+
+
+ORIENTATIONS: tuple[FigureOrientation, ...] = tuple(FigureOrientation)
+ORIENTATION_CODES: dict[FigureOrientation, int] = {
+    orientation: n for n, orientation in enumerate(ORIENTATIONS)
+        }
+
+
+class BatchEngine:
+    """Plays N games in lockstep with one step call. Rules aren't
+    vectorized: every active game engine is stepped in turn. It is
+    a shared storage wrapper, boards of all games are one stacked
+    (N, cells, cells) array: every game engine uses a NumpyGrid over
+    its own view of the stack. Score, speed, line lenght, game over
+    and figure state are copied to per-game vectors after every step,
+    so all games are observed without copies of the boards. Per-move
+    grid work costs figure cells, so a step isn't slower than steps
+    of N Grid engines (benchmarks/bench_batch.py).
+    With given seed the game i is seeded with seed + i
+    """
+
+    def __init__(
+        self,
+        n: int,
+        seed: Optional[int] = None,
+        cells: int = NumpyGrid.cells,
+            ) -> None:
+        self.boards: np.ndarray = np.empty((n, cells, cells), dtype=np.uint8)
+        self.engines: list[Engine] = [
+            Engine(
+                partial(NumpyGrid, self.boards[i]),
+                None if seed is None else seed + i,
+                    )
+            for i in range(n)
+                ]
+        self.scores: np.ndarray = np.zeros(n, dtype=np.int64)
+        self.speeds: np.ndarray = np.zeros(n, dtype=np.int8)
+        self.line_lenghts: np.ndarray = np.zeros(n, dtype=np.int8)
+        self.game_over: np.ndarray = np.zeros(n, dtype=bool)
+        self.orientations: np.ndarray = np.zeros(n, dtype=np.int8)
+        self.next_orientations: np.ndarray = np.zeros(n, dtype=np.int8)
+        self.top_lefts: np.ndarray = np.zeros((n, 2), dtype=np.int16)
+        self.move_directions: np.ndarray = np.zeros(n, dtype=np.int8)
+        self.update_vectors(range(n))
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        """Reset all games. With given seed the game i is reseeded
+        with seed + i
+        """
+        for i, engine in enumerate(self.engines):
+            engine.reset(None if seed is None else seed + i)
+        self.update_vectors(range(len(self)))
+
+    def update_vectors(self, games: Sequence[int]) -> None:
+        """Update per-game vectors from engines
+        """
+        games = np.asarray(games, dtype=np.intp)
+        if not games.size:
+            return
+        engines = [self.engines[i] for i in games.tolist()]
+        windows = [engine.figure.window for engine in engines]
+        self.scores[games] = [engine.score for engine in engines]
+        self.speeds[games] = [engine.speed for engine in engines]
+        self.line_lenghts[games] = [engine.line_lenght for engine in engines]
+        self.game_over[games] = [engine.is_game_over for engine in engines]
+        self.orientations[games] = [ORIENTATION_CODES[window.orientation] for window in windows]
+        self.next_orientations[games] = [
+            ORIENTATION_CODES[engine.figure_next.window.orientation] for engine in engines
+                ]
+        self.top_lefts[games] = [window.top_left for window in windows]
+        self.move_directions[games] = [window.move_direction.value for window in windows]
+
+    def step(
+        self,
+        actions: Optional[Sequence[Optional[Action]] | np.ndarray] = None
+            ) -> None:
+        """Advance all active games by one tick. Actions are Action items
+        or action codes, one per game
+        """
+        if actions is None:
+            actions = [None] * len(self)
+        elif isinstance(actions, np.ndarray):
+            actions = [ACTIONS[code] for code in actions.tolist()]
+        active = np.flatnonzero(~self.game_over).tolist()
+        for i in active:
+            self.engines[i].step(actions[i])
+        self.update_vectors(active)
+
+    def run(self, steps: int) -> None:
+        """Advance all games by given count of ticks without actions
+        """
+        for _ in range(steps):
+            if self.game_over.all():
+                break
+            self.step()
@@ -1,27 +1,210 @@
-from typing import TypeAlias, Optional
+import random
+from typing import TypeAlias, Optional, NamedTuple
 from constraints import (
     Direction,
     Orientation,
     CellState,
     FigureOrientation,
+    Board,
+    get_board,
         )
 from constraints import GameConst as const
 
 
+Pos: TypeAlias = tuple[int, int]
+State: TypeAlias = tuple[Pos, FigureOrientation]
+
+
+class FigureMask(NamedTuple):
+    """Precomputed figure cells for orientation and top left position.
+    Mask is relative to top left of the figure window, so it is small
+    for any board size: bit of cell (x, y) on grid is mask bit
+    x * cells + y - shift
+    """
+    positions: tuple[Pos, ...]
+    on_grid: tuple[Pos, ...]
+    mask: int
+    shift: int
+
+
+def make_figure_mask(
+    orientation: FigureOrientation,
+    top_left: Pos,
+    cells: int,
+        ) -> FigureMask:
+    """Make figure positions (include offgrid positions),
+    positions on grid, bitmask relative to top left and its shift
+    on grid. Bit of (x, y) on grid is x * cells + y
+    """
+    positions = tuple(
+        (col + top_left[0], row + top_left[1])
+        for row in range(4)
+        for col in range(4)
+        if orientation.value[row][col]
+            )
+    on_grid = tuple(
+        pos for pos in positions
+        if (cells > pos[0] >= 0) and (cells > pos[1] >= 0)
+            )
+    mask = 0
+    for x, y in on_grid:
+        mask |= 1 << ((x - top_left[0]) * cells + y - top_left[1])
+    return FigureMask(positions, on_grid, mask, top_left[0] * cells + top_left[1])
+
+
+def make_figure_masks(cells: int) -> dict[tuple[FigureOrientation, Pos], FigureMask]:
+    """Make figure masks for every orientation and every top left position
+    from the arrive lines to the opposite grid side
+    """
+    return {
+        (orientation, (x, y)): make_figure_mask(orientation, (x, y), cells)
+        for orientation in FigureOrientation
+        for x in range(-4, cells + 1)
+        for y in range(-4, cells + 1)
+            }
+
+
+FIGURE_MASKS: dict[int, dict[tuple[FigureOrientation, Pos], FigureMask]] = {
+    const.CELLS: make_figure_masks(const.CELLS)
+        }
+# cached masks per board of not default size
+FIGURE_MASKS_MAXSIZE = 1 << 14
+
+
+def get_figure_mask(
+    orientation: FigureOrientation,
+    top_left: Pos,
+    cells: int = const.CELLS,
+        ) -> FigureMask:
+    """Get figure mask. Masks of default board are precomputed, masks
+    out of precomputed range are computed and not stored. Masks of other
+    boards are computed on demand and stored in bounded cache,
+    the oldest mask is dropped, when cache is full
+    """
+    masks = FIGURE_MASKS.setdefault(cells, {})
+    try:
+        return masks[orientation, top_left]
+    except KeyError:
+        mask = make_figure_mask(orientation, top_left, cells)
+        if cells != const.CELLS:
+            if len(masks) >= FIGURE_MASKS_MAXSIZE:
+                del masks[next(iter(masks))]
+            masks[orientation, top_left] = mask
+        return mask
+
+
+def get_rotation(orientation: FigureOrientation, direction: Direction) -> FigureOrientation:
+    """Get orientation after rotation. Square isn't rotated
+    """
+    if orientation == FigureOrientation.O:
+        return orientation
+    ind = Orientation[orientation.name[2]].value
+    ind = ind % 4 + 1 if direction == Direction.RIGHT else (ind - 2) % 4 + 1
+    return FigureOrientation[orientation.name[0] + '_' + Orientation(ind).name]
+
+
+ROTATIONS: dict[tuple[FigureOrientation, Direction], FigureOrientation] = {
+    (orientation, direction): get_rotation(orientation, direction)
+    for orientation in FigureOrientation
+    for direction in [Direction.LEFT, Direction.RIGHT]
+        }
+
+
+STEPS: dict[Direction, Pos] = {
+    Direction.LEFT: (-1, 0),
+    Direction.RIGHT: (1, 0),
+    Direction.UP: (0, -1),
+    Direction.DOWN: (0, 1),
+        }
+OPPOSITE: dict[Direction, Direction] = {
+    Direction.LEFT: Direction.RIGHT,
+    Direction.RIGHT: Direction.LEFT,
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+        }
+
+
+def get_runs(mask: int, line_lenght: int, step: int = 1) -> int:
+    """Get bits of mask, that are in runs of line_lenght or more set bits
+    with given step between bits of a run. Run starts are found with
+    ands of mask shifted by 1, 2, 4... steps and expanded back with ors
+    """
+    if line_lenght <= 0:
+        return mask
+    starts = mask
+    k = 1
+    while k * 2 <= line_lenght:
+        starts &= starts >> (k * step)
+        k *= 2
+    starts &= starts >> ((line_lenght - k) * step)
+    runs = starts
+    k = 1
+    while k * 2 <= line_lenght:
+        runs |= runs << (k * step)
+        k *= 2
+    return runs | runs << ((line_lenght - k) * step)
+
+
+def get_bits(mask: int) -> list[int]:
+    """Get sorted indexes of set bits of mask
+    """
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+ZOBRIST_KEYS: dict[int, dict[CellState, tuple[int, ...]]] = {}
+
+
+def get_zobrist_keys(cells: int) -> dict[CellState, tuple[int, ...]]:
+    """Get random 64 bit keys of cell states for grid with given cells count.
+    Key of the cell (x, y) is keys[state][x * cells + y], clear cells
+    have zero keys, so the hash of clear grid is 0
+    """
+    keys = ZOBRIST_KEYS.get(cells)
+    if keys is None:
+        rnd = random.Random(f'zobrist-{cells}')
+        keys = ZOBRIST_KEYS[cells] = {
+            state: tuple(
+                0 if state is CellState.CLEAR else rnd.getrandbits(64)
+                for _ in range(cells * cells)
+                    )
+            for state in CellState
+                }
+    return keys
+
+
+POSITIONS: dict[Pos, Pos] = {}
+
+
+def intern_pos(x: int, y: int) -> Pos:
+    """Get shared position tuple, so cells of all grids
+    don't keep their own copies
+    """
+    pos = (x, y)
+    return POSITIONS.setdefault(pos, pos)
+
+
 class Cell:
     """This class represent a cell of grid
     """
+    __slots__ = ('x', 'y', 'state', 'grid', '_pos')
     pixel_size = 5
 
     def __init__(
         self, x: int,
         y: int,
-        state: CellState = CellState.CLEAR
+        state: CellState = CellState.CLEAR,
+        grid: Optional['Grid'] = None,
             ) -> None:
         self.x = x
         self.y = y
         self.state = state
-        self._pos = (x, y)
+        self.grid = grid
+        self._pos = intern_pos(x, y)
 
     def __repr__(self) -> str:
         return f'Cell with position ({self.x}, {self.y}), state: {self.state.name}'
@@ -34,15 +217,15 @@ class Cell:
 
     @property
     def is_frozen(self) -> bool:
-        return self.state == CellState.FR0ZEN
+        return self.state is CellState.FR0ZEN
 
     @property
     def is_clear(self) -> bool:
-        return self.state == CellState.CLEAR
+        return self.state is CellState.CLEAR
 
     @property
     def is_blocked(self) -> bool:
-        return self.state == CellState.BLOCK
+        return self.state is CellState.BLOCK
 
     def __hash__(self) -> int:
         return hash(self.pos)
@@ -52,38 +235,65 @@ class Cell:
             return self.pos == other.pos
         return NotImplemented
 
+    def _set_state(self, state: CellState) -> None:
+        """Set state and notify owner grid
+        """
+        if self.grid is not None:
+            self.grid.on_state_change(self, state)
+        self.state = state
+
     def freeze(self) -> None:
         """Freeze cell
         """
-        self.state = CellState.FR0ZEN
+        self._set_state(CellState.FR0ZEN)
 
     def clear(self) -> None:
         """Clear the cell
         """
-        self.state = CellState.CLEAR
+        self._set_state(CellState.CLEAR)
 
     def block(self) -> None:
         """Block the cell
         """
-        self.state = CellState.BLOCK
+        self._set_state(CellState.BLOCK)
 
 
 Cells: TypeAlias = list[list[Cell]]
 
 
 class Grid:
-    """This class represent a grid of cells
+    """This class represent a grid of cells. Zobrist hashes of all
+    cells states (board_hash) and of frozen cells (frozen_hash)
+    and blocked cells of figure are updated with every cell state change.
+    Board size is given count of cells by side or class cells
     """
-    cells = 34
-
-    def __init__(self) -> None:
+    cells = const.CELLS
+
+    def __init__(self, cells: Optional[int] = None) -> None:
+        if cells is not None:
+            self.cells = cells
+        self.board: Board = get_board(self.cells)
+        self.zobrist_keys = get_zobrist_keys(self.cells)
+        self.board_hash: int = 0
+        self.frozen_hash: int = 0
+        self.frozen_counts: tuple[list[int], list[int]] = (
+            [0] * self.cells,
+            [0] * self.cells,
+                )
+        self.frozen_lines: tuple[list[int], list[int]] = (
+            [0] * self.cells,
+            [0] * self.cells,
+                )
+        self.touched_lines: tuple[set[int], set[int]] = (set(), set())
+        self.dirty: set[Pos] = set()
+        self.blocked_cells: dict[Pos, Cell] = {}
         self.grid: Cells = self._make_grid()
 
     def _make_grid(self) -> list[list[Cells]]:
-        """Make grid matrix
+        """Make grid matrix of cells owned by grid
         """
         return [
-            [Cell(x, y) for y in range(self.cells)]
+            [Cell(x, y, grid=self) for y in range(self.cells)]
             for x in range(self.cells)
                 ]
 
@@ -101,9 +311,9 @@ class Grid:
 
     @property
     def get_blocked(self) -> list[Cell]:
-        """Get all blocked
+        """Get all blocked in x, y order without grid scan
         """
-        return [cell for row in self.grid for cell in row if cell.is_blocked]
+        return [self.blocked_cells[pos] for pos in sorted(self.blocked_cells)]
 
     def is_clear(self, pos: tuple[int, int]) -> bool:
         """Is cell with given position clear
@@ -120,6 +330,151 @@ class Grid:
         """
         return self.grid[pos[0]][pos[1]].is_blocked
 
+    def has_frozen(self, figure_mask: FigureMask) -> bool:
+        """Has any of figure cells frozen
+        """
+        for x, y in figure_mask.on_grid:
+            if self.grid[x][y].is_frozen:
+                return True
+        return False
+
+    def figure_cells(self, figure_mask: FigureMask) -> list[Cell]:
+        """Get cells of figure on grid
+        """
+        return [self.grid[x][y] for x, y in figure_mask.on_grid]
+
+    def frozen_line(self, dimension: int, n: int) -> int:
+        """Get frozen bitmask of line with pos[dimension] == n.
+        Bit k of the mask is set if the k-th cell of the line is frozen
+        """
+        return self.frozen_lines[dimension][n]
+
+    def pop_dirty(self) -> set[Pos]:
+        """Get cells positions changed since the last call
+        """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def get_line_to_clear(
+        self,
+        dimension: int,
+        n: int,
+        line_lenght: int,
+            ) -> Optional[list[tuple[int, int]]]:
+        """Get positions of line with pos[dimension] == n to clear
+        """
+        to_clear = get_bits(get_runs(self.frozen_line(dimension, n), line_lenght))
+        if to_clear:
+            if dimension:
+                return [(k, n) for k in to_clear]
+            return [(n, k) for k in to_clear]
+
+    def find_line(self, line_lenght: int) -> Optional[list[tuple[int, int]]]:
+        """Find line ready to clear. Only lines touched by frozen cells
+        since the last search are inspected
+        """
+        for dim in [0, 1]:
+            touched = self.touched_lines[dim]
+            for n in sorted(touched):
+                if self.frozen_counts[dim][n] >= line_lenght:
+                    line = self.get_line_to_clear(dim, n, line_lenght)
+                    if line:
+                        return line
+                touched.discard(n)
+
+    def get_shifted_frozen(
+        self,
+        line: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> list[tuple[int, int]]:
+        """Get frozen positions chained to cleared line
+        from the outer side, that must be shifted
+        """
+        line_pos = set(line)
+        shift_x, shift_y = 0, 0
+        shifted = []
+        while True:
+            shift_x, shift_y = shift_x + shift[0], shift_y + shift[1]
+            sh = []
+            for pos in line:
+                p = (pos[0]+shift_x, pos[1]+shift_y)
+                inner = (p[0]-shift[0], p[1]-shift[1])
+
+                if p in quarter \
+                        and p not in line_pos \
+                        and (self.cells > p[0] >= 0) \
+                        and (self.cells > p[1] >= 0) \
+                        and self.grid[p[0]][p[1]].is_frozen \
+                        and (
+                            self.grid[inner[0]][inner[1]].is_frozen
+                            or inner in line_pos
+                                ):
+                    sh.append(p)
+            if sh:
+                shifted.extend(sh)
+            else:
+                break
+        return shifted
+
+    def move_shifted_frozen(
+        self,
+        shifted: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> None:
+        """Move shifted frozen cells one step back to cleared line
+        """
+        [self.grid[pos[0]][pos[1]].clear() for pos in shifted]
+        [
+            self.grid[pos[0]-shift[0]][pos[1]-shift[1]].freeze()
+            for pos in shifted
+            if pos in quarter
+                ]
+
+    def shift_frozen(
+        self,
+        line: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> None:
+        """Shift frozen cells to cleared line
+        """
+        shifted = self.get_shifted_frozen(line, shift, quarter)
+        if shifted:
+            self.move_shifted_frozen(shifted, shift, quarter)
+
+    def on_state_change(self, cell: Cell, state: CellState) -> None:
+        """Update frozen index, blocked cells and hashes before owned cell
+        state is changed. Lines with new frozen cells are marked as touched,
+        changed cells are marked as dirty for renderer
+        """
+        x, y = cell.pos
+        if state is not cell.state:
+            self.dirty.add(cell.pos)
+            bit = x * self.cells + y
+            self.board_hash ^= self.zobrist_keys[cell.state][bit] \
+                ^ self.zobrist_keys[state][bit]
+            if state == CellState.BLOCK:
+                self.blocked_cells[cell.pos] = cell
+            elif cell.is_blocked:
+                del self.blocked_cells[cell.pos]
+        if state == CellState.FR0ZEN:
+            if not cell.is_frozen:
+                self.frozen_hash ^= self.zobrist_keys[state][x * self.cells + y]
+                self.frozen_counts[0][x] += 1
+                self.frozen_counts[1][y] += 1
+                self.frozen_lines[0][x] |= 1 << y
+                self.frozen_lines[1][y] |= 1 << x
+                self.touched_lines[0].add(x)
+                self.touched_lines[1].add(y)
+        elif cell.is_frozen:
+            self.frozen_hash ^= self.zobrist_keys[cell.state][x * self.cells + y]
+            self.frozen_counts[0][x] -= 1
+            self.frozen_counts[1][y] -= 1
+            self.frozen_lines[0][x] &= ~(1 << y)
+            self.frozen_lines[1][y] &= ~(1 << x)
+
     def freeze_blocked(self) -> None:
         """Freeze all blocked cells
         """
@@ -131,6 +486,110 @@ class Grid:
         [cell.clear() for cell in self.get_blocked]
 
 
+class BitGrid(Grid):
+    """Grid backend, that keeps frozen and blocked states as integer
+    bitboards. Bit of the cell (x, y) is x * cells + y
+    """
+
+    def __init__(self, cells: Optional[int] = None) -> None:
+        self.frozen: int = 0
+        self.blocked: int = 0
+        super().__init__(cells)
+
+    def bit(self, pos: tuple[int, int]) -> int:
+        """Get bit of cell with given position
+        """
+        return 1 << (pos[0] * self.cells + pos[1])
+
+    def mask(self, cells: list[Cell]) -> int:
+        """Get bitmask of given cells
+        """
+        mask = 0
+        for cell in cells:
+            mask |= self.bit(cell.pos)
+        return mask
+
+    def _get_cells(self, board: int) -> list[Cell]:
+        """Get cells of all set bits of the board
+        """
+        cells = []
+        while board:
+            low = board & -board
+            x, y = divmod(low.bit_length() - 1, self.cells)
+            cells.append(self.grid[x][y])
+            board ^= low
+        return cells
+
+    @property
+    def get_clear(self) -> list[Cell]:
+        """Get all clear cell
+        """
+        full = (1 << self.cells * self.cells) - 1
+        return self._get_cells(full & ~(self.frozen | self.blocked))
+
+    @property
+    def get_frozen(self) -> list[Cell]:
+        """Get all froxen cell
+        """
+        return self._get_cells(self.frozen)
+
+    @property
+    def get_blocked(self) -> list[Cell]:
+        """Get all blocked
+        """
+        return self._get_cells(self.blocked)
+
+    @property
+    def frozen_count(self) -> int:
+        """Count of frozen cells
+        """
+        return self.frozen.bit_count()
+
+    @property
+    def blocked_count(self) -> int:
+        """Count of blocked cells
+        """
+        return self.blocked.bit_count()
+
+    def is_clear(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position clear
+        """
+        return not (self.frozen | self.blocked) & self.bit(pos)
+
+    def is_frozen(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position frozen
+        """
+        return bool(self.frozen & self.bit(pos))
+
+    def is_blocked(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position blocked
+        """
+        return bool(self.blocked & self.bit(pos))
+
+    def has_frozen(self, figure_mask: FigureMask) -> bool:
+        """Has any of figure cells frozen. Frozen bitboard is shifted
+        to relative mask of figure
+        """
+        shift = figure_mask.shift
+        if shift >= 0:
+            return bool(self.frozen >> shift & figure_mask.mask)
+        return bool(self.frozen << -shift & figure_mask.mask)
+
+    def on_state_change(self, cell: Cell, state: CellState) -> None:
+        """Update bitboards before owned cell state is changed
+        """
+        super().on_state_change(cell, state)
+        bit = self.bit(cell.pos)
+        if state == CellState.FR0ZEN:
+            self.frozen |= bit
+        else:
+            self.frozen &= ~bit
+        if state == CellState.BLOCK:
+            self.blocked |= bit
+        else:
+            self.blocked &= ~bit
+
+
 class Window:
     """Represents 4x4 figure window
     """
@@ -151,8 +610,8 @@ class Window:
             self.move_direction = move_direction
         self._get_window: Optional[list[list[Cell | None]]] = None
         self._map_window: Optional[list[Cell]] = None
-        self._quarter: Optional[list[tuple[int, int]]] = None
-        self._window_figure_pos: Optional[list[tuple[int, int]]] = None
+        self._quarter: Optional[frozenset[tuple[int, int]]] = None
+        self._figure_mask: Optional[FigureMask] = None
 
     def __repr__(self) -> str:
         return f'Window top_left: {self.top_left}, orientation: {self.orientation.name} ' \
@@ -161,16 +620,20 @@ class Window:
     def _set_move_direction(self, top_left: tuple[int, int]) -> Direction:
         """Set move direction
         """
-        match top_left:
-            case _ if top_left in const.ARRIVE_LEFT:
-                return Direction.RIGHT
-            case _ if top_left in const.ARRIVE_RIGHT:
-                return Direction.LEFT
-            case _ if top_left in const.ARRIVE_TOP:
-                return Direction.DOWN
-            case _ if top_left in const.ARRIVE_BOTTOM:
-                return Direction.UP
-        raise ValueError
+        direction = self.grid.board.arrive_directions.get(top_left)
+        if direction is None:
+            raise ValueError
+        return direction
+
+    def relocate(self, top_left: tuple[int, int], orientation: FigureOrientation) -> None:
+        """Move window to new top left and orientation in place
+        and reset cached cells. Quarter is kept with move direction
+        """
+        self.top_left = top_left
+        self.orientation = orientation
+        self._get_window = None
+        self._map_window = None
+        self._figure_mask = None
 
     @property
     def get_window(self) -> list[list[Cell | None]]:
@@ -182,77 +645,63 @@ class Window:
                 y = row + self.top_left[1]
                 for col in range(4):
                     x = col + self.top_left[0]
-                    if (34 > x >= 0) and (34 > y >= 0):
+                    if (self.grid.cells > x >= 0) and (self.grid.cells > y >= 0):
                         self._get_window[row][col] = self.grid.grid[x][y]
         return self._get_window
 
     @property
-    def quarter(self) -> list[tuple[int, int]]:
+    def quarter(self) -> frozenset[tuple[int, int]]:
         """Get quarter on grid for current window
         """
         if self._quarter is None:
-            match self.move_direction:
-                case Direction.RIGHT:
-                    self._quarter = const.LEFT_QUARTER
-                case Direction.LEFT:
-                    self._quarter = const.RIGHT_QUARTER
-                case Direction.UP:
-                    self._quarter = const.BOTTOM_QUARTER
-                case Direction.DOWN:
-                    self._quarter = const.TOP_QUARTER
+            self._quarter = self.grid.board.quarters[self.move_direction]
         return self._quarter
 
+    @property
+    def figure_mask(self) -> FigureMask:
+        """Get precomputed figure mask for window
+        """
+        if self._figure_mask is None:
+            self._figure_mask = get_figure_mask(
+                self.orientation,
+                self.top_left,
+                self.grid.cells,
+                    )
+        return self._figure_mask
+
     @property
     def map_window(self) -> list[Cell]:
         """Get mwindow figure cells (only on grid cells)
         """
         if self._map_window is None:
-            self._map_window = []
-            for maps, cells in zip(self.orientation.value, self.get_window):
-                self._map_window.extend(
-                    [cell for m, cell in zip(maps, cells) if cell and m]
-                        )
+            self._map_window = self.grid.figure_cells(self.figure_mask)
         return self._map_window
 
     @property
-    def window_figure_pos(self) -> list[tuple[int, int]]:
+    def window_figure_pos(self) -> tuple[tuple[int, int], ...]:
         """Get window figure positions include offgrid positions
         """
-        if self._window_figure_pos is None:
-            self._window_figure_pos = []
-            for row in range(4):
-                y = row + self.top_left[1]
-                for col in range(4):
-                    x = col + self.top_left[0]
-                    if self.orientation.value[row][col]:
-                        self._window_figure_pos.append((x, y))
-        return self._window_figure_pos
+        return self.figure_mask.positions
 
     def has_frozen(self) -> bool:
         """Has figure frozen cells in mapped window
         """
-        for cell in self.map_window:
-            if cell.is_frozen:
-                return True
-        return False
+        return self.grid.has_frozen(self.figure_mask)
 
     def is_in_quarter(self) -> bool:
         """Is all figure positions is in quarter
         """
-        for pos in self.window_figure_pos:
-            if pos not in self.quarter:
-                return False
-        return True
+        return self.quarter.issuperset(self.window_figure_pos)
 
     def is_on_grid(self) -> bool:
         """Is figure on grid
         """
-        return len(self.map_window) > 0
+        return len(self.figure_mask.on_grid) > 0
 
     def is_full_on_grid(self) -> bool:
         """Is figure on grid completly
         """
-        return len(self.map_window) == 4
+        return len(self.figure_mask.on_grid) == 4
 
 
 class Figure:
@@ -305,37 +754,56 @@ class Figure:
         return new_window
 
     def rotate_figure(self, direction: Direction) -> Optional[Window]:
-        """Rotates a figure in a given rotation side
+        """Rotates a figure in a given rotation side. Square and figure
+        rotated to wrong direction keep the window
         """
-        try:
-            return Window(
+        orientation = ROTATIONS.get((self.window.orientation, direction))
+        if orientation is None or orientation is self.window.orientation:
+            return self.window
+        return Window(
             self.window.top_left,
-            FigureOrientation[
-                self.shape + '_' + self._choose_orientation(direction).name
-                    ],
+            orientation,
             self.window.grid,
             self.window.move_direction
                 )
-        except ValueError:
-            return self.window
 
-    def _choose_orientation(self, direction: Direction) -> Orientation:
-        """Choose orientation of figure after rotation
-        """
-        if self.window.orientation == FigureOrientation.O:
-            raise ValueError("Square can't be rotated - is a square!")
-        ind = Orientation[self.window.orientation.name[2]].value
-        match direction, ind:
-            case Direction.RIGHT, 4:
-                return Orientation(1)
-            case Direction.RIGHT, o if o < 4:
-                return Orientation(ind+1)
-            case Direction.LEFT, 1:
-                return Orientation(4)
-            case Direction.LEFT, o if o > 1:
-                return Orientation(ind-1)
-            case _:
-                raise ValueError('Wrong direction!')
+    def moved_state(self, direction: Direction) -> Optional[State]:
+        """Get state of figure moved one step in a given direction
+        without window construction
+        """
+        if OPPOSITE[direction] is self.window.move_direction:
+            return
+        x, y = self.window.top_left
+        step_x, step_y = STEPS[direction]
+        return (x + step_x, y + step_y), self.window.orientation
+
+    def rotated_state(self, direction: Direction) -> State:
+        """Get state of figure rotated in a given rotation side
+        without window construction. Square keeps the state
+        """
+        orientation = ROTATIONS.get((self.window.orientation, direction))
+        return self.window.top_left, orientation or self.window.orientation
+
+    def is_valid_state(self, state: Optional[State], on_grid: bool = False) -> bool:
+        """Returns true if figure in state is valid by the same rules
+        as is_valid_figure. With on_grid figure must have cells on grid
+        """
+        if state is None:
+            return False
+        window = self.window
+        figure_mask = get_figure_mask(state[1], state[0], window.grid.cells)
+        return not window.grid.has_frozen(figure_mask) \
+            and window.quarter.issuperset(figure_mask.positions) \
+            and (not on_grid or len(figure_mask.on_grid) > 0)
+
+    def place_state(self, state: State) -> None:
+        """Block cells for figure in state and relocate window to it
+        """
+        grid = self.window.grid
+        grid.clear_blocked()
+        self.window.relocate(*state)
+        for cell in self.window.map_window:
+            cell.block()
 
     def block_figure(self, window: Window) -> None:
         """Block cells for figure
@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import NamedTuple, Optional
 
 
 class BaseEnum(Enum):
@@ -32,6 +33,32 @@ class Direction(BaseEnum):
     DOWN = auto()
 
 
+class Action(BaseEnum):
+    """Player actions for one game tick
+    """
+    LEFT = auto()
+    RIGHT = auto()
+    UP = auto()
+    DOWN = auto()
+    ROTATE_LEFT = auto()
+    ROTATE_RIGHT = auto()
+
+
+# action codes: 0 is no action, n is Action(n)
+ACTIONS: tuple[Optional[Action], ...] = (None, *Action)
+
+
+class Event(BaseEnum):
+    """Game state transitions, produced by rules for effects consumers
+    """
+    MOVED = auto()
+    ROTATED = auto()
+    LOCKED = auto()
+    LINES_CLEARED = auto()
+    SPEED_UP = auto()
+    GAME_OVER = auto()
+
+
 class Orientation(BaseEnum):
     """Block orientation
     """
@@ -252,16 +279,7 @@ def get_next_figure_grid_pos() -> list[list[tuple[int, int]]]:
 class GameConst:
     """Game constants"""
 
-    ARRIVE_TOP: list[tuple[int, int]] = [(x, -4) for x in range(30)]
-    ARRIVE_BOTTOM: list[tuple[int, int]] = [(x, 34) for x in range(30)]
-    ARRIVE_LEFT: list[tuple[int, int]] = [(-4, y) for y in range(30)]
-    ARRIVE_RIGHT: list[tuple[int, int]] = [(34, y) for y in range(30)]
-    ARRIVE = ARRIVE_TOP + ARRIVE_BOTTOM + ARRIVE_LEFT + ARRIVE_RIGHT
-
-    LEFT_QUARTER: list[tuple[int, int]] = [(x, y) for x in range(-4, 17) for y in range(0, 34)]
-    RIGHT_QUARTER: list[tuple[int, int]] = [(x, y) for x in range(17, 37) for y in range(0, 34)]
-    BOTTOM_QUARTER: list[tuple[int, int]] = [(x, y) for x in range(0, 34) for y in range(17, 37)]
-    TOP_QUARTER: list[tuple[int, int]] = [(x, y) for x in range(0, 34) for y in range(-4, 17)]
+    CELLS: int = 34
 
     NEXT_FIGURE_GRID: tuple[list[int], list[int]] = [n for n in range(219, 249, 6)], \
         [n for n in range(135, 165, 6)]
@@ -277,3 +295,79 @@ class GameConst:
     MAX_GAME_SPEED: int = 22
     GAME_SPEED_LIMIT: int = 30
     SPEED_MODIFICATOR: int = 1000
+
+
+class Board(NamedTuple):
+    """Geometry and line lenght rules of square board with given count
+    of cells by side. Figure arrives at spawn edge out of the board
+    and moves to the quarter of the opposite half
+    """
+    cells: int
+    arrive_top: list[tuple[int, int]]
+    arrive_bottom: list[tuple[int, int]]
+    arrive_left: list[tuple[int, int]]
+    arrive_right: list[tuple[int, int]]
+    arrive: list[tuple[int, int]]
+    # arrive position: figure move direction
+    arrive_directions: dict[tuple[int, int], Direction]
+    # figure move direction: quarter of figure
+    quarters: dict[Direction, frozenset[tuple[int, int]]]
+    start_clear_lenght: int
+    max_clear_lenght: int
+
+
+def make_board(cells: int) -> Board:
+    """Make board geometry. Line lenght rules are scaled from the rules
+    of GameConst.CELLS board
+    """
+    if cells < 8:
+        raise ValueError('Board must have at least 8 cells by side!')
+    half = cells // 2
+    arrive_top = [(x, -4) for x in range(cells - 4)]
+    arrive_bottom = [(x, cells) for x in range(cells - 4)]
+    arrive_left = [(-4, y) for y in range(cells - 4)]
+    arrive_right = [(cells, y) for y in range(cells - 4)]
+    arrive_directions = {
+        **{pos: Direction.DOWN for pos in arrive_top},
+        **{pos: Direction.UP for pos in arrive_bottom},
+        **{pos: Direction.RIGHT for pos in arrive_left},
+        **{pos: Direction.LEFT for pos in arrive_right},
+            }
+    quarters = {
+        Direction.RIGHT: frozenset(
+            (x, y) for x in range(-4, half) for y in range(0, cells)
+                ),
+        Direction.LEFT: frozenset(
+            (x, y) for x in range(half, cells + 3) for y in range(0, cells)
+                ),
+        Direction.UP: frozenset(
+            (x, y) for x in range(0, cells) for y in range(half, cells + 3)
+                ),
+        Direction.DOWN: frozenset(
+            (x, y) for x in range(0, cells) for y in range(-4, half)
+                ),
+            }
+    return Board(
+        cells,
+        arrive_top,
+        arrive_bottom,
+        arrive_left,
+        arrive_right,
+        arrive_top + arrive_bottom + arrive_left + arrive_right,
+        arrive_directions,
+        quarters,
+        max(1, GameConst.START_CLEAR_LENGTH * cells // GameConst.CELLS),
+        max(2, GameConst.MAX_CLEAR_LENGHT * cells // GameConst.CELLS),
+            )
+
+
+BOARDS: dict[int, Board] = {}
+
+
+def get_board(cells: int = GameConst.CELLS) -> Board:
+    """Get board geometry, make and store it at first call
+    """
+    board = BOARDS.get(cells)
+    if board is None:
+        board = BOARDS[cells] = make_board(cells)
+    return board
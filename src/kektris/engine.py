@@ -0,0 +1,290 @@
+import random
+from typing import Any, Optional, Callable, NamedTuple
+from blocks import Grid, Figure, Window, State
+from constraints import Action, Direction, Event, FigureOrientation, Board, get_board
+from constraints import GameConst as const
+
+
+class ClearResult(NamedTuple):
+    """Aggregated result of lines clear cascade
+    """
+    cells: int = 0
+    lines: int = 0
+    score: int = 0
+
+
+class GameEvent(NamedTuple):
+    """Game state transition with its value: ClearResult for cleared lines,
+    new speed for speed up
+    """
+    event: Event
+    value: Any = None
+
+
+class Engine:
+    """Headless kektris rules: grid, figures, scoring and gravity.
+    Knows nothing about pyxel, so it can be simulated without a window.
+    Events are queued only if record_events is set, so headless runs
+    don't collect them
+    """
+    record_events: bool = False
+
+    def __init__(
+        self,
+        grid_class: Callable[[], Grid] = Grid,
+        seed: Optional[int] = None,
+            ) -> None:
+        self.grid_class = grid_class
+        self.random: Optional[random.Random] = random.Random(seed) \
+            if seed is not None else None
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        """Reset game state. Random stream of the game is reseeded
+        with given seed. Engine without seed uses random module functions
+        """
+        if seed is not None:
+            self.random = random.Random(seed)
+
+        # grid
+        self.grid: Grid = self.grid_class()
+
+        # score parameters
+        self.score: int = 0
+        self.speed: int = 0
+        self.line_lenght: int = self.grid.board.start_clear_lenght
+        self.score_color_timeout = const.COLOR_TIMOUT
+        self.speed_color_timeout = const.COLOR_TIMOUT
+        self.line_color_timeout = const.COLOR_TIMOUT
+
+        self.figure = self.arrive_figure()
+        self.figure_next = self.arrive_figure()
+
+        # game
+        self.frame_count_from_last_move: int = const.START_FRAME_COUNT
+        self.is_game_over: bool = False
+        self.events: list[GameEvent] = []
+
+    def step(self, action: Optional[Action] = None) -> None:
+        """Advance game by one tick with given player action
+        """
+        if self.is_game_over:
+            return
+
+        move_direction = None
+        rotate_direction = None
+        match action:
+            case Action.LEFT:
+                move_direction = Direction.LEFT
+            case Action.RIGHT:
+                move_direction = Direction.RIGHT
+            case Action.DOWN:
+                move_direction = Direction.DOWN
+            case Action.UP:
+                move_direction = Direction.UP
+            case Action.ROTATE_LEFT:
+                rotate_direction = Direction.LEFT
+            case Action.ROTATE_RIGHT:
+                rotate_direction = Direction.RIGHT
+
+        self.move_figure(move_direction, self.figure.moved_state, Event.MOVED)
+        self.move_figure(rotate_direction, self.figure.rotated_state, Event.ROTATED)
+
+        if self.frame_count_from_last_move == const.GAME_SPEED_LIMIT - self.speed:
+            state = self.figure.moved_state(self.figure.window.move_direction)
+            self.final_moves_and_game_checks(state)
+            return
+
+        self.frame_count_from_last_move += 1
+
+    def idle(self, frames: int) -> None:
+        """Advance game by given count of ticks without player action.
+        Ticks between gravity moves are skipped at once
+        """
+        while frames > 0 and not self.is_game_over:
+            wait = const.GAME_SPEED_LIMIT - self.speed - self.frame_count_from_last_move
+            if wait > 0:
+                skip = min(wait, frames)
+                self.frame_count_from_last_move += skip
+                frames -= skip
+            else:
+                self.step()
+                frames -= 1
+
+    def emit(self, event: Event, value: Any = None) -> None:
+        """Queue game event for consumers
+        """
+        if self.record_events:
+            self.events.append(GameEvent(event, value))
+
+    def drain_events(self) -> list[GameEvent]:
+        """Get events queued since the last call
+        """
+        events, self.events = self.events, []
+        return events
+
+    @staticmethod
+    def generate_figure_start_position(
+        rng: Optional[random.Random] = None,
+        board: Board = get_board(),
+            ) -> tuple[tuple[int, int], FigureOrientation]:
+        """Genrate random start position with given random stream
+        or with random module functions
+        """
+        choice = random.choice if rng is None else rng.choice
+        return (
+            choice(board.arrive),
+            choice(FigureOrientation.get_includes())
+                )
+
+    def arrive_figure(self) -> Figure:
+        """Arrive figure at random
+        """
+        top_left, orientation = self.generate_figure_start_position(
+            self.random,
+            self.grid.board,
+                )
+        window = Window(top_left, orientation, self.grid)
+        return Figure(window)
+
+    def push_next_figure(self) -> None:
+        """Push figure_next to replace current an arrive next
+        """
+        self.figure = self.figure_next
+        self.figure_next = self.arrive_figure()
+
+    def find_line(self) -> Optional[list[tuple[int, int]]]:
+        """Find line ready to clear
+        """
+        return self.grid.find_line(self.line_lenght)
+
+    def get_shift(self, shift_x: int, shift_y: int) -> tuple[int, int]:
+        """Get shift for frozen to move it when clear line
+        """
+        match self.figure.window.move_direction:
+            case Direction.RIGHT:
+                shift_x -= 1
+            case Direction.LEFT:
+                shift_x += 1
+            case Direction.UP:
+                shift_y += 1
+            case Direction.DOWN:
+                shift_y -= 1
+        return shift_x, shift_y
+
+    def get_shifted_frozen(
+        self,
+        line: list[tuple[int, int]]
+            ) -> list[tuple[int, int]]:
+        """Get shifted frozen positions to move cells when clear line
+        """
+        return self.grid.get_shifted_frozen(
+            line,
+            self.get_shift(0, 0),
+            self.figure.window.quarter,
+                )
+
+    def move_shifted_frozen(self, shifted: list[tuple[int, int]]) -> None:
+        """Move frozen rows after clear
+        """
+        self.grid.move_shifted_frozen(
+            shifted,
+            self.get_shift(0, 0),
+            self.figure.window.quarter,
+                )
+
+    def move_figure(
+        self,
+        direction: Optional[Direction],
+        operation,
+        event: Event = Event.MOVED,
+            ) -> None:
+        """Move or rotate figure. Operation gets candidate state, window
+        is relocated only if state is valid
+        """
+        if direction and self.figure.window.is_on_grid():
+            state: Optional[State] = operation(direction)
+            if self.figure.is_valid_state(state, on_grid=True):
+                self.figure.place_state(state)
+                self.emit(event)
+
+    def clear_lines(self) -> ClearResult:
+        """Clear lines ready to clear and lines made by shifted frozen
+        cells in one loop. Score, speed and line lenght are changed
+        after every cleared line, so the next line is searched
+        with changed line lenght
+        """
+        score = self.score
+        speed = self.speed
+        cells = 0
+        lines = 0
+        shift = self.get_shift(0, 0)
+        quarter = self.figure.window.quarter
+        while True:
+            line = self.find_line()
+            if not line:
+                break
+            for pos in line:
+                self.grid.grid[pos[0]][pos[1]].clear()
+            cells += len(line)
+            lines += 1
+            self.change_score(len(line))
+            self.change_speed(len(line))
+            self.change_line_lenght(len(line))
+            self.grid.shift_frozen(line, shift, quarter)
+        result = ClearResult(cells, lines, self.score - score)
+        if cells:
+            self.emit(Event.LINES_CLEARED, result)
+        if self.speed > speed:
+            self.emit(Event.SPEED_UP, self.speed)
+        return result
+
+    def final_moves_and_game_checks(self, state: Optional[State]) -> None:
+        """Move figures and check game conditions when count of frames
+        from lst move is overflow
+        """
+        if self.figure.is_valid_state(state):
+            self.figure.place_state(state)
+            self.emit(Event.MOVED)
+        elif not self.figure.window.is_full_on_grid():
+            self.is_game_over = True
+            self.emit(Event.GAME_OVER)
+        else:
+            if self.grid.get_blocked:
+                self.emit(Event.LOCKED)
+                self.grid.freeze_blocked()
+            self.clear_lines()
+            self.push_next_figure()
+        self.frame_count_from_last_move = const.START_FRAME_COUNT
+
+    def change_score(self, cells: int = 1) -> None:
+        """Change score for cleared cells and set flash timeout
+        """
+        self.score += const.PRIZE_BY_CLEAR * cells
+        self.score_color_timeout = const.COLOR_TIMOUT
+
+    def change_speed(self, steps: int = 1) -> None:
+        """Change speed by up to steps and set flash timeout
+        """
+        speed = min(
+            self.score // const.SPEED_MODIFICATOR,
+            const.MAX_GAME_SPEED,
+            self.speed + steps,
+                )
+        if speed > self.speed:
+            self.speed = speed
+            self.speed_color_timeout = const.COLOR_TIMOUT
+
+    def change_line_lenght(self, steps: int = 1) -> None:
+        """Change line lenght every X points to maximum y
+        by up to steps
+        """
+        board = self.grid.board
+        line_lenght = min(
+            self.score // const.LENGHT_MODIFICATOR + board.start_clear_lenght,
+            board.max_clear_lenght,
+            self.line_lenght + steps,
+                )
+        if line_lenght > self.line_lenght:
+            self.line_lenght = line_lenght
+            self.line_color_timeout = const.COLOR_TIMOUT
@@ -0,0 +1,135 @@
+"""Gym-style environments for agents. Requires numpy, that isn't a game
+dependency: pip install numpy
+
+Observation is a dict of arrays:
+    board: (cells, cells) uint8, 0 is clear, 1 is blocked, 2 is frozen cell
+    figure: current figure orientation code, index of FigureOrientation
+    next_figure: next figure orientation code
+    move_direction: Direction value of current figure
+Vectorized environment returns the same arrays with leading games axis.
+Action is action code: 0 is no action, n is Action(n). Reward is score gain
+"""
+from functools import partial
+from typing import Any, Optional, Sequence, TypeAlias
+import numpy as np
+from engine import Engine
+from ndgrid import NumpyGrid, CLEAR
+from batch import BatchEngine, ORIENTATION_CODES
+from constraints import ACTIONS, Action
+
+
+Observation: TypeAlias = dict[str, np.ndarray]
+
+
+class KektrisEnv:
+    """Environment of one headless game
+    """
+    action_count: int = len(ACTIONS)
+
+    def __init__(self, cells: int = NumpyGrid.cells) -> None:
+        self.engine = Engine(partial(NumpyGrid, cells=cells))
+        self.steps: int = 0
+
+    def reset(self, seed: Optional[int] = None) -> Observation:
+        """Start new game and get its first observation
+        """
+        self.engine.reset(seed)
+        self.steps = 0
+        return self.observe()
+
+    def observe(self) -> Observation:
+        """Get observation of current game state
+        """
+        engine = self.engine
+        window = engine.figure.window
+        return {
+            'board': engine.grid.state - CLEAR,
+            'figure': np.int8(ORIENTATION_CODES[window.orientation]),
+            'next_figure': np.int8(
+                ORIENTATION_CODES[engine.figure_next.window.orientation]
+                    ),
+            'move_direction': np.int8(window.move_direction.value),
+                }
+
+    def info(self) -> dict[str, Any]:
+        """Get game parameters
+        """
+        return {
+            'score': self.engine.score,
+            'speed': self.engine.speed,
+            'line_lenght': self.engine.line_lenght,
+            'steps': self.steps,
+                }
+
+    def step(
+        self,
+        action: int | Optional[Action],
+            ) -> tuple[Observation, int, bool, dict[str, Any]]:
+        """Advance game by one tick with action and get
+        observation, reward, done and info
+        """
+        if not isinstance(action, Action) and action is not None:
+            action = ACTIONS[action]
+        score = self.engine.score
+        self.engine.step(action)
+        self.steps += 1
+        return (
+            self.observe(),
+            self.engine.score - score,
+            self.engine.is_game_over,
+            self.info(),
+                )
+
+
+class KektrisVecEnv:
+    """Environment of N headless games stepped in lockstep by BatchEngine.
+    Ended games are reset at once: observation is the first one
+    of the new game, info keeps parameters of the ended game
+    """
+    action_count: int = len(ACTIONS)
+
+    def __init__(self, n: int, cells: int = NumpyGrid.cells) -> None:
+        self.batch = BatchEngine(n, cells=cells)
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+    def reset(self, seed: Optional[int] = None) -> Observation:
+        """Start new games and get their first observations. With given
+        seed the game i is seeded with seed + i
+        """
+        self.batch.reset(seed)
+        return self.observe()
+
+    def observe(self) -> Observation:
+        """Get observations of all games
+        """
+        return {
+            'board': self.batch.boards - CLEAR,
+            'figure': self.batch.orientations.copy(),
+            'next_figure': self.batch.next_orientations.copy(),
+            'move_direction': self.batch.move_directions.copy(),
+                }
+
+    def step(
+        self,
+        actions: Sequence[Optional[Action]] | np.ndarray,
+            ) -> tuple[Observation, np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+        """Advance all games by one tick with actions and get
+        observations, rewards, dones and info
+        """
+        batch = self.batch
+        scores = batch.scores.copy()
+        batch.step(actions)
+        rewards = batch.scores - scores
+        dones = batch.game_over.copy()
+        info = {
+            'score': batch.scores.copy(),
+            'speed': batch.speeds.copy(),
+            'line_lenght': batch.line_lenghts.copy(),
+                }
+        ended = np.flatnonzero(dones).tolist()
+        for i in ended:
+            batch.engines[i].reset()
+        batch.update_vectors(ended)
+        return self.observe(), rewards, dones, info
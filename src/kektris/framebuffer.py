@@ -0,0 +1,175 @@
+"""Headless NumPy framebuffer with pyxel drawing api. Requires numpy,
+that isn't a game dependency: pip install numpy
+"""
+from typing import Optional
+import numpy as np
+import render
+from engine import Engine
+
+
+# pyxel default palette as 0xRRGGBB
+PALETTE: tuple[int, ...] = (
+    0x000000, 0x2b335f, 0x7e2072, 0x19959c, 0x8b4852, 0x395c98, 0xa9c1ff, 0xeeeeee,
+    0xd4186c, 0xd38441, 0xe9c35b, 0x70c6a9, 0x7696de, 0xa3a3a3, 0xff9798, 0xedc7b0,
+        )
+PALETTE_RGB: np.ndarray = np.array(
+    [[(c >> 16) & 0xff, (c >> 8) & 0xff, c & 0xff] for c in PALETTE],
+    dtype=np.uint8,
+        )
+
+# pyxel 4x6 font glyphs of chars from ' ' to '~', bit y*4+x is pixel (x, y)
+FONT_WIDTH = 4
+FONT_HEIGHT = 6
+FONT: tuple[int, ...] = (
+    0x0, 0x20222, 0x55, 0x57575, 0x23636, 0x41241, 0x35252, 0x22,
+    0x42224, 0x12221, 0x52725, 0x2720, 0x12000, 0x700, 0x20000, 0x11244,
+    0x35556, 0x22232, 0x71243, 0x34243, 0x44755, 0x34317, 0x75716, 0x11247,
+    0x75757, 0x34757, 0x2020, 0x12020, 0x42124, 0x7070, 0x12421, 0x20247,
+    0x61552, 0x55752, 0x35353, 0x61116, 0x35553, 0x71717, 0x11717, 0x65716,
+    0x55755, 0x72227, 0x25444, 0x55355, 0x71111, 0x55775, 0x55553, 0x25552,
+    0x11353, 0x67552, 0x53753, 0x34216, 0x22227, 0x65555, 0x25555, 0x57755,
+    0x55255, 0x22255, 0x71247, 0x62226, 0x44211, 0x32223, 0x52, 0x70000,
+    0x21, 0x65560, 0x35531, 0x61160, 0x65564, 0x63560, 0x22724, 0x247560,
+    0x55531, 0x22202, 0x254404, 0x53351, 0x72223, 0x57770, 0x55530, 0x25520,
+    0x135530, 0x465560, 0x11160, 0x36360, 0x62272, 0x65550, 0x25550, 0x77550,
+    0x52250, 0x246550, 0x72470, 0x62326, 0x22222, 0x32623, 0x36,
+        )
+GLYPHS: list[np.ndarray] = [
+    np.array(
+        [[bool(glyph >> (y * FONT_WIDTH + x) & 1) for x in range(FONT_WIDTH)]
+         for y in range(FONT_HEIGHT)]
+            )
+    for glyph in FONT
+        ]
+
+
+class FrameBuffer:
+    """Palette image as uint8 array indexed as pixels[y, x], that draws
+    like pyxel screen or pyxel image. Image banks for blt are other
+    framebuffers given by bank number, missing banks (i.e. the logo,
+    that is loaded from png by the game) are skipped
+    """
+
+    def __init__(
+        self,
+        width: int = 256,
+        height: int = 256,
+        banks: Optional[dict[int, 'FrameBuffer']] = None,
+            ) -> None:
+        self.width = width
+        self.height = height
+        self.pixels: np.ndarray = np.zeros((height, width), dtype=np.uint8)
+        self.banks = banks or {}
+
+    def _fill(self, x: int, y: int, w: int, h: int, col: int) -> None:
+        """Fill clipped rectangle
+        """
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + w, self.width), min(y + h, self.height)
+        if x2 > x1 and y2 > y1:
+            self.pixels[y1:y2, x1:x2] = col
+
+    def cls(self, col: int) -> None:
+        """Fill whole image with color
+        """
+        self.pixels[:] = col
+
+    def pget(self, x: int, y: int) -> int:
+        """Get color of pixel
+        """
+        return int(self.pixels[y, x])
+
+    def pset(self, x: int, y: int, col: int) -> None:
+        """Set color of pixel
+        """
+        if self.width > x >= 0 and self.height > y >= 0:
+            self.pixels[y, x] = col
+
+    def line(self, x1: int, y1: int, x2: int, y2: int, col: int) -> None:
+        """Draw line
+        """
+        if x1 == x2 or y1 == y2:
+            self._fill(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1, col)
+            return
+        steps = max(abs(x2 - x1), abs(y2 - y1))
+        for k in range(steps + 1):
+            self.pset(
+                int(x1 + (x2 - x1) * k / steps + 0.5),
+                int(y1 + (y2 - y1) * k / steps + 0.5),
+                col,
+                    )
+
+    def rect(self, x: int, y: int, w: int, h: int, col: int) -> None:
+        """Draw filled rectangle
+        """
+        self._fill(x, y, w, h, col)
+
+    def rectb(self, x: int, y: int, w: int, h: int, col: int) -> None:
+        """Draw rectangle border
+        """
+        self._fill(x, y, w, 1, col)
+        self._fill(x, y + h - 1, w, 1, col)
+        self._fill(x, y, 1, h, col)
+        self._fill(x + w - 1, y, 1, h, col)
+
+    def text(self, x: int, y: int, s: str, col: int) -> None:
+        """Draw text with pyxel font
+        """
+        for char in s:
+            code = ord(char) - 32
+            if 0 <= code < len(GLYPHS):
+                glyph = GLYPHS[code]
+                x1, y1 = max(x, 0), max(y, 0)
+                x2 = min(x + FONT_WIDTH, self.width)
+                y2 = min(y + FONT_HEIGHT, self.height)
+                if x2 > x1 and y2 > y1:
+                    area = self.pixels[y1:y2, x1:x2]
+                    area[glyph[y1-y:y2-y, x1-x:x2-x]] = col
+            x += FONT_WIDTH
+
+    def blt(
+        self,
+        x: int,
+        y: int,
+        img: 'int | FrameBuffer',
+        u: int,
+        v: int,
+        w: int,
+        h: int,
+        colkey: Optional[int] = None,
+            ) -> None:
+        """Copy region of other framebuffer or bank. Pixels of colkey
+        color are transparent
+        """
+        if isinstance(img, int):
+            img = self.banks.get(img)
+            if img is None:
+                return
+        source = img.pixels[v:v+h, u:u+w]
+        x1, y1 = max(x, 0), max(y, 0)
+        x2 = min(x + source.shape[1], self.width)
+        y2 = min(y + source.shape[0], self.height)
+        if x2 <= x1 or y2 <= y1:
+            return
+        source = source[y1-y:y2-y, x1-x:x2-x]
+        area = self.pixels[y1:y2, x1:x2]
+        if colkey is None:
+            area[:] = source
+        else:
+            mask = source != colkey
+            area[mask] = source[mask]
+
+    def to_rgb(self) -> np.ndarray:
+        """Get (height, width, 3) RGB image
+        """
+        return PALETTE_RGB[self.pixels]
+
+
+def render_frame(engine: Engine, frame_count: int = 0, **kwargs) -> np.ndarray:
+    """Render full game frame of engine state to palette image
+    of board layout size
+    """
+    layout = render.get_layout(engine.grid.cells)
+    frame = FrameBuffer(layout.width, layout.height)
+    render.draw_frame(frame, engine, frame_count, **kwargs)
+    return frame.pixels
@@ -0,0 +1,362 @@
+"""NumPy grid backend. Requires numpy, that isn't a game dependency:
+pip install numpy
+"""
+from typing import Optional, Iterator
+import numpy as np
+from blocks import Cell, Grid, FigureMask, Pos, intern_pos, get_zobrist_keys
+from constraints import CellState, Board, get_board
+
+
+CLEAR = CellState.CLEAR.value
+BLOCK = CellState.BLOCK.value
+FROZEN = CellState.FR0ZEN.value
+STATES = {state.value: state for state in CellState}
+QUARTER_MASKS: dict[tuple[int, frozenset[tuple[int, int]]], np.ndarray] = {}
+ZOBRIST_ARRAYS: dict[int, np.ndarray] = {}
+
+
+def get_zobrist_array(cells: int) -> np.ndarray:
+    """Get uint64 array of zobrist keys indexed by [state value, x, y]
+    """
+    keys = ZOBRIST_ARRAYS.get(cells)
+    if keys is None:
+        keys = np.zeros((max(STATES) + 1, cells, cells), dtype=np.uint64)
+        for state, state_keys in get_zobrist_keys(cells).items():
+            keys[state.value] = np.array(state_keys, dtype=np.uint64).reshape(cells, cells)
+        ZOBRIST_ARRAYS[cells] = keys
+    return keys
+
+
+def shift_mask(mask: np.ndarray, shift: tuple[int, int]) -> np.ndarray:
+    """Shift boolean mask by (dx, dy). Cells moved out of grid are lost
+    """
+    shifted = np.zeros_like(mask)
+    dx, dy = shift
+    n, m = mask.shape
+    if abs(dx) >= n or abs(dy) >= m:
+        return shifted
+    shifted[max(dx, 0):n+min(dx, 0), max(dy, 0):m+min(dy, 0)] = \
+        mask[max(-dx, 0):n-max(dx, 0), max(-dy, 0):m-max(dy, 0)]
+    return shifted
+
+
+class NumpyCell(Cell):
+    """Cell view over the state array of NumpyGrid
+    """
+    __slots__ = ()
+
+    def __init__(self, x: int, y: int, grid: 'NumpyGrid') -> None:
+        self.x = x
+        self.y = y
+        self.grid = grid
+        self._pos = intern_pos(x, y)
+
+    @property
+    def state(self) -> CellState:
+        return STATES[self.grid.state.item(self._pos)]
+
+    @state.setter
+    def state(self, state: CellState) -> None:
+        self.grid.state[self._pos] = state.value
+
+    def _set_state(self, state: CellState) -> None:
+        """Set state to the grid array
+        """
+        self.grid.set_cell_state(self, state)
+
+
+class CellRow:
+    """Row of cell views, made on access
+    """
+
+    def __init__(self, grid: 'NumpyGrid', x: int) -> None:
+        self.grid = grid
+        self.x = x
+
+    def __len__(self) -> int:
+        return self.grid.cells
+
+    def __getitem__(self, y: int) -> NumpyCell:
+        return NumpyCell(self.x, range(self.grid.cells)[y], self.grid)
+
+    def __iter__(self) -> Iterator[NumpyCell]:
+        return (NumpyCell(self.x, y, self.grid) for y in range(self.grid.cells))
+
+
+class CellViews:
+    """Grid matrix of cell views, indexed as grid[x][y]. Views are made
+    on access, so the grid doesn't keep a cell object per position
+    """
+
+    def __init__(self, grid: 'NumpyGrid') -> None:
+        self.grid = grid
+
+    def __len__(self) -> int:
+        return self.grid.cells
+
+    def __getitem__(self, x: int) -> CellRow:
+        return CellRow(self.grid, range(self.grid.cells)[x])
+
+    def __iter__(self) -> Iterator[CellRow]:
+        return (CellRow(self.grid, x) for x in range(self.grid.cells))
+
+
+class NumpyGrid(Grid):
+    """Grid backend with uint8 state array. Freezing and shifting of frozen
+    cells are bulk array operations, lines are searched only among lines
+    touched by frozen cells.
+    Given state array (i.e. a view of stacked boards) is cleared and used
+    as grid storage, board size is the size of given array. Zobrist hashes,
+    dirty cells, blocked cells and touched lines are updated by cells
+    and bulk operations, so states are changed only through them.
+    Blocked cells are got, frozen and cleared by blocked cells index
+    as in Grid, without array scan
+    """
+
+    def __init__(
+        self,
+        state: Optional[np.ndarray] = None,
+        cells: Optional[int] = None,
+            ) -> None:
+        if state is not None:
+            cells = state.shape[0]
+        if cells is not None:
+            self.cells = cells
+        if state is None:
+            state = np.empty((self.cells, self.cells), dtype=np.uint8)
+        state[:] = CLEAR
+        self.state: np.ndarray = state
+        self.board: Board = get_board(self.cells)
+        self.zobrist_keys = get_zobrist_keys(self.cells)
+        self.zobrist_values: dict[int, tuple[int, ...]] = {
+            state.value: keys for state, keys in self.zobrist_keys.items()
+                }
+        self.board_hash: int = 0
+        self.frozen_hash: int = 0
+        self.touched_lines: tuple[set[int], set[int]] = (set(), set())
+        self.dirty: set[Pos] = set()
+        self.blocked_cells: dict[Pos, Cell] = {}
+        self.grid = self._make_grid()
+
+    def _make_grid(self) -> CellViews:
+        """Make grid matrix of cell views
+        """
+        return CellViews(self)
+
+    def _get_cells(self, mask: np.ndarray) -> list[Cell]:
+        """Get cells of mask in x, y order
+        """
+        return [NumpyCell(x, y, self) for x, y in np.argwhere(mask).tolist()]
+
+    @property
+    def get_clear(self) -> list[Cell]:
+        """Get all clear cell
+        """
+        return self._get_cells(self.state == CLEAR)
+
+    @property
+    def get_frozen(self) -> list[Cell]:
+        """Get all froxen cell
+        """
+        return self._get_cells(self.state == FROZEN)
+
+    @property
+    def frozen_counts(self) -> tuple[np.ndarray, np.ndarray]:
+        """Frozen cells count per lines of both dimensions
+        """
+        frozen = self.state == FROZEN
+        return frozen.sum(axis=1), frozen.sum(axis=0)
+
+    def is_clear(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position clear
+        """
+        return self.state[pos] == CLEAR
+
+    def is_frozen(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position frozen
+        """
+        return self.state[pos] == FROZEN
+
+    def is_blocked(self, pos: tuple[int, int]) -> bool:
+        """Is cell with given position blocked
+        """
+        return self.state[pos] == BLOCK
+
+    def has_frozen(self, figure_mask: FigureMask) -> bool:
+        """Has any of figure cells frozen
+        """
+        for pos in figure_mask.on_grid:
+            if self.state.item(pos) == FROZEN:
+                return True
+        return False
+
+    def figure_cells(self, figure_mask: FigureMask) -> list[Cell]:
+        """Get views of figure cells on grid
+        """
+        return [NumpyCell(x, y, self) for x, y in figure_mask.on_grid]
+
+    def _line(self, dimension: int, n: int) -> np.ndarray:
+        """Get frozen line with pos[dimension] == n
+        """
+        if dimension:
+            return self.state[:, n] == FROZEN
+        return self.state[n] == FROZEN
+
+    def frozen_line(self, dimension: int, n: int) -> int:
+        """Get frozen bitmask of line with pos[dimension] == n.
+        Bit k of the mask is set if the k-th cell of the line is frozen
+        """
+        mask = 0
+        for k in np.flatnonzero(self._line(dimension, n)).tolist():
+            mask |= 1 << k
+        return mask
+
+    def find_line(self, line_lenght: int) -> Optional[list[tuple[int, int]]]:
+        """Find line ready to clear. Only lines touched by frozen cells
+        since the last search are inspected, as in Grid
+        """
+        for dim in [0, 1]:
+            touched = self.touched_lines[dim]
+            for n in sorted(touched):
+                if np.count_nonzero(self._line(dim, n)) >= line_lenght:
+                    line = self.get_line_to_clear(dim, n, line_lenght)
+                    if line:
+                        return line
+                touched.discard(n)
+
+    def _quarter_mask(self, quarter: frozenset[tuple[int, int]]) -> np.ndarray:
+        """Get boolean on grid mask of quarter
+        """
+        mask = QUARTER_MASKS.get((self.cells, quarter))
+        if mask is None:
+            mask = np.zeros((self.cells, self.cells), dtype=bool)
+            for x, y in quarter:
+                if (self.cells > x >= 0) and (self.cells > y >= 0):
+                    mask[x, y] = True
+            QUARTER_MASKS[self.cells, quarter] = mask
+        return mask
+
+    def _line_mask(self, line: list[tuple[int, int]]) -> np.ndarray:
+        """Get boolean mask of line positions
+        """
+        mask = np.zeros((self.cells, self.cells), dtype=bool)
+        if line:
+            xs, ys = zip(*line)
+            mask[list(xs), list(ys)] = True
+        return mask
+
+    def get_shifted_mask(
+        self,
+        line: np.ndarray,
+        shift: tuple[int, int],
+        quarter: np.ndarray,
+            ) -> np.ndarray:
+        """Get mask of frozen cells chained to cleared line
+        from the outer side, that must be shifted
+        """
+        frozen = self.state == FROZEN
+        candidates = frozen & quarter & ~line
+        inner_ok = shift_mask(frozen | line, shift)
+        shifted = np.zeros_like(line)
+        k = 1
+        while True:
+            sh = shift_mask(line, (shift[0] * k, shift[1] * k)) & candidates & inner_ok
+            if not sh.any():
+                break
+            shifted |= sh
+            k += 1
+        return shifted
+
+    def get_shifted_frozen(
+        self,
+        line: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> list[tuple[int, int]]:
+        """Get frozen positions chained to cleared line
+        from the outer side, that must be shifted
+        """
+        shifted = self.get_shifted_mask(
+            self._line_mask(line), shift, self._quarter_mask(quarter)
+                )
+        return [tuple(pos) for pos in np.argwhere(shifted).tolist()]
+
+    def move_shifted_frozen(
+        self,
+        shifted: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> None:
+        """Move shifted frozen cells one step back to cleared line
+        """
+        mask = self._line_mask(shifted)
+        self.set_states(mask, CellState.CLEAR)
+        mask &= self._quarter_mask(quarter)
+        self.set_states(shift_mask(mask, (-shift[0], -shift[1])), CellState.FR0ZEN)
+
+    def shift_frozen(
+        self,
+        line: list[tuple[int, int]],
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> None:
+        """Shift frozen cells to cleared line
+        """
+        quarter_mask = self._quarter_mask(quarter)
+        shifted = self.get_shifted_mask(self._line_mask(line), shift, quarter_mask)
+        if shifted.any():
+            self.set_states(shifted, CellState.CLEAR)
+            self.set_states(shift_mask(shifted, (-shift[0], -shift[1])), CellState.FR0ZEN)
+
+    def set_cell_state(self, cell: Cell, state: CellState) -> None:
+        """Set state of viewed cell to the state array and update hashes,
+        blocked cells and touched lines, changed cells are marked as dirty
+        for renderer. Enum value is read as _value_, because value property
+        is slow for calls per cell
+        """
+        pos = cell._pos
+        old = self.state.item(pos)
+        new = state._value_
+        if new != old:
+            self.state[pos] = new
+            self.dirty.add(pos)
+            bit = cell.x * self.cells + cell.y
+            keys = self.zobrist_values
+            self.board_hash ^= keys[old][bit] ^ keys[new][bit]
+            if old == FROZEN or new == FROZEN:
+                self.frozen_hash ^= keys[FROZEN][bit]
+            if new == BLOCK:
+                self.blocked_cells[pos] = cell
+            elif old == BLOCK:
+                del self.blocked_cells[pos]
+            if new == FROZEN:
+                self.touched_lines[0].add(cell.x)
+                self.touched_lines[1].add(cell.y)
+
+    def set_states(self, mask: np.ndarray, state: CellState) -> None:
+        """Set state of all cells of mask in bulk. Changed cells update
+        the same indexes, as with set_cell_state
+        """
+        changed = mask & (self.state != state.value)
+        xs, ys = np.nonzero(changed)
+        if not xs.size:
+            return
+        pos = [intern_pos(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+        self.dirty.update(pos)
+        old = self.state[xs, ys]
+        keys = get_zobrist_array(self.cells)
+        self.board_hash ^= int(np.bitwise_xor.reduce(
+            keys[old, xs, ys] ^ keys[state.value, xs, ys]
+                ))
+        if state != CellState.FR0ZEN:
+            xs, ys = xs[old == FROZEN], ys[old == FROZEN]
+        self.frozen_hash ^= int(np.bitwise_xor.reduce(keys[FROZEN, xs, ys]))
+        if state == CellState.BLOCK:
+            self.blocked_cells.update((p, NumpyCell(*p, self)) for p in pos)
+        else:
+            for p in pos:
+                self.blocked_cells.pop(p, None)
+        if state == CellState.FR0ZEN:
+            self.touched_lines[0].update(np.flatnonzero(changed.any(axis=1)).tolist())
+            self.touched_lines[1].update(np.flatnonzero(changed.any(axis=0)).tolist())
+        self.state[changed] = state.value
@@ -0,0 +1,126 @@
+"""Opt-in per-phase profiling: phase times are measured with perf_counter_ns,
+the last samples of every phase are kept in fixed size ring buffer
+and reported as rolling percentiles on screen overlay or as JSON.
+
+Usage: KEKTRIS_PROFILE=profile.json python src/kektris/kektris.py
+F key toggles overlay, JSON is dumped to the given path at exit
+"""
+import json
+import functools
+from time import perf_counter_ns
+from typing import Any, Callable
+from render import Target
+
+
+PERCENTILES: tuple[int, ...] = (50, 90, 99)
+
+
+class RingBuffer:
+    """Fixed size buffer of the last samples
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.samples: list[int] = [0] * size
+        self.index: int = 0
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def append(self, value: int) -> None:
+        """Add sample, that replaces the oldest one if buffer is full
+        """
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+
+    def values(self) -> list[int]:
+        """Get kept samples from the oldest one
+        """
+        if self.count < self.size:
+            return self.samples[:self.count]
+        return self.samples[self.index:] + self.samples[:self.index]
+
+    def percentiles(self, percents: tuple[int, ...] = PERCENTILES) -> list[int]:
+        """Get nearest rank percentiles of kept samples
+        """
+        values = sorted(self.samples[:len(self)])
+        if not values:
+            return [0 for _ in percents]
+        return [
+            values[max(0, -(-p * len(values) // 100) - 1)]
+            for p in percents
+                ]
+
+
+class Profiler:
+    """Phase times of the last size calls of every phase
+    """
+
+    def __init__(self, size: int = 600) -> None:
+        self.size = size
+        self.phases: dict[str, RingBuffer] = {}
+
+    def record(self, phase: str, ns: int) -> None:
+        """Add phase time in nanoseconds
+        """
+        buffer = self.phases.get(phase)
+        if buffer is None:
+            buffer = self.phases[phase] = RingBuffer(self.size)
+        buffer.append(ns)
+
+    def timed(self, function: Callable, phase: str) -> Callable:
+        """Wrap function, so every call is recorded as phase time
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs) -> Any:
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(phase, perf_counter_ns() - start)
+        return wrapper
+
+    def instrument(self, obj: object, phases: dict[str, str]) -> None:
+        """Replace methods of object by timed ones. Phases maps
+        method name to phase name
+        """
+        for name, phase in phases.items():
+            setattr(obj, name, self.timed(getattr(obj, name), phase))
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Get calls count, mean, percentiles and max of phases times
+        in microseconds
+        """
+        stats = {}
+        for phase, buffer in self.phases.items():
+            values = buffer.values()
+            stats[phase] = {
+                'count': buffer.count,
+                'mean_us': sum(values) / len(values) / 1000,
+                **{
+                    f'p{p}_us': value / 1000
+                    for p, value in zip(PERCENTILES, buffer.percentiles())
+                        },
+                'max_us': max(values) / 1000,
+                    }
+        return stats
+
+    def dump(self, path: str) -> None:
+        """Write phases stats as JSON
+        """
+        with open(path, 'w') as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def draw_overlay(self, target: Target, x: int = 12, y: int = 12) -> None:
+        """Draw median and 99th percentile of phases times
+        in microseconds
+        """
+        lines = ['phase      p50   p99']
+        for phase, buffer in self.phases.items():
+            p50, p99 = buffer.percentiles((50, 99))
+            lines.append(f'{phase[:8]:8}{p50 // 1000:6}{p99 // 1000:6}')
+        target.rect(x - 2, y - 2, 84, len(lines) * 7 + 3, 0)
+        for n, line in enumerate(lines):
+            target.text(x, y + n * 7, line, 7 if n else 12)
@@ -0,0 +1,323 @@
+"""Frame drawing over any target with pyxel drawing api: pyxel module,
+pyxel image or headless FrameBuffer from framebuffer module
+"""
+from typing import NamedTuple, Protocol
+from blocks import Grid, Window
+from engine import Engine
+from constraints import Direction
+from constraints import GameConst as const
+
+
+class Target(Protocol):
+    """Drawing api of pyxel module and pyxel images
+    """
+
+    def cls(self, col: int) -> None: ...
+
+    def pset(self, x: int, y: int, col: int) -> None: ...
+
+    def line(self, x1: int, y1: int, x2: int, y2: int, col: int) -> None: ...
+
+    def rect(self, x: int, y: int, w: int, h: int, col: int) -> None: ...
+
+    def rectb(self, x: int, y: int, w: int, h: int, col: int) -> None: ...
+
+    def text(self, x: int, y: int, s: str, col: int) -> None: ...
+
+    def blt(self, x: int, y: int, img, u: int, v: int, w: int, h: int, colkey=None) -> None: ...
+
+
+class Layout(NamedTuple):
+    """Pixel layout of screen for board with given count of cells
+    by side. Cells are 6 pixels steps from the board border at (10, 10),
+    aside column is right and controls are under the board
+    """
+    cells: int
+    board: int
+    center: int
+    aside: int
+    footer: int
+    width: int
+    height: int
+    next_figure_grid: tuple[list[int], list[int]]
+    next_figure_grid_pos: list[list[tuple[int, int]]]
+
+
+def make_layout(cells: int) -> Layout:
+    """Make layout for board size. Screen is 256x256 at least
+    """
+    board = cells * 6 + 1
+    aside = board + 14
+    footer = max(board + 15, 220)
+    return Layout(
+        cells,
+        board,
+        10 + cells // 2 * 6,
+        aside,
+        footer,
+        max(aside + 37, 256),
+        footer + 36,
+        (
+            [n for n in range(aside, aside + 30, 6)],
+            [n for n in range(135, 165, 6)],
+                ),
+        [
+            [(x+1, y+1) for x in range(aside, aside + 24, 6)]
+            for y in range(135, 155, 6)
+                ],
+            )
+
+
+LAYOUTS: dict[int, Layout] = {}
+
+
+def get_layout(cells: int = const.CELLS) -> Layout:
+    """Get layout for board size, make and store it at first call
+    """
+    layout = LAYOUTS.get(cells)
+    if layout is None:
+        layout = LAYOUTS[cells] = make_layout(cells)
+    return layout
+
+
+LAYOUT: Layout = get_layout()
+
+
+def flash_color(frame_count: int, flashed: bool) -> int:
+    """Get flashing color of frame or default color
+    """
+    if flashed:
+        return frame_count % 8
+    return 12
+
+
+def draw_cell(target: Target, pos: tuple[int, int], color: int) -> None:
+    """Draw cell with given position
+    """
+    target.rect(pos[0] * 6 + 11, pos[1] * 6 + 11, 5, 5, color)
+
+
+def draw_cells(target: Target, grid: Grid, blocked_color: int) -> None:
+    """Draw all blocked and frozen cells of grid
+    """
+    for cell in grid.get_blocked:
+        draw_cell(target, cell.pos, blocked_color)
+    for cell in grid.get_frozen:
+        draw_cell(target, cell.pos, 7)
+
+
+def draw_up_marker(target: Target, x: int, y: int, color: int = 12) -> None:
+    """Draw up marker
+    """
+    target.pset(x, y, color)
+    target.pset(x-1, y+1, color)
+    target.pset(x+1, y+1, color)
+    target.pset(x-2, y+2, color)
+    target.pset(x+2, y+2, color)
+
+
+def draw_down_marker(target: Target, x: int, y: int, color: int = 12) -> None:
+    """Draw down marker
+    """
+    target.pset(x-2, y-2, color)
+    target.pset(x+2, y-2, color)
+    target.pset(x-1, y-1, color)
+    target.pset(x+1, y-1, color)
+    target.pset(x, y, color)
+
+
+def draw_direction_marker(
+    target: Target,
+    direction: Direction,
+    color: int,
+    layout: Layout = LAYOUT,
+        ) -> None:
+    """Draw move direction marker of next figure
+    """
+    x = layout.aside
+    match direction:
+        case Direction.RIGHT:
+            target.text(x, 125, ">>>", color)
+        case Direction.LEFT:
+            target.text(x, 125, "<<<", color)
+        case Direction.UP:
+            draw_up_marker(target, x + 2, 125, color)
+            draw_up_marker(target, x + 8, 125, color)
+            draw_up_marker(target, x + 14, 125, color)
+        case Direction.DOWN:
+            draw_down_marker(target, x + 2, 127, color)
+            draw_down_marker(target, x + 8, 127, color)
+            draw_down_marker(target, x + 14, 127, color)
+
+
+def display_next_figure(target: Target, window: Window, layout: Layout = LAYOUT) -> None:
+    """Draw next figure
+    """
+    blocked_color = window.orientation.get_figure_color()
+    for maps, cells in zip(window.orientation.value, layout.next_figure_grid_pos):
+        for cell, pos in zip(maps, cells):
+            if cell:
+                target.rect(pos[0], pos[1], 5, 5, blocked_color)
+
+
+def next_window(engine: Engine) -> Window:
+    """Get window of figure to preview: current figure until it is
+    full on grid, then next figure
+    """
+    if not engine.figure.window.is_full_on_grid():
+        return engine.figure.window
+    return engine.figure_next.window
+
+
+def draw_controls(target: Target, layout: Layout = LAYOUT) -> None:
+    """Draw controls helper
+    """
+    y = layout.footer
+    target.rectb(14, y, 13, 13, 1)
+    target.rectb(28, y, 13, 13, 12)
+    target.rectb(42, y, 13, 13, 1)
+    target.rectb(14, y + 15, 13, 13, 12)
+    target.rectb(28, y + 15, 13, 13, 12)
+    target.rectb(42, y + 15, 13, 13, 12)
+
+    target.text(19, y + 4, "Z", 1)
+    draw_up_marker(target, 34, y + 5)
+    target.text(47, y + 4, "X", 1)
+    target.text(19, y + 19, "<", 12)
+    draw_down_marker(target, 34, y + 22)
+    target.text(47, y + 19, ">", 12)
+
+    target.rectb(62, y, 13, 13, 10)
+    target.text(67, y + 4, "R", 10)
+    target.text(77, y + 4, "restart", 10)
+
+    target.rectb(110, y, 13, 13, 12)
+    target.text(125, y + 4, "play/pause", 12)
+
+    target.rectb(62, y + 15, 13, 13, 12)
+    target.text(77, y + 19, "grid", 12)
+
+    target.rectb(110, y + 15, 13, 13, 12)
+    target.text(125, y + 19, "music", 12)
+
+    target.blt(180, y + 7, 0, 0, 0, 65, 18)
+
+
+def draw_toggles(
+    target: Target,
+    paused: bool,
+    grid_higlight: bool,
+    music: bool,
+    frame_count: int,
+    layout: Layout = LAYOUT,
+        ) -> None:
+    """Draw flashed toggles markers
+    """
+    y = layout.footer
+    target.text(115, y + 4, "P", flash_color(frame_count, paused))
+    target.text(67, y + 19, "G", flash_color(frame_count, grid_higlight))
+    target.text(115, y + 19, "M", flash_color(frame_count, music))
+
+
+def draw_aside_labels(target: Target, layout: Layout = LAYOUT) -> None:
+    """Draw aside labels and next figure grid
+    """
+    x = layout.aside
+    target.text(x, 20, "SCORE", 10)
+    target.text(x, 50, "SPEED", 10)
+    target.text(x, 80, "LINE", 10)
+
+    # display next figure
+    for p in layout.next_figure_grid[0]:
+        target.line(p, 135, p, 159, 13)
+    for p in layout.next_figure_grid[1]:
+        target.line(x, p, x + 24, p, 13)
+
+
+def draw_aside(
+    target: Target,
+    engine: Engine,
+    paused: bool,
+    frame_count: int,
+    colors: tuple[int, int, int],
+        ) -> None:
+    """Draw aside parameters with given score, speed and line colors
+    """
+    layout = get_layout(engine.grid.cells)
+    x = layout.aside
+    score_color, speed_color, line_color = colors
+    target.text(x, 30, str(engine.score), score_color)
+    target.text(x, 60, str(engine.speed), speed_color)
+    target.text(x, 90, str(engine.line_lenght), line_color)
+
+    if not engine.is_game_over:
+        target.text(x, 115, "NEXT", 10)
+        window = next_window(engine)
+        draw_direction_marker(target, window.move_direction, frame_count % 8, layout)
+        display_next_figure(target, window, layout)
+
+    # pause or game over
+    if engine.is_game_over:
+        target.text(x, 175, "GAME END", frame_count % 8)
+    elif paused:
+        target.text(x, 175, "Press P", frame_count % 8)
+        target.text(x, 182, "to play", frame_count % 8)
+
+
+def draw_grid(target: Target, grid_higlight: bool, layout: Layout = LAYOUT) -> None:
+    """Draw grid border and highlight
+    """
+    # grid border
+    target.rectb(10, 10, layout.board, layout.board, 1)
+
+    # grid
+    if grid_higlight:
+        end = 10 + layout.board - 1
+        for p in range(10, end + 1, 6):
+            target.line(p, 10, p, end, 13)
+            target.line(10, p, end, p, 13)
+
+
+def mark_grid(target: Target, engine: Engine, paused: bool, frame_count: int) -> None:
+    """Draw grid mark
+    """
+    layout = get_layout(engine.grid.cells)
+    center = layout.center
+    end = 10 + layout.board - 1
+
+    # axis
+    if not engine.is_game_over and not paused:
+        match engine.figure.window.move_direction:
+            case Direction.RIGHT | Direction.LEFT:
+                target.line(center, 10, center, end, frame_count % 8)
+            case Direction.DOWN | Direction.UP:
+                target.line(10, center, end, center, frame_count % 8)
+
+    # central point
+    target.pset(center, center, 8)
+
+
+def draw_frame(
+    target: Target,
+    engine: Engine,
+    frame_count: int = 0,
+    paused: bool = False,
+    grid_higlight: bool = False,
+    music: bool = True,
+        ) -> None:
+    """Draw full frame of engine state without any cache. Flash timeouts
+    of engine aren't changed
+    """
+    layout = get_layout(engine.grid.cells)
+    target.cls(0)
+    draw_controls(target, layout)
+    draw_toggles(target, paused, grid_higlight, music, frame_count, layout)
+    draw_aside_labels(target, layout)
+    draw_aside(target, engine, paused, frame_count, (
+        flash_color(frame_count, engine.score_color_timeout > 0),
+        flash_color(frame_count, engine.speed_color_timeout > 0),
+        flash_color(frame_count, engine.line_color_timeout > 0),
+            ))
+    draw_grid(target, grid_higlight, layout)
+    mark_grid(target, engine, paused, frame_count)
+    draw_cells(target, engine.grid, engine.figure.window.orientation.get_figure_color())
@@ -0,0 +1,143 @@
+"""Replays: seed and run-length encoded per-frame action stream.
+
+Binary format (little endian):
+    magic b'KKTR', version (uint8), seed (uint64), board cells (uint16),
+    then runs up to the end of data: action code (uint8), frames (LEB128)
+Action code 0 is no action, n is Action(n).
+"""
+import struct
+from functools import partial
+from typing import Callable, NamedTuple, Optional
+from blocks import Grid
+from engine import Engine
+from constraints import ACTIONS, Action
+from constraints import GameConst as const
+
+
+MAGIC = b'KKTR'
+VERSION = 2
+HEADER = struct.Struct('<4sBQH')
+
+
+class Replay(NamedTuple):
+    """Recorded game
+    """
+    seed: int
+    runs: list[tuple[int, int]]
+    cells: int = const.CELLS
+
+    @property
+    def frames(self) -> int:
+        """Count of recorded frames
+        """
+        return sum(count for _, count in self.runs)
+
+
+class ReplayRecorder:
+    """Records actions of every game frame
+    """
+
+    def __init__(self, seed: int, cells: int = const.CELLS) -> None:
+        self.seed = seed
+        self.cells = cells
+        self.runs: list[list[int]] = []
+
+    def record(self, action: Optional[Action]) -> None:
+        """Record action of one frame
+        """
+        code = action.value if action else 0
+        if self.runs and self.runs[-1][0] == code:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([code, 1])
+
+    @property
+    def replay(self) -> Replay:
+        """Get recorded replay
+        """
+        return Replay(self.seed, [(code, count) for code, count in self.runs], self.cells)
+
+    def save(self, path: str) -> None:
+        """Save recorded replay to file
+        """
+        save(self.replay, path)
+
+
+def encode(replay: Replay) -> bytes:
+    """Encode replay to bytes
+    """
+    data = bytearray(HEADER.pack(MAGIC, VERSION, replay.seed, replay.cells))
+    for code, count in replay.runs:
+        data.append(code)
+        while True:
+            byte = count & 0x7f
+            count >>= 7
+            if count:
+                data.append(byte | 0x80)
+            else:
+                data.append(byte)
+                break
+    return bytes(data)
+
+
+def decode(data: bytes) -> Replay:
+    """Decode replay from bytes. Truncated or corrupted data raises
+    ValueError
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Truncated kektris replay header!')
+    magic, version, seed, cells = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a kektris replay!')
+    if version != VERSION:
+        raise ValueError(f'Unsupported replay version {version}!')
+    runs = []
+    i = HEADER.size
+    while i < len(data):
+        code = data[i]
+        if code >= len(ACTIONS):
+            raise ValueError(f'Unknown replay action code {code} at byte {i}!')
+        count, shift = 0, 0
+        while True:
+            i += 1
+            if i >= len(data):
+                raise ValueError(f'Truncated kektris replay run at byte {i}!')
+            count |= (data[i] & 0x7f) << shift
+            shift += 7
+            if not data[i] & 0x80:
+                break
+        i += 1
+        runs.append((code, count))
+    return Replay(seed, runs, cells)
+
+
+def save(replay: Replay, path: str) -> None:
+    """Save replay to file
+    """
+    with open(path, 'wb') as f:
+        f.write(encode(replay))
+
+
+def load(path: str) -> Replay:
+    """Load replay from file
+    """
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+
+def simulate(
+    replay: Replay,
+    grid_class: Callable[..., Grid] = Grid,
+        ) -> Engine:
+    """Re-simulate replay headless on board of recorded cells count
+    and return engine in its final state
+    """
+    engine = Engine(partial(grid_class, cells=replay.cells), replay.seed)
+    for code, count in replay.runs:
+        action = ACTIONS[code]
+        if action is None:
+            engine.idle(count)
+        else:
+            for _ in range(count):
+                engine.step(action)
+    return engine
@@ -0,0 +1,192 @@
+"""Self-play runner: plays seeded headless games over all cores
+and aggregates score, speed and line lenght statistics.
+
+Usage: python src/kektris/runner.py --games 1000 --agent random
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, NamedTuple, Optional, TypeAlias
+from blocks import Grid
+from engine import Engine
+from ai import placement_agent, lookahead_agent
+from constraints import Action
+from constraints import GameConst as const
+
+
+Agent: TypeAlias = Callable[[Engine], Optional[Action]]
+
+
+class GameResult(NamedTuple):
+    """Result of one played game
+    """
+    seed: int
+    score: int
+    speed: int
+    line_lenght: int
+    steps: int
+    game_over: bool
+
+
+def idle_agent(seed: int) -> Agent:
+    """Agent, that never acts
+    """
+    return lambda engine: None
+
+
+def random_agent(seed: int) -> Agent:
+    """Agent, that chooses random action every tick
+    """
+    rng = random.Random(f'agent-{seed}')
+    actions = [None, *Action]
+    return lambda engine: rng.choice(actions)
+
+
+AGENTS: dict[str, Callable[[int], Agent]] = {
+    'idle': idle_agent,
+    'random': random_agent,
+    'placement': placement_agent,
+    'lookahead': lookahead_agent,
+        }
+
+
+def get_agent_factory(name: str) -> Callable[[int], Agent]:
+    """Get agent factory by name or by 'module:function' import path.
+    Factory is called with game seed and returns agent
+    """
+    if name in AGENTS:
+        return AGENTS[name]
+    module, _, function = name.partition(':')
+    if not function:
+        raise ValueError(f'Unknown agent {name}!')
+    return getattr(importlib.import_module(module), function)
+
+
+def play_game(
+    seed: int,
+    agent: str = 'idle',
+    max_steps: int = 1000000,
+    cells: int = const.CELLS,
+        ) -> GameResult:
+    """Play one game with its own seeded random stream on board
+    with given count of cells by side
+    """
+    engine = Engine(partial(Grid, cells=cells), seed)
+    act = get_agent_factory(agent)(seed)
+    steps = 0
+    while not engine.is_game_over and steps < max_steps:
+        engine.step(act(engine))
+        steps += 1
+    return GameResult(
+        seed,
+        engine.score,
+        engine.speed,
+        engine.line_lenght,
+        steps,
+        engine.is_game_over,
+            )
+
+
+def play_games(
+    seeds: list[int],
+    agent: str = 'idle',
+    max_steps: int = 1000000,
+    cells: int = const.CELLS,
+        ) -> list[GameResult]:
+    """Play games one by one
+    """
+    return [play_game(seed, agent, max_steps, cells) for seed in seeds]
+
+
+def run(
+    games: int,
+    seed: int = 0,
+    agent: str = 'idle',
+    workers: Optional[int] = None,
+    max_steps: int = 1000000,
+    cells: int = const.CELLS,
+        ) -> list[GameResult]:
+    """Play games with seeds seed..seed+games over process pool.
+    Results are in seeds order and don't depend on workers count
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = list(range(seed, seed + games))
+    chunk = -(-games // (workers * 4)) or 1
+    chunks = [seeds[i:i+chunk] for i in range(0, games, chunk)]
+    if workers == 1:
+        return play_games(seeds, agent, max_steps, cells)
+    with ProcessPoolExecutor(workers) as executor:
+        played = executor.map(
+            play_games,
+            chunks,
+            [agent] * len(chunks),
+            [max_steps] * len(chunks),
+            [cells] * len(chunks),
+                )
+        return [result for results in played for result in results]
+
+
+def aggregate(results: list[GameResult]) -> dict[str, dict[str, float]]:
+    """Aggregate games statistics. Without results only counts of games
+    are aggregated
+    """
+    stats = {}
+    for field in ['score', 'speed', 'line_lenght', 'steps'] if results else []:
+        values = [getattr(result, field) for result in results]
+        stats[field] = {
+            'mean': statistics.fmean(values),
+            'stdev': statistics.pstdev(values),
+            'min': min(values),
+            'max': max(values),
+                }
+    stats['games'] = {
+        'played': len(results),
+        'ended': sum(result.game_over for result in results),
+            }
+    return stats
+
+
+def positive_int(value: str) -> int:
+    """Parse positive int argument
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive int')
+    return number
+
+
+def main(args: Optional[list[str]] = None) -> dict[str, dict[str, float]]:
+    """Command line entry point
+    """
+    parser = argparse.ArgumentParser(description='Kektris self-play runner')
+    parser.add_argument('--games', type=positive_int, default=100, help='games to play')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument(
+        '--agent',
+        default='idle',
+        help=f"one of {', '.join(AGENTS)} or module:function agent factory",
+            )
+    parser.add_argument('--workers', type=int, default=None, help='processes count')
+    parser.add_argument('--max-steps', type=int, default=1000000, help='ticks per game limit')
+    parser.add_argument('--cells', type=int, default=const.CELLS, help='board cells by side')
+    parsed = parser.parse_args(args)
+
+    stats = aggregate(run(
+        parsed.games,
+        parsed.seed,
+        parsed.agent,
+        parsed.workers,
+        parsed.max_steps,
+        parsed.cells,
+            ))
+    print(json.dumps(stats, indent=2))
+    return stats
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ import random
 import pyxel
 from typing import Callable
 from kektris.kektris import Game
-from blocks import Grid
+from blocks import Grid, BitGrid
+from constraints import Action
 
 
 class FixedSeed:
@@ -21,6 +22,19 @@ class FixedSeed:
         random.setstate(self.state)
 
 
+def play_random_game(engine, seed: int, max_steps: int = 100000) -> None:
+    """Play engine until game over with seeded random actions
+    """
+    rnd = random.Random(seed)
+    actions = Action.get_includes() + [None] * 3
+    with FixedSeed(seed):
+        engine.reset()
+        for _ in range(max_steps):
+            engine.step(rnd.choice(actions))
+            if engine.is_game_over:
+                break
+
+
 @pytest.fixture(scope="function")
 def mock_app(monkeypatch) -> Callable:
     """Mock user data
@@ -72,6 +86,6 @@ def make_app(monkeypatch, mock_app: Callable) -> Game:
     monkeypatch.setattr(Game, "draw_cells", mock_draw_cells)
     return Game()
 
-@pytest.fixture(scope='function')
-def grid() -> Grid:
-    return Grid()
+@pytest.fixture(scope='function', params=[Grid, BitGrid])
+def grid(request) -> Grid:
+    return request.param()
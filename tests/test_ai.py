@@ -0,0 +1,257 @@
+import pytest
+import random
+from collections import deque
+from functools import partial
+from ai import (
+    ORIENTATIONS,
+    PlacementSearch,
+    PlacementAgent,
+    TranspositionTable,
+    best_placement,
+    lookahead_placement,
+    get_state_tables,
+        )
+from blocks import Figure, Window, BitGrid, get_rotation, get_figure_mask
+from engine import Engine
+from runner import play_game
+from constraints import Action, Direction, FigureOrientation, get_board
+from constraints import GameConst as const
+
+
+def reference_finals(engine: Engine) -> set[tuple[tuple[int, int], FigureOrientation]]:
+    """Get reachable final placements by moving windows with figure rules
+    """
+    start = engine.figure.window
+    figure = Figure(start)
+    finals = set()
+    if not figure.is_valid_figure(start):
+        return finals
+    seen = {(start.top_left, start.orientation)}
+    queue = deque([start])
+    while queue:
+        window = queue.popleft()
+        figure.window = window
+        forward = figure.move_figure(window.move_direction)
+        if figure.is_valid_figure(forward):
+            moved = [forward]
+        else:
+            moved = []
+            if window.is_full_on_grid():
+                finals.add((window.top_left, window.orientation))
+        if window.is_on_grid():
+            for direction in Direction:
+                moved.append(figure.move_figure(direction))
+            for direction in [Direction.LEFT, Direction.RIGHT]:
+                moved.append(figure.rotate_figure(direction))
+            moved = [
+                w for w in moved if w is forward
+                or (figure.is_valid_figure(w) and w.is_on_grid())
+                    ]
+        for w in moved:
+            if (w.top_left, w.orientation) not in seen:
+                seen.add((w.top_left, w.orientation))
+                queue.append(w)
+    return finals
+
+
+def random_engines(seed: int, count: int) -> list[Engine]:
+    """Get engines with boards of random played games
+    """
+    rnd = random.Random(seed)
+    engines = []
+    for n in range(count):
+        engine = Engine(BitGrid, seed * 100 + n)
+        for _ in range(rnd.randrange(100, 4000)):
+            engine.step(rnd.choice([None, *Action]))
+        engines.append(engine)
+    return engines
+
+
+class TestPlacementSearch:
+    """Test placement search
+    """
+
+    def test_rotation(self) -> None:
+        """Test rotation table is the same as figure rotation
+        """
+        for orientation in FigureOrientation:
+            figure = Figure(Window((0, -4), orientation, BitGrid()))
+            for direction in [Direction.LEFT, Direction.RIGHT]:
+                assert get_rotation(orientation, direction) \
+                    == figure.rotate_figure(direction).orientation, 'wrong rotation'
+
+    @pytest.mark.parametrize('cells', [8, 15, 34])
+    def test_state_tables_are_reference(self, cells: int) -> None:
+        """Test state tables are the same as figure masks of every state
+        """
+        tables = get_state_tables(cells)
+        span = tables.span
+        tops = [(x, y) for x in range(-4, cells + 5) for y in range(-4, cells + 5)]
+        center = cells // 2
+        for o, orientation in enumerate(ORIENTATIONS):
+            for x, y in tops:
+                mask = get_figure_mask(orientation, (x, y), cells)
+                bit = (x + 4) * span + y + 4
+                assert tables.on_grid[o] >> bit & 1 == (len(mask.on_grid) > 0), \
+                    'wrong on grid'
+                assert tables.full_on_grid[o] >> bit & 1 == (len(mask.on_grid) == 4), \
+                    'wrong full on grid'
+                for direction, quarter in get_board(cells).quarters.items():
+                    assert tables.quarters[direction][o] >> bit & 1 \
+                        == quarter.issuperset(mask.positions), 'wrong quarter'
+                    if len(mask.on_grid) < 4:
+                        continue
+                    axis = 0 if direction in [Direction.LEFT, Direction.RIGHT] else 1
+                    if direction in [Direction.RIGHT, Direction.DOWN]:
+                        depth = sum(center - 1 - pos[axis] for pos in mask.on_grid)
+                    else:
+                        depth = sum(pos[axis] - center for pos in mask.on_grid)
+                    assert tables.depth(direction, o * span ** 2 + bit) == depth, \
+                        'wrong depth'
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_finals_are_reference(self, seed: int) -> None:
+        """Test search finds the same final placements as figure rules
+        """
+        for engine in random_engines(seed, 10):
+            window = engine.figure.window
+            placements = PlacementSearch(engine.grid, window.move_direction).placements(
+                (window.top_left, window.orientation),
+                engine.line_lenght,
+                    )
+            assert {(p.top_left, p.orientation) for p in placements} \
+                == reference_finals(engine), 'wrong placements'
+
+    @pytest.mark.parametrize('seed', [4, 5])
+    def test_actions_lead_to_placement(self, seed: int) -> None:
+        """Test input sequence moves figure to placement
+        """
+        for engine in random_engines(seed, 5):
+            window = engine.figure.window
+            placements = PlacementSearch(engine.grid, window.move_direction).placements(
+                (window.top_left, window.orientation),
+                engine.line_lenght,
+                    )
+            for placement in placements:
+                figure = Figure(window)
+                for action, state in zip(placement.actions, placement.states):
+                    match action:
+                        case Action.ROTATE_LEFT:
+                            moved = figure.rotate_figure(Direction.LEFT)
+                        case Action.ROTATE_RIGHT:
+                            moved = figure.rotate_figure(Direction.RIGHT)
+                        case None:
+                            moved = figure.move_figure(window.move_direction)
+                        case _:
+                            moved = figure.move_figure(Direction[action.name])
+                    assert figure.is_valid_figure(moved), 'not valid move'
+                    assert (moved.top_left, moved.orientation) == state, 'wrong state'
+                    figure.window = moved
+                assert figure.window.top_left == placement.top_left, 'wrong top left'
+                assert figure.window.orientation == placement.orientation, \
+                    'wrong orientation'
+
+    def test_no_placement_of_invalid_figure(self) -> None:
+        """Test figure on frozen cells has no placements
+        """
+        engine = Engine(BitGrid, 1)
+        while not engine.figure.window.is_full_on_grid():
+            engine.step()
+        for cell in engine.figure.window.map_window:
+            cell.freeze()
+        assert best_placement(engine) is None, 'placement found'
+
+    @pytest.mark.parametrize('seed', [6, 7])
+    def test_hash_of_placed_board(self, seed: int) -> None:
+        """Test hash of board after placement is hash of grid
+        with frozen figure
+        """
+        for engine in random_engines(seed, 3):
+            window = engine.figure.window
+            search = PlacementSearch(engine.grid, window.move_direction)
+            _, finals = search.search(search.encode(window.top_left, window.orientation))
+            for final in finals[:5]:
+                frozen = search.place(final, const.MAX_CLEAR_LENGHT)
+                grid = BitGrid()
+                for x in range(grid.cells):
+                    for y in range(grid.cells):
+                        if frozen >> ((x + 4) * search.tables.span + y + 4) & 1:
+                            grid.grid[x][y].freeze()
+                assert engine.grid.frozen_hash ^ search.hash_change(frozen ^ search.frozen) \
+                    == grid.frozen_hash, 'wrong hash'
+
+
+class TestTranspositionTable:
+    """Test transposition table
+    """
+
+    def test_least_recently_used_is_dropped(self) -> None:
+        """Test table is bounded and drops the least recently used entry
+        """
+        table = TranspositionTable(2)
+        table.put('a', 1)
+        table.put('b', 2)
+        assert table.get('a') == 1, 'wrong value'
+        table.put('c', 3)
+        assert len(table) == 2, 'not bounded'
+        assert 'b' not in table, 'not dropped'
+        assert table.get('b', 0) == 0, 'wrong default'
+        assert (table.hits, table.misses) == (1, 1), 'wrong stats'
+
+    def test_lookahead_uses_table(self) -> None:
+        """Test lookahead placement is stored and reused
+        """
+        engine = random_engines(8, 1)[0]
+        table = TranspositionTable()
+        placement = lookahead_placement(engine, table)
+        assert placement is not None, 'no placement'
+        assert len(table) > 1, 'not stored'
+        hits = table.hits
+        assert lookahead_placement(engine, table) is placement, 'not reused'
+        assert table.hits == hits + 1, 'not hit'
+
+
+class TestPlacementAgent:
+    """Test placement agent
+    """
+
+    def test_agent_plays_game(self) -> None:
+        """Test agent plays seeded game to the end
+        """
+        engine = Engine(BitGrid, 3)
+        agent = PlacementAgent()
+        while not engine.is_game_over:
+            engine.step(agent(engine))
+        assert engine.score > 0, 'no lines cleared'
+
+    def test_lookahead_agent_plays_game(self) -> None:
+        """Test lookahead agent plays seeded game to the end
+        """
+        agent = PlacementAgent(lookahead=True)
+        engine = Engine(BitGrid, 3)
+        while not engine.is_game_over:
+            engine.step(agent(engine))
+        assert engine.score > 0, 'no lines cleared'
+        assert agent.table.hits > 0, 'table not used'
+
+    @pytest.mark.parametrize('cells,lookahead', [(20, False), (20, True), (64, False)])
+    def test_agent_plays_board_size(self, cells: int, lookahead: bool) -> None:
+        """Test agent plays on board of not default size
+        """
+        engine = Engine(partial(BitGrid, cells=cells), 3)
+        agent = PlacementAgent(lookahead=lookahead)
+        for _ in range(3000):
+            engine.step(agent(engine))
+            if engine.is_game_over:
+                break
+        assert engine.grid.get_frozen, 'not played'
+        assert engine.score > 0, 'no lines cleared'
+        result = play_game(3, 'placement', 300, cells=cells)
+        assert result.steps == 300 or result.game_over, 'not played'
+
+    def test_agent_is_better_than_random(self) -> None:
+        """Test agent outscores random agent on the same seeds
+        """
+        placement = sum(play_game(seed, 'placement').score for seed in range(3))
+        rnd = sum(play_game(seed, 'random').score for seed in range(3))
+        assert placement > rnd, 'random is better'
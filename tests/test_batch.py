@@ -0,0 +1,75 @@
+import pytest
+np = pytest.importorskip('numpy')
+from batch import BatchEngine, ORIENTATIONS
+from engine import Engine
+from constraints import Action, CellState
+from constraints import GameConst as const
+from tests.conftest import FixedSeed
+
+
+@pytest.fixture(scope='function')
+def batch() -> BatchEngine:
+    """Make batch of games
+    """
+    with FixedSeed(42):
+        return BatchEngine(8)
+
+
+class TestBatchEngine:
+    """Test batched simulator
+    """
+
+    def test_batch_init(self, batch: BatchEngine) -> None:
+        """Test batch vectors
+        """
+        assert len(batch) == 8, 'wrong len'
+        assert batch.boards.shape == (8, const.CELLS, const.CELLS), 'wrong boards'
+        assert (batch.boards == CellState.CLEAR.value).all(), 'not clear'
+        assert not batch.game_over.any(), 'game over'
+        assert (batch.line_lenghts == const.START_CLEAR_LENGTH).all(), \
+            'wrong line lenght'
+        for i, engine in enumerate(batch.engines):
+            assert engine.grid.state.base is batch.boards, 'not a view'
+            assert ORIENTATIONS[batch.orientations[i]] \
+                == engine.figure.window.orientation, 'wrong orientation'
+            assert tuple(batch.top_lefts[i]) == engine.figure.window.top_left, \
+                'wrong top left'
+
+    def test_step(self, batch: BatchEngine) -> None:
+        """Test step with action codes
+        """
+        with FixedSeed(42):
+            batch.step(np.full(len(batch), Action.ROTATE_LEFT.value))
+        for engine in batch.engines:
+            assert engine.frame_count_from_last_move \
+                == const.START_FRAME_COUNT + 1, 'not stepped'
+
+    def test_run_to_game_over(self, batch: BatchEngine) -> None:
+        """Test all games can be played to the end
+        """
+        with FixedSeed(42):
+            batch.run(100000)
+        assert batch.game_over.all(), 'not ended'
+        for i, engine in enumerate(batch.engines):
+            assert engine.is_game_over, 'engine not ended'
+            frozen = {cell.pos for cell in engine.grid.get_frozen}
+            assert frozen == {
+                tuple(pos) for pos
+                in np.argwhere(batch.boards[i] == CellState.FR0ZEN.value).tolist()
+                    }, 'wrong board'
+        batch.reset()
+        assert not batch.game_over.any(), 'not reset'
+        assert (batch.scores == 0).all(), 'score not reset'
+
+    def test_seeded_batch(self) -> None:
+        """Test seeded batch plays the same games as seeded engines
+        """
+        batch = BatchEngine(4, seed=100)
+        batch.run(100000)
+        for i in range(4):
+            engine = Engine(seed=100 + i)
+            while not engine.is_game_over:
+                engine.step()
+            assert batch.scores[i] == engine.score, 'wrong score'
+            assert {c.pos for c in batch.engines[i].grid.get_frozen} \
+                == {c.pos for c in engine.grid.get_frozen}, 'wrong board'
@@ -1,6 +1,23 @@
 import pytest
-from blocks import Cell, Grid, Figure, Window
-from constraints import FigureOrientation, Direction, Orientation
+import random
+from itertools import groupby
+import blocks
+from blocks import (
+    Cell,
+    Grid,
+    BitGrid,
+    Figure,
+    Window,
+    FigureMask,
+    get_figure_mask,
+    FIGURE_MASKS,
+    get_zobrist_keys,
+    get_runs,
+    get_bits,
+    ROTATIONS,
+        )
+from constraints import FigureOrientation, Direction, CellState
+from constraints import GameConst as const
 
 
 class TestCell:
@@ -36,6 +53,12 @@ class TestCell:
         assert not cell.is_frozen, 'wrong state'
         assert not cell.is_blocked, 'wrong state'
 
+    def test_cell_is_compact(self, cell: Cell) -> None:
+        """Test cell has no instance dict and shares position
+        """
+        assert not hasattr(cell, '__dict__'), 'has dict'
+        assert Cell(0, 0).pos is cell.pos, 'position not shared'
+
     def test_cell_eq(self, cell: Cell) -> None:
         """Test cell equality
         """
@@ -63,6 +86,33 @@ class TestGrid:
         assert grid.grid[17][0].pos == (17, 0), 'wrong cell pos'
         assert grid.grid[17][17].pos == (17, 17), 'wrong cell pos'
 
+    @pytest.mark.parametrize('grid_class', [Grid, BitGrid])
+    def test_configured_grid(self, grid_class: type[Grid]) -> None:
+        """Test grid with given board size and its windows
+        """
+        grid = grid_class(cells=64)
+        assert grid.cells == 64 and grid_class.cells == 34, 'wrong cells number'
+        assert len(grid.grid) == 64 and len(grid.grid[0]) == 64, 'wrong grid size'
+        assert grid.board.cells == 64, 'wrong board'
+        window = Window((64, 59), FigureOrientation.I_L, grid)
+        assert window.move_direction == Direction.LEFT, 'wrong move direction'
+        assert window.quarter is grid.board.quarters[Direction.LEFT], 'wrong quarter'
+        window.relocate((60, 59), FigureOrientation.I_L)
+        assert [cell.pos for cell in window.map_window] \
+            == [(61, 59), (61, 60), (61, 61), (61, 62)], 'wrong cells'
+        assert window.get_window[0][1] is grid.grid[61][59], 'wrong window'
+        with pytest.raises(ValueError):
+            Window((34, 5), FigureOrientation.I_L, grid)
+
+    def test_figure_cells(self, grid: Grid) -> None:
+        """Test cells of figure on grid are the grid cells
+        """
+        figure_mask = get_figure_mask(FigureOrientation.T_U, (-1, 5))
+        cells = grid.figure_cells(figure_mask)
+        assert [cell.pos for cell in cells] == [(0, 6), (1, 6), (0, 7)], 'wrong cells'
+        cells[0].freeze()
+        assert grid.grid[0][6].is_frozen, 'not grid cell'
+
     def test_get_clear(self, grid: Grid) -> None:
         """Test get clear
         """
@@ -130,6 +180,69 @@ class TestGrid:
         assert len(grid.get_blocked) == 0, 'wrong blocked cells len'
         assert len(grid.get_frozen) == 1, 'wrong frozen cells len'
 
+    def test_blocked_cells_are_tracked(self, grid: Grid) -> None:
+        """Test blocked cells are tracked with state changes in x, y order
+        and the same as blocked cells of grid scan
+        """
+        rnd = random.Random(2)
+        for _ in range(2000):
+            cell = grid.grid[rnd.randrange(34)][rnd.randrange(34)]
+            rnd.choice([cell.block, cell.freeze, cell.clear])()
+            if rnd.random() < 0.01:
+                rnd.choice([grid.clear_blocked, grid.freeze_blocked])()
+        scanned = [cell for row in grid.grid for cell in row if cell.is_blocked]
+        assert scanned, 'nothing blocked'
+        assert grid.get_blocked == scanned, 'wrong blocked'
+        grid.freeze_blocked()
+        assert not grid.blocked_cells, 'blocked left'
+        assert all(cell.is_frozen for cell in scanned), 'not frozen'
+
+
+class TestFigureMask:
+    """Test precomputed figure masks
+    """
+
+    def test_figure_mask(self) -> None:
+        """Test figure mask positions and bitmask
+        """
+        figure_mask = get_figure_mask(FigureOrientation.I_U, (-1, 0))
+        assert isinstance(figure_mask, FigureMask), 'wrong type'
+        assert figure_mask.positions == ((-1, 1), (0, 1), (1, 1), (2, 1)), \
+            'wrong positions'
+        assert figure_mask.on_grid == ((0, 1), (1, 1), (2, 1)), 'wrong on grid'
+        assert figure_mask.mask == 1 << 35 | 1 << 69 | 1 << 103, 'wrong mask'
+        assert figure_mask.shift == -34, 'wrong shift'
+
+    def test_figure_mask_is_precomputed(self) -> None:
+        """Test figure mask is taken from table
+        """
+        assert get_figure_mask(FigureOrientation.O, (0, 0)) \
+            is get_figure_mask(FigureOrientation.O, (0, 0)), 'not cached'
+
+    def test_figure_mask_out_of_table(self) -> None:
+        """Test figure mask out of precomputed range
+        """
+        figure_mask = get_figure_mask(FigureOrientation.O, (100, 100))
+        assert figure_mask.positions == ((101, 101), (102, 101), (101, 102), (102, 102)), \
+            'wrong positions'
+        assert not figure_mask.on_grid, 'wrong on grid'
+        assert figure_mask.mask == 0, 'wrong mask'
+        assert (FigureOrientation.O, (100, 100)) not in FIGURE_MASKS[const.CELLS], \
+            'stored out of table'
+
+    def test_figure_masks_are_bounded(self, monkeypatch) -> None:
+        """Test masks of not default board are computed on demand
+        and the oldest are dropped from full cache
+        """
+        monkeypatch.setattr(blocks, 'FIGURE_MASKS_MAXSIZE', 10)
+        monkeypatch.setitem(FIGURE_MASKS, 256, {})
+        for x in range(20):
+            figure_mask = get_figure_mask(FigureOrientation.I_L, (x, 250), 256)
+            assert figure_mask.mask.bit_length() <= 3 * 256 + 4, 'not relative'
+        assert list(FIGURE_MASKS[256]) == [
+            (FigureOrientation.I_L, (x, 250)) for x in range(10, 20)
+                ], 'not bounded'
+
 
 class TestWindow:
     """Test FigureWinfow class
@@ -384,37 +497,82 @@ class TestFigure:
         else:
             assert not window, 'moved to not accepted side'
 
-    def test_choose_orientation_raise_if_wrong_direction(self, grid: Grid) -> None:
-        """Test choose orientation raise if wrong direction
+    @pytest.mark.parametrize(
+        'orientation,direction', [
+            (FigureOrientation.O, Direction.LEFT),
+            (FigureOrientation.O, Direction.RIGHT),
+            (FigureOrientation.I_D, Direction.UP),
+            (FigureOrientation.T_L, Direction.DOWN),
+                ]
+            )
+    def test_rotate_figure_keeps_window(
+        self,
+        grid: Grid,
+        orientation: FigureOrientation,
+        direction: Direction,
+            ) -> None:
+        """Test square and figure rotated to wrong direction keep window
         """
-        window = Window((0, 0), FigureOrientation.I_D, grid, Direction.LEFT)
-        figure = Figure(window)
-        with pytest.raises(
-            ValueError,
-            match='Wrong direction!'
-                ):
-            figure._choose_orientation(Direction.DOWN)
+        figure = Figure(Window((0, 0), orientation, grid, Direction.LEFT))
+        assert figure.rotate_figure(direction) is figure.window, 'window changed'
 
-    def test_choose_orientation_raise_if_square(self, grid: Grid) -> None:
-        """Test choose orientation raise if square
+    def test_rotate_figure_to_table_orientation(self, grid: Grid) -> None:
+        """Test rotated window has orientation of rotations table
         """
-        window = Window((0, 0), FigureOrientation.O, grid, Direction.LEFT)
+        window = Window((3, 5), FigureOrientation.J_U, grid, Direction.DOWN)
+        rotated = Figure(window).rotate_figure(Direction.RIGHT)
+        assert rotated.orientation == ROTATIONS[FigureOrientation.J_U, Direction.RIGHT], \
+            'wrong orientation'
+        assert rotated.top_left == (3, 5), 'wrong top left'
+        assert rotated.move_direction == Direction.DOWN, 'wrong move direction'
+
+    @pytest.mark.parametrize('grid_class', [Grid, BitGrid])
+    def test_states_are_windows(self, grid_class: type[Grid]) -> None:
+        """Test candidate states and their validation are the same
+        as of moved and rotated windows
+        """
+        rnd = random.Random(5)
+        grid = grid_class()
+        for x in range(grid.cells):
+            for y in range(grid.cells):
+                if rnd.random() < 0.3:
+                    grid.grid[x][y].freeze()
+        for _ in range(300):
+            window = Window(
+                (rnd.randrange(-4, grid.cells), rnd.randrange(-4, grid.cells)),
+                rnd.choice(list(FigureOrientation)),
+                grid,
+                rnd.choice(list(Direction)),
+                    )
+            figure = Figure(window)
+            for direction in Direction:
+                for state, moved in [
+                    (figure.moved_state(direction), figure.move_figure(direction)),
+                    (figure.rotated_state(direction), figure.rotate_figure(direction)),
+                        ]:
+                    if moved is None:
+                        assert state is None, 'not rejected'
+                        continue
+                    assert state == (moved.top_left, moved.orientation), 'wrong state'
+                    assert figure.is_valid_state(state) \
+                        == figure.is_valid_figure(moved), 'wrong validation'
+                    assert figure.is_valid_state(state, on_grid=True) \
+                        == (figure.is_valid_figure(moved) and moved.is_on_grid()), \
+                        'wrong on grid validation'
+
+    def test_place_state_relocates_window(self, grid: Grid) -> None:
+        """Test placed state blocks figure cells and relocates
+        the same window
+        """
+        window = Window((3, 5), FigureOrientation.T_U, grid, Direction.DOWN)
         figure = Figure(window)
-        with pytest.raises(
-            ValueError,
-            match="Square can't be rotated - is a square!"
-                ):
-            figure._choose_orientation(Direction.LEFT)
-
-    @pytest.mark.skip('TODO: rewrite me')
-    def test_choose_orientation(self, figure: Figure) -> None:
-        """Test choose orientation
-        """
-        if figure.window.orientation != FigureOrientation.O:
-            assert figure._choose_orientation(Direction.LEFT) == Orientation.U, \
-                'wrong orientation for right'
-            assert figure._choose_orientation(Direction.RIGHT) == Orientation.U, \
-                'wrong orientation for left'
+        figure.place_state(((3, 5), FigureOrientation.T_U))
+        figure.place_state(((3, 6), FigureOrientation.T_L))
+        expected = Window((3, 6), FigureOrientation.T_L, grid, Direction.DOWN)
+        assert figure.window is window, 'window changed'
+        assert window.map_window == expected.map_window, 'cached cells'
+        assert window.get_window == expected.get_window, 'cached window'
+        assert set(grid.get_blocked) == set(expected.map_window), 'wrong blocked'
 
     @pytest.mark.skip('TODO: rewrite me')
     @pytest.mark.parametrize(
@@ -435,3 +593,134 @@ class TestFigure:
         assert figure.window.top_left == (0, 0), 'wrong top left'
         assert figure.window.orientation.name[2] == result, \
             'wrong orientation'
+
+    def test_frozen_index(self, grid: Grid) -> None:
+        """Test frozen counts, lines and touched lines
+        """
+        for x in range(3, 7):
+            grid.grid[x][5].freeze()
+        grid.grid[3][9].freeze()
+        assert grid.frozen_counts[1][5] == 4, 'wrong row count'
+        assert grid.frozen_counts[0][3] == 2, 'wrong column count'
+        assert grid.frozen_line(1, 5) == 0b1111000, 'wrong row mask'
+        assert grid.touched_lines == ({3, 4, 5, 6}, {5, 9}), 'wrong touched'
+        grid.grid[4][5].clear()
+        grid.grid[3][9].block()
+        assert grid.frozen_counts[1][5] == 3, 'wrong row count'
+        assert grid.frozen_counts[0][3] == 1, 'wrong column count'
+        assert grid.frozen_line(1, 5) == 0b1101000, 'wrong row mask'
+
+    def test_zobrist_hash(self, grid: Grid) -> None:
+        """Test hashes follow cells states and don't depend
+        on the order of changes
+        """
+        keys = get_zobrist_keys(grid.cells)
+        grid.grid[1][2].freeze()
+        grid.grid[3][4].block()
+        assert grid.board_hash == keys[CellState.FR0ZEN][1 * grid.cells + 2] \
+            ^ keys[CellState.BLOCK][3 * grid.cells + 4], 'wrong board hash'
+        assert grid.frozen_hash == keys[CellState.FR0ZEN][1 * grid.cells + 2], \
+            'wrong frozen hash'
+        other = type(grid)()
+        other.grid[3][4].freeze()
+        other.grid[3][4].block()
+        other.grid[1][2].block()
+        other.grid[1][2].freeze()
+        assert other.board_hash == grid.board_hash, 'wrong board hash'
+        assert other.frozen_hash == grid.frozen_hash, 'wrong frozen hash'
+        grid.grid[1][2].clear()
+        grid.grid[3][4].clear()
+        assert grid.board_hash == grid.frozen_hash == 0, 'clear grid hash'
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_get_runs(self, seed: int) -> None:
+        """Test bits of runs are bits of frozen runs of lenght
+        or longer
+        """
+        rnd = random.Random(seed)
+        for _ in range(200):
+            grid = Grid()
+            for x in range(grid.cells):
+                if rnd.random() < 0.7:
+                    grid.grid[x][0].freeze()
+            lenght = rnd.randrange(1, grid.cells + 2)
+            expected = []
+            k = 0
+            line = [grid.is_frozen((x, 0)) for x in range(grid.cells)]
+            for is_frozen, run in groupby(line):
+                run_lenght = len(list(run))
+                if is_frozen and run_lenght >= lenght:
+                    expected.extend(range(k, k + run_lenght))
+                k += run_lenght
+            assert get_bits(get_runs(grid.frozen_line(1, 0), lenght)) == expected, \
+                'wrong runs'
+
+    def test_get_runs_with_step(self) -> None:
+        """Test runs with step between bits
+        """
+        mask = sum(1 << (k * 10) for k in [0, 1, 2, 5, 6])
+        assert get_runs(mask, 3, 10) == sum(1 << (k * 10) for k in [0, 1, 2]), \
+            'wrong runs'
+        assert get_runs(mask, 2, 10) == mask, 'wrong runs'
+
+    def test_pop_dirty(self, grid: Grid) -> None:
+        """Test changed cells are marked dirty
+        """
+        grid.grid[1][1].block()
+        grid.grid[2][2].freeze()
+        grid.grid[3][3].clear()
+        assert grid.pop_dirty() == {(1, 1), (2, 2)}, 'wrong dirty'
+        assert grid.pop_dirty() == set(), 'dirty not reset'
+
+
+class TestBitGrid:
+    """Test BitGrid bitboards
+    """
+
+    @pytest.fixture(scope='function')
+    def bitgrid(self) -> BitGrid:
+        """BitGrid fixture
+        """
+        return BitGrid()
+
+    def test_bitboards_follow_cells(self, bitgrid: BitGrid) -> None:
+        """Test bitboards are changed with cells states
+        """
+        bitgrid.grid[1][2].freeze()
+        bitgrid.grid[3][4].block()
+        assert bitgrid.frozen == bitgrid.bit((1, 2)), 'wrong frozen board'
+        assert bitgrid.blocked == bitgrid.bit((3, 4)), 'wrong blocked board'
+        assert bitgrid.frozen_count == 1, 'wrong frozen count'
+        assert bitgrid.blocked_count == 1, 'wrong blocked count'
+        bitgrid.grid[1][2].block()
+        assert bitgrid.frozen == 0, 'wrong frozen board'
+        assert bitgrid.blocked_count == 2, 'wrong blocked count'
+        bitgrid.freeze_blocked()
+        assert bitgrid.blocked == 0, 'wrong blocked board'
+        assert bitgrid.frozen_count == 2, 'wrong frozen count'
+
+    def test_frozen_line(self, bitgrid: BitGrid) -> None:
+        """Test frozen line masks
+        """
+        for x in range(3, 7):
+            bitgrid.grid[x][5].freeze()
+        assert bitgrid.frozen_line(1, 5) == 0b1111000, 'wrong row mask'
+        assert bitgrid.frozen_line(0, 3) == 1 << 5, 'wrong column mask'
+        bitgrid.grid[4][5].clear()
+        assert bitgrid.frozen_line(1, 5) == 0b1101000, 'wrong row mask'
+        assert bitgrid.frozen_line(0, 4) == 0, 'wrong column mask'
+
+    def test_has_frozen(self, bitgrid: BitGrid) -> None:
+        """Test has frozen with bitmask
+        """
+        figure_mask = get_figure_mask(FigureOrientation.O, (4, 4))
+        assert not bitgrid.has_frozen(figure_mask), 'has frozen'
+        bitgrid.grid[5][5].freeze()
+        assert bitgrid.has_frozen(figure_mask), 'not has frozen'
+
+    def test_mask(self, bitgrid: BitGrid) -> None:
+        """Test cells mask
+        """
+        cells = [bitgrid.grid[0][0], bitgrid.grid[5][5]]
+        assert bitgrid.mask(cells) == bitgrid.bit((0, 0)) | bitgrid.bit((5, 5)), \
+            'wrong mask'
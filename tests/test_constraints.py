@@ -1,5 +1,6 @@
 import pytest
-from constraints import FigureOrientation
+from constraints import FigureOrientation, Direction, get_board
+from constraints import GameConst as const
 
 
 @pytest.fixture(scope='function', params=FigureOrientation.get_includes())
@@ -19,3 +20,45 @@ def test_figure_orientation_color(orientation: FigureOrientation) -> None:
     """Test figure color
     """
     assert isinstance(orientation.get_figure_color(), int), 'not a color'
+
+
+class TestBoard:
+    """Test board geometry
+    """
+
+    def test_default_board(self) -> None:
+        """Test geometry and line lenght rules of board of default size
+        """
+        board = get_board()
+        assert board.cells == const.CELLS, 'wrong cells'
+        assert board.arrive == [(x, -4) for x in range(30)] + [(x, 34) for x in range(30)] \
+            + [(-4, y) for y in range(30)] + [(34, y) for y in range(30)], 'wrong arrive'
+        assert board.quarters == {
+            Direction.RIGHT: {(x, y) for x in range(-4, 17) for y in range(0, 34)},
+            Direction.LEFT: {(x, y) for x in range(17, 37) for y in range(0, 34)},
+            Direction.UP: {(x, y) for x in range(0, 34) for y in range(17, 37)},
+            Direction.DOWN: {(x, y) for x in range(0, 34) for y in range(-4, 17)},
+                }, 'wrong quarters'
+        assert board.start_clear_lenght == const.START_CLEAR_LENGTH, 'wrong start'
+        assert board.max_clear_lenght == const.MAX_CLEAR_LENGHT, 'wrong max'
+        assert get_board() is board, 'not stored'
+
+    def test_scaled_board(self) -> None:
+        """Test geometry and line lenght rules of large board
+        """
+        board = get_board(128)
+        assert len(board.arrive) == 4 * 124, 'wrong arrive'
+        assert board.arrive_directions[128, 5] == Direction.LEFT, \
+            'wrong right edge'
+        assert board.arrive_directions[5, -4] == Direction.DOWN, 'wrong top edge'
+        assert (63, 0) in board.quarters[Direction.RIGHT], 'not in left half'
+        assert (64, 0) in board.quarters[Direction.LEFT], 'not in right half'
+        assert (130, 127) in board.quarters[Direction.LEFT], 'not out of grid'
+        assert board.start_clear_lenght == 22, 'wrong start'
+        assert board.max_clear_lenght == 37, 'wrong max'
+
+    def test_small_board_raises(self) -> None:
+        """Test board without space for figures isn't made
+        """
+        with pytest.raises(ValueError, match='at least 8 cells'):
+            get_board(7)
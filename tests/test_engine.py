@@ -0,0 +1,461 @@
+import pytest
+import random
+import sys
+import inspect
+from functools import partial
+from typing import Optional
+import engine as engine_module
+from engine import Engine, ClearResult, GameEvent
+from blocks import Grid, BitGrid, Figure, Window
+from constraints import Action, Direction, Event, FigureOrientation
+from constraints import GameConst as const
+from tests.conftest import FixedSeed, play_random_game
+
+
+def recursive_chunked(
+    line: list[int],
+    chunked: list[list[int]],
+        ) -> tuple[list, list[list[int]]]:
+    """Separate line to chunked lines with recursion, like before
+    bitmask runs
+    """
+    chunk = []
+    while line:
+        a = line.pop()
+        if chunk:
+            if chunk[-1] - a == 1:
+                chunk.append(a)
+            else:
+                line.append(a)
+                line, chunked = recursive_chunked(line, chunked)
+        else:
+            chunk.append(a)
+    chunked.append(chunk)
+    return line, chunked
+
+
+def chunked_check_line(
+    line_lenght: int,
+    dimension: int,
+    frozen_pos: list[tuple[int, int]],
+        ) -> Optional[list[tuple[int, int]]]:
+    """Check line with chunked lines, like before bitmask runs
+    """
+    s_d = 0 if dimension else 1
+    comparison = [c[dimension] for c in frozen_pos]
+    for n in range(min(comparison), max(comparison) + 1):
+        line = [pos for pos in frozen_pos if pos[dimension] == n]
+        if len(line) >= line_lenght:
+            _, chunked = recursive_chunked(sorted([pos[s_d] for pos in line]), [])
+            to_clear = [
+                n for chunk in chunked
+                for n in chunk
+                if len(chunk) >= line_lenght
+                    ]
+            if to_clear:
+                return [pos for pos in line if pos[s_d] in to_clear]
+
+
+def sign(n: int) -> int:
+    """Return sign of int
+    """
+    if n > 0:
+        return 1
+    elif n == 0:
+        return 0
+    else:
+        return -1
+
+
+class BaselineEngine(Engine):
+    """Engine, that clears lines like before cascade loop: with recursion,
+    chunked lines of one frozen snapshot for both dimensions, shift
+    without grid bounds and changes of score per cleared cell
+    """
+
+    def clear_lines(self) -> None:
+        frozen_pos = [cell.pos for cell in self.grid.get_frozen]
+        if len(frozen_pos) >= self.line_lenght:
+            for dim in [0, 1]:
+                line = chunked_check_line(self.line_lenght, dim, frozen_pos)
+                if line:
+                    for pos in line:
+                        self.grid.grid[pos[0]][pos[1]].clear()
+                        self.score += const.PRIZE_BY_CLEAR
+                        if self.score // const.SPEED_MODIFICATOR > self.speed \
+                                and self.speed < const.MAX_GAME_SPEED:
+                            self.speed += 1
+                        if self.score // const.LENGHT_MODIFICATOR > \
+                            self.line_lenght - const.START_CLEAR_LENGTH \
+                                and self.line_lenght < const.MAX_CLEAR_LENGHT:
+                            self.line_lenght += 1
+                    shifted = self.get_shifted_frozen(line)
+                    if shifted:
+                        self.move_shifted_frozen(shifted)
+                    self.clear_lines()
+
+    def get_shifted_frozen(
+        self,
+        line: list[tuple[int, int]]
+            ) -> list[tuple[int, int]]:
+        grid = self.grid.grid
+        quarter = self.figure.window.quarter
+        shift_x, shift_y = 0, 0
+        shifted = []
+        while True:
+            shift_x, shift_y = self.get_shift(shift_x, shift_y)
+            s_x, s_y = sign(shift_x), sign(shift_y)
+            sh = []
+            for pos in line:
+                p = (pos[0]+shift_x, pos[1]+shift_y)
+                if p in quarter \
+                        and p not in line \
+                        and grid[p[0]][p[1]].is_frozen \
+                        and (
+                            grid[p[0]-s_x][p[1]-s_y].is_frozen
+                            or grid[p[0]-s_x][p[1]-s_y].pos in line
+                                ):
+                    sh.append(p)
+            if sh:
+                shifted.extend(sh)
+            else:
+                break
+        return shifted
+
+    def move_shifted_frozen(self, shifted: list[tuple[int, int]]) -> None:
+        shift_x, shift_y = self.get_shift(0, 0)
+        quarter = self.figure.window.quarter
+        [self.grid.grid[pos[0]][pos[1]].clear() for pos in shifted]
+        [
+            self.grid.grid[pos[0]-shift_x][pos[1]-shift_y].freeze()
+            for pos in shifted
+            if pos in quarter
+                ]
+
+
+@pytest.fixture(scope='function')
+def engine() -> Engine:
+    """Make headless engine
+    """
+    with FixedSeed(42):
+        return Engine()
+
+
+class TestEngine:
+    """Test headless engine
+    """
+
+    def test_engine_is_pyxel_free(self) -> None:
+        """Test engine module doesn't use pyxel
+        """
+        assert not hasattr(engine_module, 'pyxel'), 'pyxel imported'
+
+    def test_engine_init(self, engine: Engine) -> None:
+        """Test engine init
+        """
+        assert engine.score == 0, 'wrong score'
+        assert engine.speed == 0, 'wrong speed'
+        assert engine.line_lenght == const.START_CLEAR_LENGTH, 'wrong line lenght'
+        assert isinstance(engine.grid, Grid), 'wrong grid'
+        assert isinstance(engine.figure, Figure), 'wrong figure'
+        assert isinstance(engine.figure_next, Figure), 'wrong next figure'
+        assert not engine.is_game_over, 'game over'
+
+    def test_step_counts_frames(self, engine: Engine) -> None:
+        """Test step without action increase frame counter
+        """
+        engine.step()
+        assert engine.frame_count_from_last_move == const.START_FRAME_COUNT + 1, \
+            'wrong frame count'
+
+    def test_step_gravity(self, engine: Engine) -> None:
+        """Test figure moves in its direction when frames overflow
+        """
+        engine.figure.window.move_direction = Direction.RIGHT
+        x, y = engine.figure.window.top_left
+        engine.frame_count_from_last_move = const.GAME_SPEED_LIMIT
+        engine.step()
+        assert engine.figure.window.top_left == (x+1, y), 'not moved'
+        assert engine.frame_count_from_last_move == const.START_FRAME_COUNT, \
+            'frame count not reset'
+
+    @pytest.mark.parametrize(
+        'action,shift', [
+            (Action.UP, (0, -1)),
+            (Action.DOWN, (0, 1)),
+                ]
+            )
+    def test_step_move(
+        self,
+        engine: Engine,
+        action: Action,
+        shift: tuple[int, int]
+            ) -> None:
+        """Test step moves figure across its move direction
+        """
+        engine.figure.window.top_left = (0, 10)
+        engine.figure.window.move_direction = Direction.RIGHT
+        engine.step(action)
+        assert engine.figure.window.top_left == (shift[0], 10 + shift[1]), \
+            'not moved'
+
+    def test_step_rotate(self, engine: Engine) -> None:
+        """Test step rotates figure
+        """
+        figure = Figure(Window(
+            (0, 10), FigureOrientation.T_U, engine.grid, Direction.RIGHT
+                ))
+        engine.figure = figure
+        engine.step(Action.ROTATE_RIGHT)
+        assert engine.figure.window.orientation == FigureOrientation.T_L, \
+            'not rotated'
+
+    def test_play_until_game_over(self, engine: Engine) -> None:
+        """Test engine plays a full game headless
+        """
+        with FixedSeed(42):
+            for _ in range(100000):
+                engine.step()
+                if engine.is_game_over:
+                    break
+        assert engine.is_game_over, 'game not ended'
+        assert engine.grid.get_frozen, 'nothing frozen'
+
+    def test_bitgrid_plays_same_game(self) -> None:
+        """Test BitGrid backend gives the same game as Grid
+        """
+        results = []
+        for grid_class in [Grid, BitGrid]:
+            engine = Engine(grid_class)
+            play_random_game(engine, 3)
+            results.append(
+                (engine.score, [cell.pos for cell in engine.grid.get_frozen])
+                    )
+        assert results[0] == results[1], 'different games'
+
+    @pytest.mark.parametrize('cells', [128, 256])
+    def test_plays_large_board(self, cells: int) -> None:
+        """Test backends give the same game on large board, figures
+        arrive at its edges and line lenght rules are scaled
+        """
+        results = []
+        for grid_class in [Grid, BitGrid]:
+            engine = Engine(partial(grid_class, cells=cells), 3)
+            assert engine.line_lenght == engine.grid.board.start_clear_lenght, \
+                'wrong line lenght'
+            arrive = set(engine.grid.board.arrive)
+            assert engine.figure_next.window.top_left in arrive, 'wrong arrive'
+            rnd = random.Random(3)
+            for _ in range(3000):
+                figure = engine.figure_next
+                engine.step(rnd.choice([None, *Action]))
+                if engine.figure_next is not figure:
+                    assert engine.figure_next.window.top_left in arrive, \
+                        'wrong arrive'
+            results.append(
+                (engine.score, [cell.pos for cell in engine.grid.get_frozen])
+                    )
+        assert results[0] == results[1], 'different games'
+        assert results[0][1], 'nothing frozen'
+
+    def test_step_constructs_only_arrived_windows(self, monkeypatch) -> None:
+        """Test moves and gravity relocate figure window, so windows
+        are constructed only for arrived figures
+        """
+        counts = {'windows': 0, 'arrived': 0}
+        init = Window.__init__
+        arrive = Engine.arrive_figure
+
+        def count_window(*args, **kwargs) -> None:
+            counts['windows'] += 1
+            init(*args, **kwargs)
+
+        def count_arrive(self) -> Figure:
+            counts['arrived'] += 1
+            return arrive(self)
+
+        monkeypatch.setattr(Window, '__init__', count_window)
+        monkeypatch.setattr(Engine, 'arrive_figure', count_arrive)
+        engine = Engine(Grid)
+        play_random_game(engine, 4)
+        assert counts['arrived'] > 2, 'not played'
+        assert counts['windows'] == counts['arrived'], 'windows constructed'
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_find_line_as_chunked(self, engine: Engine, seed: int) -> None:
+        """Test find line gives the same line as chunked lines
+        on random boards
+        """
+        rnd = random.Random(seed)
+        for x in range(engine.grid.cells):
+            for y in range(engine.grid.cells):
+                if rnd.random() < 0.6:
+                    engine.grid.grid[x][y].freeze()
+        frozen_pos = [cell.pos for cell in engine.grid.get_frozen]
+        expected = chunked_check_line(engine.line_lenght, 0, frozen_pos) \
+            or chunked_check_line(engine.line_lenght, 1, frozen_pos)
+        assert engine.find_line() == expected, 'wrong line'
+
+    @pytest.mark.parametrize('seed', [5, 11, 12])
+    def test_clear_lines_as_baseline(self, seed: int) -> None:
+        """Test cascade loop plays the same game as baseline recursive
+        clear, when its bugs are not triggered
+        """
+        results = []
+        for engine_class in [BaselineEngine, Engine]:
+            engine = engine_class(BitGrid)
+            play_random_game(engine, seed)
+            results.append((
+                engine.score,
+                engine.speed,
+                engine.line_lenght,
+                [cell.pos for cell in engine.grid.get_frozen],
+                    ))
+        assert results[0] == results[1], 'different games'
+
+    @pytest.mark.parametrize('engine_class', [BaselineEngine, Engine])
+    def test_clear_lines_once(self, engine_class: type[Engine]) -> None:
+        """Test line of second dimension is cleared and scored once,
+        baseline cleared it again from stale frozen snapshot
+        """
+        engine = engine_class(Grid, 1)
+        engine.figure.window.move_direction = Direction.DOWN
+        engine.figure.window._quarter = None
+        for n in range(10, 16):
+            engine.grid.grid[5][n].freeze()
+            engine.grid.grid[n][3].freeze()
+        engine.clear_lines()
+        expected = const.PRIZE_BY_CLEAR * 12
+        if engine_class is BaselineEngine:
+            assert engine.score == expected * 3 // 2, 'baseline bug not reproduced'
+        else:
+            assert engine.score == expected, 'wrong score'
+        assert engine.grid.get_frozen == [], 'wrong frozen'
+
+    @pytest.mark.parametrize('engine_class', [BaselineEngine, Engine])
+    def test_clear_lines_at_board_edge(self, engine_class: type[Engine]) -> None:
+        """Test shift of line cleared at board edge doesn't wrap
+        to the opposite edge, baseline moved opposite cells
+        with negative indexes
+        """
+        engine = engine_class(Grid, 1)
+        engine.figure.window.move_direction = Direction.RIGHT
+        engine.figure.window._quarter = None
+        for y in range(10, 16):
+            engine.grid.grid[0][y].freeze()
+        opposite = [(const.CELLS - 1, y) for y in range(10, 15)]
+        for x, y in opposite:
+            engine.grid.grid[x][y].freeze()
+        engine.clear_lines()
+        frozen = [cell.pos for cell in engine.grid.get_frozen]
+        assert engine.score == const.PRIZE_BY_CLEAR * 6, 'wrong score'
+        if engine_class is BaselineEngine:
+            assert frozen == [(0, y) for y in range(10, 15)], \
+                'baseline bug not reproduced'
+        else:
+            assert frozen == opposite, 'wrong frozen'
+
+    def test_clear_lines_result(self, engine: Engine) -> None:
+        """Test aggregated result of cascade
+        """
+        engine.figure.window.move_direction = Direction.DOWN
+        for y in [0, 2]:
+            for x in range(engine.line_lenght):
+                engine.grid.grid[x][y].freeze()
+        lenght = engine.line_lenght
+        assert engine.clear_lines() == ClearResult(
+            lenght * 2, 2, const.PRIZE_BY_CLEAR * lenght * 2
+                ), 'wrong result'
+        assert engine.clear_lines() == ClearResult(), 'wrong empty result'
+
+    def test_clear_lines_over_recursion_limit(self) -> None:
+        """Test cascade of more lines than recursion limit allows
+        for recursive clear
+        """
+        results = []
+        for engine_class in [BaselineEngine, Engine]:
+            engine = engine_class(Grid, 1)
+            engine.figure.window.move_direction = Direction.DOWN
+            for y in range(0, const.CELLS, 2):
+                for x in range(const.CELLS):
+                    engine.grid.grid[x][y].freeze()
+            limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(len(inspect.stack()) + 20)
+            try:
+                results.append(engine.clear_lines())
+            except RecursionError:
+                results.append(None)
+            finally:
+                sys.setrecursionlimit(limit)
+        assert results[0] is None, 'recursive clear is not limited'
+        assert results[1].lines == const.CELLS // 2, 'wrong lines'
+
+    def test_clear_lines(self, engine: Engine) -> None:
+        """Test clear lines clears only touched lines
+        """
+        engine.figure.window.move_direction = Direction.DOWN
+        for x in range(engine.line_lenght):
+            engine.grid.grid[x][0].freeze()
+        engine.clear_lines()
+        assert not engine.grid.get_frozen, 'not cleared'
+        assert engine.score == const.PRIZE_BY_CLEAR * engine.line_lenght, \
+            'wrong score'
+        assert engine.grid.touched_lines == (set(), set()), 'wrong touched'
+
+
+class TestEvents:
+    """Test game events queue
+    """
+
+    @pytest.fixture(scope='function')
+    def engine(self) -> Engine:
+        """Engine, that records events
+        """
+        engine = Engine(BitGrid, 4)
+        engine.record_events = True
+        return engine
+
+    def test_headless_records_nothing(self) -> None:
+        """Test events aren't queued by default
+        """
+        engine = Engine(BitGrid, 4)
+        play_random_game(engine, 4)
+        assert engine.drain_events() == [], 'events queued'
+
+    def test_moved_and_rotated(self, engine: Engine) -> None:
+        """Test player moves and rotations events
+        """
+        engine.figure.window = Window(
+            (15, 26),
+            FigureOrientation.I_U,
+            engine.grid,
+            Direction.UP,
+                )
+        engine.step(Action.LEFT)
+        assert engine.figure.window.top_left[0] == 14, 'not moved'
+        assert engine.drain_events()[0] == GameEvent(Event.MOVED), 'not moved event'
+        engine.step(Action.ROTATE_RIGHT)
+        assert engine.figure.window.orientation == FigureOrientation.I_L, 'not rotated'
+        assert engine.drain_events()[0] == GameEvent(Event.ROTATED), 'not rotated event'
+        assert engine.drain_events() == [], 'not drained'
+
+    def test_lines_cleared_and_speed_up(self, engine: Engine) -> None:
+        """Test cleared lines event with result and speed up event
+        """
+        engine.figure.window.move_direction = Direction.DOWN
+        engine.score = const.SPEED_MODIFICATOR - const.PRIZE_BY_CLEAR
+        for x in range(engine.line_lenght):
+            engine.grid.grid[x][0].freeze()
+        result = engine.clear_lines()
+        assert engine.drain_events() == [
+            GameEvent(Event.LINES_CLEARED, result),
+            GameEvent(Event.SPEED_UP, 1),
+                ], 'wrong events'
+
+    def test_game_events(self, engine: Engine) -> None:
+        """Test seeded game has locks, moves and ends with game over
+        """
+        play_random_game(engine, 4)
+        events = {event.event for event in engine.drain_events()}
+        assert {Event.MOVED, Event.LOCKED, Event.GAME_OVER} <= events, \
+            'wrong events'
@@ -0,0 +1,121 @@
+import pytest
+import random
+np = pytest.importorskip('numpy')
+from env import KektrisEnv, KektrisVecEnv
+from batch import ORIENTATIONS
+from constraints import Action, Direction
+from constraints import GameConst as const
+
+
+def random_actions(seed: int, n: int) -> list[int]:
+    """Random action codes
+    """
+    rnd = random.Random(seed)
+    return [rnd.randrange(KektrisEnv.action_count) for _ in range(n)]
+
+
+class TestKektrisEnv:
+    """Test single game environment
+    """
+
+    def test_reset(self) -> None:
+        """Test first observation
+        """
+        env = KektrisEnv()
+        obs = env.reset(42)
+        assert obs['board'].shape == (const.CELLS, const.CELLS), 'wrong board'
+        assert not obs['board'].any(), 'board not clear'
+        assert ORIENTATIONS[obs['figure']] \
+            == env.engine.figure.window.orientation, 'wrong figure'
+        assert ORIENTATIONS[obs['next_figure']] \
+            == env.engine.figure_next.window.orientation, 'wrong next figure'
+        assert Direction(obs['move_direction']) \
+            == env.engine.figure.window.move_direction, 'wrong direction'
+
+    def test_large_board(self) -> None:
+        """Test observation of board with given size
+        """
+        env = KektrisEnv(64)
+        obs, _, _, _ = env.step(0)
+        assert obs['board'].shape == (64, 64), 'wrong board'
+        obs = KektrisVecEnv(2, 64).reset(1)
+        assert obs['board'].shape == (2, 64, 64), 'wrong boards'
+
+    def test_same_seed_same_game(self) -> None:
+        """Test seeded games are the same
+        """
+        results = []
+        for _ in range(2):
+            env = KektrisEnv()
+            env.reset(7)
+            rewards = 0
+            for action in random_actions(7, 5000):
+                obs, reward, done, info = env.step(action)
+                rewards += reward
+                if done:
+                    break
+            assert rewards == info['score'], 'rewards are not score'
+            results.append((obs['board'].tolist(), info))
+        assert results[0] == results[1], 'not the same game'
+
+    def test_step_board(self) -> None:
+        """Test board observation shows blocked and frozen cells
+        """
+        env = KektrisEnv()
+        env.reset(1)
+        while not env.engine.grid.get_frozen:
+            obs, _, _, _ = env.step(Action.DOWN)
+        frozen = {cell.pos for cell in env.engine.grid.get_frozen}
+        blocked = {cell.pos for cell in env.engine.grid.get_blocked}
+        assert {tuple(pos) for pos in np.argwhere(obs['board'] == 2).tolist()} \
+            == frozen, 'wrong frozen'
+        assert {tuple(pos) for pos in np.argwhere(obs['board'] == 1).tolist()} \
+            == blocked, 'wrong blocked'
+
+
+class TestKektrisVecEnv:
+    """Test vectorized environment
+    """
+
+    def test_reset(self) -> None:
+        """Test first observations
+        """
+        env = KektrisVecEnv(4)
+        obs = env.reset(10)
+        assert obs['board'].shape == (4, const.CELLS, const.CELLS), 'wrong boards'
+        for key in ['figure', 'next_figure', 'move_direction']:
+            assert obs[key].shape == (4, ), 'wrong shape'
+
+    def test_same_as_single(self) -> None:
+        """Test game i of vectorized environment is the single game
+        with seed + i
+        """
+        env = KektrisVecEnv(3)
+        env.reset(20)
+        singles = [KektrisEnv() for _ in range(3)]
+        for i, single in enumerate(singles):
+            single.reset(20 + i)
+        actions = np.array([random_actions(i, 300) for i in range(3)]).T
+        for step in actions:
+            obs, rewards, dones, _ = env.step(step)
+            for i, single in enumerate(singles):
+                s_obs, s_reward, s_done, _ = single.step(int(step[i]))
+                assert rewards[i] == s_reward, 'wrong reward'
+                assert dones[i] == s_done, 'wrong done'
+                if not s_done:
+                    for key in s_obs:
+                        assert (obs[key][i] == s_obs[key]).all(), 'wrong observation'
+
+    def test_autoreset(self) -> None:
+        """Test ended games are reset
+        """
+        env = KektrisVecEnv(2)
+        env.reset(3)
+        for _ in range(100000):
+            obs, _, dones, info = env.step(np.zeros(2, dtype=np.int8))
+            if dones.any():
+                break
+        i = int(np.flatnonzero(dones)[0])
+        assert not obs['board'][i].any(), 'not reset'
+        assert not env.batch.game_over.any(), 'game over'
+        assert env.batch.scores[i] == 0, 'score not reset'
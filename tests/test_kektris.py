@@ -1,11 +1,38 @@
 import pytest
+import pyxel
+import random
 from kektris.kektris import Game
 from blocks import Grid, Figure
-from constraints import FigureOrientation, Direction
+from engine import Engine
+from constraints import FigureOrientation, Direction, Event
 from constraints import GameConst as const
+from replay import simulate
 from tests.conftest import FixedSeed
 
 
+draw_cells = Game.draw_cells
+
+
+class ImageMock:
+    """Image bank mock, that records rect calls
+    """
+    def __init__(self) -> None:
+        self.rects = []
+
+    def rect(self, *args) -> None:
+        self.rects.append(args)
+
+
+class LayerMock:
+    """Image bank mock, that counts drawing calls
+    """
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __getattr__(self, name: str):
+        return lambda *args: self.calls.append((name, args))
+
+
 class TestGame:
     """Test game interfaces
     """
@@ -19,6 +46,17 @@ class TestGame:
         assert isinstance(make_app.grid, Grid), 'wrong grid'
         assert not make_app.grid_higlight, 'grid highlited'
 
+    def test_board_size(self, mock_app) -> None:
+        """Test game of given board size and board, that doesn't fit
+        pyxel screen
+        """
+        game = Game(cells=20)
+        assert game.grid.cells == 20, 'wrong board'
+        assert game.layout.cells == 20, 'wrong layout'
+        assert game.recorder.replay.cells == 20, 'wrong replay board'
+        with pytest.raises(ValueError, match="doesn't fit"):
+            Game(cells=40)
+
     def test_generate_figure_start_position(self, make_app: Game) -> None:
         """Test random figure generation
         """
@@ -39,45 +77,28 @@ class TestGame:
             assert figures['I_U'] == 24, 'wrong sample'
 
     def test_arrive_figure(self, make_app: Game) -> None:
-        """Test arrive figure
+        """Test arrive figure from random stream of the game
         """
-        with FixedSeed(42):
-            figure = make_app.arrive_figure()
-            assert isinstance(figure, Figure), 'wrong figure move_direction'
-            assert figure.window.top_left == (-4, 21), \
-                'wrong top left position'
-            assert figure.window.orientation == FigureOrientation.I_R, \
-                'wrong orientation'
-
-    def test_get_chunked(self, make_app: Game) -> None:
-        """Test get chunked
-        """
-        i = [1, 2, 3]
-        line, chunked = make_app.get_chunked(i, [])
-        assert not line, 'line nt empty'
-        assert isinstance(line, list), 'wrong line type'
-        assert isinstance(chunked, list), 'wrong chunked type'
-        assert len(chunked) == 1, 'wrong chunked len'
-        assert chunked[0] == [3, 2, 1], 'wrong chunk'
+        make_app.random = random.Random(42)
+        figure = make_app.arrive_figure()
+        assert isinstance(figure, Figure), 'wrong figure move_direction'
+        assert figure.window.top_left == (-4, 21), \
+            'wrong top left position'
+        assert figure.window.orientation == FigureOrientation.I_R, \
+            'wrong orientation'
 
-    @pytest.mark.parametrize(
-        'i,ch', [
-            ([1, 2, 3, 4, 5, 6, 8, 9], [[6, 5, 4, 3, 2, 1], [9, 8]]),
-            ([1, 3], [[1], [3]]),
-            ([1, 2, 5, 6, 8, 9], [[2, 1], [6, 5], [9, 8]])
-                    ]
-                )
-    def test_get_chunked_parts(self, make_app: Game, i: list[int], ch: list[list[int]]) -> None:
-        """Test get chunked multiple parts
-        """
-        line, chunked = make_app.get_chunked(i, [])
-        assert not line, 'line nt empty'
-        assert isinstance(line, list), 'wrong line type'
-        assert isinstance(chunked, list), 'wrong chunked type'
-        assert len(chunked) == len(ch), 'wrong chunked len'
-        assert isinstance(chunked[0], list), 'wrong chunk type'
-        assert chunked[0] == ch[0], 'wrong chunked'
-        assert chunked[1] == ch[1], 'wrong chunked'
+    def test_reset_with_seed(self, make_app: Game) -> None:
+        """Test reset seeds random stream of the game and recorder,
+        global random isn't reseeded
+        """
+        state = random.getstate()
+        make_app.reset(7)
+        assert random.getstate() == state, 'global random reseeded'
+        assert make_app.recorder.seed == 7, 'wrong recorded seed'
+        engine = Engine(seed=7)
+        for figure in ['figure', 'figure_next']:
+            assert getattr(make_app, figure).window.top_left \
+                == getattr(engine, figure).window.top_left, 'wrong figure'
 
     @pytest.mark.parametrize(
         'frozen,result,ost', [
@@ -93,7 +114,7 @@ class TestGame:
                     )
                 ]
             )
-    def test_check_line(
+    def test_find_line(
         self,
         make_app: Game,
         frozen: list[tuple[int, int]],
@@ -104,9 +125,8 @@ class TestGame:
         """
         for p in frozen:
             make_app.grid.grid[p[0]][p[1]].freeze()
-        frozen_pos = [p.pos for p in make_app.grid.get_frozen]
         assert len(make_app.grid.get_frozen) == len(frozen), 'wrong frozen'
-        line = make_app.check_line(1, frozen_pos)
+        line = make_app.find_line()
         assert isinstance(line, list), 'wrong line type'
         assert isinstance(line[0], tuple), 'wrong pos'
         assert line == result, 'wrong comparison'
@@ -114,7 +134,7 @@ class TestGame:
             for p in ost:
                 assert make_app.grid.grid[p[0]][p[1]].is_frozen, 'unfrozen'
 
-    def test_check_line_parts(self, make_app: Game) -> None:
+    def test_find_line_parts(self, make_app: Game) -> None:
         """Test is line is ready to clear if parts
         """
         for p in range(12):
@@ -123,7 +143,7 @@ class TestGame:
             make_app.grid.grid[p][0].freeze()
         frozen_pos = [p.pos for p in make_app.grid.get_frozen]
         assert len(make_app.grid.get_frozen) == 15, 'wrong frozen'
-        line = make_app.check_line(1, frozen_pos)
+        line = make_app.find_line()
         assert isinstance(line, list), 'wrong line type'
         assert isinstance(line[0], tuple), 'wrong pos'
         assert len(line) == 12, 'wrong line lenght'
@@ -251,3 +271,94 @@ class TestGame:
 
         make_app.change_line_lenght()
         assert make_app.line_lenght == const.MAX_CLEAR_LENGHT, 'wrong grown'
+
+    def test_game_replay(self, make_app: Game, monkeypatch) -> None:
+        """Test recorded game can be re-simulated
+        """
+        monkeypatch.setattr(pyxel, 'btnp', lambda *args, **kwargs: False)
+        make_app.paused = False
+        while not make_app.is_game_over:
+            make_app.update()
+        engine = simulate(make_app.recorder.replay)
+        assert engine.is_game_over, 'not ended'
+        assert engine.score == make_app.score, 'wrong score'
+        assert [c.pos for c in engine.grid.get_frozen] \
+            == [c.pos for c in make_app.grid.get_frozen], 'wrong board'
+
+    def test_play_events(self, make_app: Game, monkeypatch) -> None:
+        """Test events of frame are drained and played as sounds
+        """
+        played = []
+        monkeypatch.setattr(pyxel, 'play', lambda ch, snd, **kwargs: played.append((ch, snd)))
+        make_app.drain_events()
+        make_app.emit(Event.MOVED)
+        make_app.emit(Event.SPEED_UP, 1)
+        make_app.emit(Event.GAME_OVER)
+        make_app.play_events()
+        assert played == [(3, 5), (3, 8)], 'wrong sounds'
+        assert make_app.drain_events() == [], 'not drained'
+
+    def test_profiler(self, make_app: Game, monkeypatch) -> None:
+        """Test enabled profiler times game phases
+        """
+        monkeypatch.setattr(pyxel, 'btnp', lambda *args, **kwargs: False)
+        make_app.enable_profiler()
+        make_app.paused = False
+        for _ in range(100):
+            make_app.update()
+        phases = make_app.profiler.phases
+        assert phases['update'].count == 100, 'update not timed'
+        assert phases['input'].count == 100, 'input not timed'
+        assert phases['gravity'].count > 0, 'gravity not timed'
+
+    def test_draw_cells_repaints_dirty(self, make_app: Game, monkeypatch) -> None:
+        """Test only changed cells are repainted
+        """
+        image = ImageMock()
+        monkeypatch.setattr(pyxel, 'image', lambda *args: image)
+        monkeypatch.setattr(pyxel, 'blt', lambda *args: None)
+        make_app.grid.grid[0][0].freeze()
+        draw_cells(make_app)
+        assert image.rects == [(11, 11, 204, 204, 0), (11, 11, 5, 5, 7)], \
+            'wrong full repaint'
+
+        image.rects.clear()
+        draw_cells(make_app)
+        assert not image.rects, 'repainted not changed'
+
+        make_app.grid.grid[0][0].clear()
+        make_app.grid.grid[1][2].freeze()
+        make_app.grid.grid[1][2].freeze()
+        draw_cells(make_app)
+        assert sorted(image.rects) == [(11, 11, 5, 5, 0), (17, 23, 5, 5, 7)], \
+            'wrong dirty repaint'
+
+        image.rects.clear()
+        make_app.reset()
+        draw_cells(make_app)
+        assert image.rects == [(11, 11, 204, 204, 0)], 'not repainted after reset'
+
+    def test_static_layer_baked_once(self, make_app: Game, monkeypatch) -> None:
+        """Test static layer is baked once and rebaked on grid toggle
+        """
+        layer = LayerMock()
+        blitted = []
+        monkeypatch.setattr(pyxel, 'image', lambda *args: layer)
+        monkeypatch.setattr(pyxel, 'blt', lambda *args: blitted.append(args))
+        for name in ['draw_toggles', 'draw_aside', 'mark_grid']:
+            monkeypatch.setattr(Game, name, lambda *args: None)
+        make_app.draw()
+        assert layer.calls[0] == ('cls', (0, )), 'layer not cleared'
+        assert ('blt', (180, 227, 0, 0, 0, 65, 18)) in layer.calls, 'no logo'
+        assert ('line', (10, 10, 10, 214, 13)) not in layer.calls, \
+            'grid highlighted'
+        assert blitted[0] == (0, 0, 2, 0, 0, 256, 256), 'layer not composited'
+
+        layer.calls.clear()
+        make_app.draw()
+        assert not layer.calls, 'layer baked every frame'
+
+        make_app.grid_higlight = True
+        make_app.draw()
+        assert ('line', (10, 10, 10, 214, 13)) in layer.calls, \
+            'grid not highlighted'
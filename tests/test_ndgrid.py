@@ -0,0 +1,207 @@
+import pytest
+import random
+np = pytest.importorskip('numpy')
+from ndgrid import NumpyGrid, NumpyCell, CellViews, shift_mask, get_zobrist_array
+from blocks import Grid, Cell, Window
+from engine import Engine
+from constraints import CellState, Direction, FigureOrientation, get_board
+from constraints import GameConst as const
+from tests.conftest import play_random_game
+from tests import test_blocks
+
+
+@pytest.fixture(scope='function')
+def ndgrid() -> NumpyGrid:
+    return NumpyGrid()
+
+
+def random_grids(seed: int, fill: float) -> tuple[Grid, NumpyGrid]:
+    """Make the same random frozen board with both backends
+    """
+    rnd = random.Random(seed)
+    grids = Grid(), NumpyGrid()
+    for x in range(const.CELLS):
+        for y in range(const.CELLS):
+            if rnd.random() < fill:
+                for grid in grids:
+                    grid.grid[x][y].freeze()
+    return grids
+
+
+class TestNumpyGrid:
+    """Test NumPy grid backend
+    """
+
+    def test_cells_are_views(self, ndgrid: NumpyGrid) -> None:
+        """Test cells read and write state array
+        """
+        cell = ndgrid.grid[3][4]
+        assert isinstance(cell, NumpyCell), 'wrong cell'
+        cell.freeze()
+        assert ndgrid.state[3, 4] == CellState.FR0ZEN.value, 'not frozen'
+        ndgrid.state[3, 4] = CellState.CLEAR.value
+        assert cell.is_clear, 'not clear'
+        cell.block()
+        assert ndgrid.state[3, 4] == CellState.BLOCK.value, 'not blocked'
+        assert ndgrid.get_blocked == [cell], 'wrong blocked'
+
+    def test_freeze_blocked(self, ndgrid: NumpyGrid) -> None:
+        """Test bulk freeze
+        """
+        ndgrid.grid[0][0].block()
+        ndgrid.grid[0][1].block()
+        ndgrid.freeze_blocked()
+        assert not ndgrid.get_blocked, 'blocked'
+        assert [cell.pos for cell in ndgrid.get_frozen] == [(0, 0), (0, 1)], \
+            'wrong frozen'
+        assert ndgrid.frozen_counts[0][0] == 2, 'wrong count'
+
+    def test_shift_mask(self) -> None:
+        """Test shift boolean mask
+        """
+        mask = np.zeros((3, 3), dtype=bool)
+        mask[0, 0] = True
+        assert shift_mask(mask, (1, 2))[1, 2], 'not shifted'
+        assert not shift_mask(mask, (-1, 0)).any(), 'not lost'
+
+    @pytest.mark.parametrize('seed', range(10))
+    def test_find_line(self, seed: int) -> None:
+        """Test line detection is the same as Grid
+        """
+        grid, ndgrid = random_grids(seed, 0.6)
+        for lenght in [const.START_CLEAR_LENGTH, const.MAX_CLEAR_LENGHT]:
+            assert ndgrid.find_line(lenght) == grid.find_line(lenght), \
+                'wrong line'
+        for n in range(const.CELLS):
+            assert ndgrid.frozen_line(0, n) == grid.frozen_line(0, n), \
+                'wrong line mask'
+
+    def test_find_line_of_touched_lines(self, ndgrid: NumpyGrid) -> None:
+        """Test only lines touched since the last search are inspected
+        """
+        for y in range(10, 16):
+            ndgrid.grid[7][y].freeze()
+        ndgrid.touched_lines[0].clear()
+        ndgrid.touched_lines[1].clear()
+        assert ndgrid.find_line(6) is None, 'untouched line found'
+        ndgrid.grid[7][20].freeze()
+        assert ndgrid.find_line(6) == [(7, y) for y in range(10, 16)], 'wrong line'
+        assert ndgrid.touched_lines == ({7}, {20}), 'wrong touched'
+
+    @pytest.mark.parametrize('seed', range(10))
+    @pytest.mark.parametrize(
+        'shift,quarter', [
+            ((-1, 0), get_board().quarters[Direction.RIGHT]),
+            ((1, 0), get_board().quarters[Direction.LEFT]),
+            ((0, 1), get_board().quarters[Direction.UP]),
+            ((0, -1), get_board().quarters[Direction.DOWN]),
+                ]
+            )
+    def test_shift_frozen(
+        self,
+        seed: int,
+        shift: tuple[int, int],
+        quarter: frozenset[tuple[int, int]],
+            ) -> None:
+        """Test frozen shift is the same as Grid
+        """
+        grid, ndgrid = random_grids(seed, 0.7)
+        line = [(x, 20) for x in range(5, 14)] if shift[0] \
+            else [(20, y) for y in range(5, 14)]
+        for g in (grid, ndgrid):
+            [g.grid[x][y].clear() for x, y in line]
+        assert set(ndgrid.get_shifted_frozen(line, shift, quarter)) \
+            == set(grid.get_shifted_frozen(line, shift, quarter)), 'wrong shifted'
+        grid.shift_frozen(line, shift, quarter)
+        ndgrid.shift_frozen(line, shift, quarter)
+        assert [c.pos for c in ndgrid.get_frozen] == [c.pos for c in grid.get_frozen], \
+            'wrong frozen after shift'
+
+    @pytest.mark.parametrize('seed', [1, 7, 42])
+    def test_plays_same_game(self, seed: int) -> None:
+        """Test NumpyGrid backend gives the same game as Grid
+        """
+        results = []
+        for grid_class in [Grid, NumpyGrid]:
+            engine = Engine(grid_class)
+            play_random_game(engine, seed)
+            results.append(
+                (engine.score, [cell.pos for cell in engine.grid.get_frozen])
+                    )
+        assert results[0] == results[1], 'different games'
+
+    @pytest.mark.parametrize('seed', [3, 8])
+    def test_hashes(self, seed: int) -> None:
+        """Test zobrist hashes are the same as Grid
+        """
+        grid, ndgrid = random_grids(seed, 0.4)
+        for g in (grid, ndgrid):
+            g.grid[0][0].block()
+            g.grid[5][6].clear()
+        assert ndgrid.board_hash == grid.board_hash, 'wrong board hash'
+        assert ndgrid.frozen_hash == grid.frozen_hash, 'wrong frozen hash'
+        for g in (grid, ndgrid):
+            for y in range(20, 25):
+                g.grid[9][y].block()
+            g.freeze_blocked()
+            g.shift_frozen([(x, 17) for x in range(5, 14)], (0, 1), get_board().quarters[Direction.UP])
+        assert ndgrid.board_hash == grid.board_hash, 'wrong board hash after bulk'
+        assert ndgrid.frozen_hash == grid.frozen_hash, 'wrong frozen hash after bulk'
+        keys = np.take_along_axis(get_zobrist_array(ndgrid.cells), ndgrid.state[None], 0)
+        assert ndgrid.board_hash == int(np.bitwise_xor.reduce(keys, axis=None)), \
+            'wrong board hash of state array'
+
+    def test_bulk_operations_update_indexes(self, ndgrid: NumpyGrid) -> None:
+        """Test bulk freeze and shift update dirty cells, blocked cells
+        and touched lines as Grid
+        """
+        grid = Grid()
+        for g in (grid, ndgrid):
+            for y in range(5, 10):
+                g.grid[3][y].block()
+            g.grid[3][12].freeze()
+            g.pop_dirty()
+            g.touched_lines[0].clear()
+            g.touched_lines[1].clear()
+            g.freeze_blocked()
+            assert not g.blocked_cells, 'blocked left'
+            g.grid[3][11].freeze()
+            g.shift_frozen([(3, 11)], (0, 1), get_board().quarters[Direction.UP])
+        assert ndgrid.pop_dirty() == grid.pop_dirty(), 'wrong dirty'
+        assert ndgrid.touched_lines == grid.touched_lines, 'wrong touched'
+        assert [c.pos for c in ndgrid.get_frozen] == [c.pos for c in grid.get_frozen], \
+            'wrong frozen'
+
+
+class TestNumpyGridAsGrid(test_blocks.TestGrid):
+    """Test NumPy grid backend with tests of Grid
+    """
+
+    @pytest.fixture(scope='function')
+    def grid(self) -> NumpyGrid:
+        return NumpyGrid()
+
+    def test_grid_init(self, grid: NumpyGrid) -> None:
+        """Test NumpyGrid initialization with cell views
+        """
+        assert grid.cells == 34, 'wrong cells number'
+        assert isinstance(grid.grid, CellViews), 'wrong grid type'
+        assert len(grid.grid) == 34, 'wrong row number'
+        assert len(grid.grid[0]) == 34, 'wrong col number'
+        assert isinstance(grid.grid[0][0], Cell), 'wrong cell'
+        assert grid.grid[17][0].pos == (17, 0), 'wrong cell pos'
+        assert grid.pop_dirty() == set(), 'wrong dirty'
+        assert grid.touched_lines == (set(), set()), 'wrong touched'
+
+    def test_configured_grid(self) -> None:
+        """Test grid with given board size and its windows of cell views
+        """
+        grid = NumpyGrid(cells=64)
+        assert grid.cells == 64 and NumpyGrid.cells == 34, 'wrong cells number'
+        assert grid.state.shape == (64, 64), 'wrong state size'
+        assert grid.board.cells == 64, 'wrong board'
+        window = Window((64, 59), FigureOrientation.I_L, grid)
+        window.relocate((60, 59), FigureOrientation.I_L)
+        assert [cell.pos for cell in window.map_window] \
+            == [(61, 59), (61, 60), (61, 61), (61, 62)], 'wrong cells'
+        assert window.get_window[0][1] == grid.grid[61][59], 'wrong window'
@@ -0,0 +1,101 @@
+import json
+import time
+from profiler import RingBuffer, Profiler
+
+
+class TargetMock:
+    """Records drawing calls
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[tuple] = []
+
+    def rect(self, *args) -> None:
+        self.calls.append(('rect', args))
+
+    def text(self, *args) -> None:
+        self.calls.append(('text', args))
+
+
+class TestRingBuffer:
+    """Test ring buffer of samples
+    """
+
+    def test_keeps_last_samples(self) -> None:
+        """Test the oldest samples are replaced
+        """
+        buffer = RingBuffer(3)
+        for value in range(5):
+            buffer.append(value)
+        assert len(buffer) == 3, 'wrong lenght'
+        assert buffer.count == 5, 'wrong count'
+        assert buffer.values() == [2, 3, 4], 'wrong samples'
+
+    def test_percentiles(self) -> None:
+        """Test nearest rank percentiles
+        """
+        buffer = RingBuffer(200)
+        for value in range(100, 0, -1):
+            buffer.append(value)
+        assert buffer.percentiles((1, 50, 90, 99, 100)) == [1, 50, 90, 99, 100], \
+            'wrong percentiles'
+        assert RingBuffer(5).percentiles((50, 99)) == [0, 0], 'wrong empty percentiles'
+
+
+class TestProfiler:
+    """Test phases profiler
+    """
+
+    def test_instrument(self) -> None:
+        """Test instrumented methods are timed and keep results
+        """
+        class Worker:
+            def work(self, n: int) -> int:
+                time.sleep(0.001)
+                return n * 2
+
+        worker = Worker()
+        profiler = Profiler(size=10)
+        profiler.instrument(worker, {'work': 'job'})
+        assert [worker.work(n) for n in range(3)] == [0, 2, 4], 'wrong results'
+        stats = profiler.stats()
+        assert list(stats) == ['job'], 'wrong phases'
+        assert stats['job']['count'] == 3, 'wrong count'
+        assert stats['job']['p50_us'] >= 1000, 'wrong time'
+        assert stats['job']['max_us'] >= stats['job']['p99_us'] \
+            >= stats['job']['p90_us'] >= stats['job']['p50_us'], 'wrong order'
+
+    def test_dump(self, tmp_path) -> None:
+        """Test stats are dumped as JSON
+        """
+        profiler = Profiler()
+        profiler.record('draw', 2000)
+        profiler.record('draw', 4000)
+        path = tmp_path / 'profile.json'
+        profiler.dump(str(path))
+        assert json.loads(path.read_text()) == {
+            'draw': {
+                'count': 2,
+                'mean_us': 3.0,
+                'p50_us': 2.0,
+                'p90_us': 4.0,
+                'p99_us': 4.0,
+                'max_us': 4.0,
+                    }
+                }, 'wrong dump'
+
+    def test_draw_overlay(self) -> None:
+        """Test overlay has header and line per phase
+        """
+        profiler = Profiler()
+        profiler.record('update', 15000)
+        profiler.record('draw', 250000)
+        target = TargetMock()
+        profiler.draw_overlay(target)
+        texts = [args[2] for name, args in target.calls if name == 'text']
+        assert target.calls[0][0] == 'rect', 'no background'
+        assert texts == [
+            'phase      p50   p99',
+            'update      15    15',
+            'draw       250   250',
+                ], 'wrong overlay'
@@ -0,0 +1,168 @@
+import pytest
+np = pytest.importorskip('numpy')
+from functools import partial
+import render
+from blocks import Grid
+from framebuffer import FrameBuffer, PALETTE_RGB, render_frame
+from engine import Engine
+from constraints import Direction
+from constraints import GameConst as const
+
+
+@pytest.fixture(scope='function')
+def frame() -> FrameBuffer:
+    return FrameBuffer()
+
+
+@pytest.fixture(scope='function')
+def engine() -> Engine:
+    return Engine(seed=42)
+
+
+class TestFrameBuffer:
+    """Test NumPy framebuffer drawing
+    """
+
+    def test_rect_is_clipped(self, frame: FrameBuffer) -> None:
+        """Test rect draws inside image only
+        """
+        frame.rect(-2, 250, 5, 10, 7)
+        assert frame.pixels.sum() == 3 * 6 * 7, 'wrong rect area'
+        assert frame.pget(0, 255) == 7, 'wrong rect pixel'
+        assert frame.pget(3, 255) == 0, 'rect too wide'
+
+    def test_rectb(self, frame: FrameBuffer) -> None:
+        """Test rect border
+        """
+        frame.rectb(10, 10, 5, 4, 1)
+        assert (frame.pixels == 1).sum() == 14, 'wrong border'
+        assert frame.pget(12, 11) == 0, 'border filled'
+        assert frame.pget(14, 13) == 1, 'wrong corner'
+
+    def test_line(self, frame: FrameBuffer) -> None:
+        """Test straight and sloped lines
+        """
+        frame.line(5, 0, 5, 9, 13)
+        assert (frame.pixels[:, 5] == 13).sum() == 10, 'wrong vertical line'
+        frame.cls(0)
+        frame.line(0, 0, 5, 3, 7)
+        assert np.argwhere(frame.pixels).tolist() == [
+            [0, 0], [1, 1], [1, 2], [2, 3], [2, 4], [3, 5]
+                ], 'wrong sloped line'
+
+    def test_text(self, frame: FrameBuffer) -> None:
+        """Test text is drawn with 4x6 pyxel font
+        """
+        frame.text(0, 0, "I-", 10)
+        assert frame.pixels[:6, :4].tolist() == [
+            [10, 10, 10, 0],
+            [0, 10, 0, 0],
+            [0, 10, 0, 0],
+            [0, 10, 0, 0],
+            [10, 10, 10, 0],
+            [0, 0, 0, 0],
+                ], 'wrong glyph'
+        assert frame.pixels[2, 4:8].tolist() == [10, 10, 10, 0], 'wrong advance'
+
+    def test_blt(self, frame: FrameBuffer) -> None:
+        """Test blt copies bank with transparent color key
+        """
+        bank = FrameBuffer(8, 8)
+        bank.rect(0, 0, 2, 2, 9)
+        frame.banks[1] = bank
+        frame.cls(3)
+        frame.blt(10, 10, 1, 0, 0, 4, 4, 0)
+        assert frame.pget(11, 11) == 9, 'not copied'
+        assert frame.pget(12, 12) == 3, 'color key copied'
+        frame.blt(0, 0, 0, 0, 0, 65, 18)
+        assert frame.pget(0, 0) == 3, 'missing bank drawn'
+
+    def test_to_rgb(self, frame: FrameBuffer) -> None:
+        """Test palette image to RGB
+        """
+        frame.pset(1, 2, 8)
+        rgb = frame.to_rgb()
+        assert rgb.shape == (256, 256, 3), 'wrong shape'
+        assert rgb[2, 1].tolist() == PALETTE_RGB[8].tolist(), 'wrong color'
+
+
+class TestRender:
+    """Test headless frame rendering
+    """
+
+    def test_cells(self, engine: Engine) -> None:
+        """Test frozen and blocked cells are drawn
+        """
+        engine.grid.grid[0][0].freeze()
+        engine.grid.grid[2][3].block()
+        pixels = render_frame(engine)
+        color = engine.figure.window.orientation.get_figure_color()
+        assert (pixels[11:16, 11:16] == 7).all(), 'wrong frozen cell'
+        assert pixels[16, 16] == 0, 'wrong cell gap'
+        assert (pixels[29:34, 23:28] == color).all(), 'wrong blocked cell'
+
+    def test_next_figure(self, engine: Engine) -> None:
+        """Test preview of figure, that isn't on grid yet
+        """
+        window = render.next_window(engine)
+        assert window is engine.figure.window, 'wrong preview window'
+        pixels = render_frame(engine)
+        color = window.orientation.get_figure_color()
+        for maps, cells in zip(window.orientation.value, const.NEXT_FIGURE_GRID_POS):
+            for cell, (x, y) in zip(maps, cells):
+                assert bool(pixels[y, x] == color) is cell, 'wrong preview cell'
+
+    def test_markers(self, engine: Engine) -> None:
+        """Test direction marker, axis and central point
+        """
+        engine.figure.window.move_direction = Direction.UP
+        pixels = render_frame(engine, 3)
+        assert pixels[125, 221] == 3, 'no up marker'
+        assert pixels[127, 219] == 3, 'wrong up marker'
+        assert (pixels[112, 10:215] == 3).sum() == 204, 'no axis'
+        assert pixels[112, 112] == 8, 'no central point'
+        pixels = render_frame(engine, 3, paused=True)
+        assert (pixels[112, 10:215] == 3).sum() == 0, 'axis when paused'
+
+    def test_grid_higlight(self, engine: Engine) -> None:
+        """Test grid border and highlight
+        """
+        pixels = render_frame(engine)
+        assert pixels[10, 100] == 1, 'no border'
+        assert pixels[16, 100] == 0, 'grid highlighted'
+        pixels = render_frame(engine, grid_higlight=True)
+        assert pixels[16, 100] == 13, 'grid not highlighted'
+
+    def test_timeouts_not_changed(self, engine: Engine) -> None:
+        """Test render doesn't change flash timeouts
+        """
+        render_frame(engine)
+        assert engine.score_color_timeout == const.COLOR_TIMOUT, 'timeout changed'
+
+    def test_default_layout(self) -> None:
+        """Test layout of default board is the constants layout
+        """
+        layout = render.get_layout()
+        assert layout is render.LAYOUT, 'not stored'
+        assert (layout.width, layout.height) == (256, 256), 'wrong screen'
+        assert list(layout.next_figure_grid) == list(const.NEXT_FIGURE_GRID), \
+            'wrong next figure grid'
+        assert layout.next_figure_grid_pos == const.NEXT_FIGURE_GRID_POS, \
+            'wrong next figure cells'
+
+    def test_large_board_layout(self) -> None:
+        """Test frame of large board has screen, border, central point
+        and aside of its layout
+        """
+        engine = Engine(partial(Grid, cells=48), 42)
+        engine.grid.grid[47][47].freeze()
+        layout = render.get_layout(48)
+        pixels = render_frame(engine)
+        assert pixels.shape == (layout.height, layout.width), 'wrong screen'
+        assert pixels[10, 10 + 48 * 6] == 1, 'no border'
+        assert pixels[layout.center, layout.center] == 8, 'no central point'
+        assert (pixels[11 + 47 * 6:16 + 47 * 6, 11 + 47 * 6:16 + 47 * 6] == 7).all(), \
+            'wrong frozen cell'
+        assert (pixels[20:26, layout.aside:layout.aside + 20] == 10).any(), \
+            'no aside labels'
+        assert (pixels[layout.footer, 14:27] == 1).all(), 'no controls'
@@ -0,0 +1,126 @@
+import pytest
+import random
+from functools import partial
+from blocks import Grid
+from engine import Engine
+from replay import (
+    Replay,
+    ReplayRecorder,
+    encode,
+    decode,
+    save,
+    load,
+    simulate,
+        )
+from constraints import ACTIONS, Action
+from constraints import GameConst as const
+
+
+def record_random_game(seed: int, cells: int = const.CELLS) -> tuple[Engine, Replay]:
+    """Play and record game with random actions on board of given cells
+    """
+    rnd = random.Random(seed)
+    engine = Engine(partial(Grid, cells=cells), seed)
+    recorder = ReplayRecorder(seed, cells)
+    while not engine.is_game_over:
+        action = rnd.choice([Action.LEFT, Action.ROTATE_RIGHT] + [None] * 20)
+        engine.step(action)
+        recorder.record(action)
+    return engine, recorder.replay
+
+
+class TestReplay:
+    """Test replays
+    """
+
+    def test_recorder(self) -> None:
+        """Test actions are run-length encoded
+        """
+        recorder = ReplayRecorder(1)
+        for action in [None, None, Action.UP, Action.UP, Action.UP, None]:
+            recorder.record(action)
+        replay = recorder.replay
+        assert replay == Replay(1, [(0, 2), (Action.UP.value, 3), (0, 1)]), \
+            'wrong runs'
+        assert replay.frames == 6, 'wrong frames'
+
+    def test_encode_decode(self) -> None:
+        """Test binary format roundtrip
+        """
+        replay = Replay(2 ** 40, [(0, 1), (3, 127), (0, 128), (6, 100000)], 128)
+        data = encode(replay)
+        assert data[:4] == b'KKTR', 'wrong magic'
+        assert len(data) == 15 + 2 + 2 + 3 + 4, 'not compact'
+        assert decode(data) == replay, 'wrong decoded'
+
+    def test_decode_wrong_data(self) -> None:
+        """Test decode raise if not a replay
+        """
+        with pytest.raises(ValueError, match='Not a kektris replay!'):
+            decode(b'XXXX' + bytes(11))
+        with pytest.raises(ValueError, match='Unsupported replay version 1!'):
+            decode(b'KKTR' + bytes([1]) + bytes(10))
+
+    def test_decode_truncated_data(self) -> None:
+        """Test decode raise on truncated header, truncated run
+        and unknown action code
+        """
+        data = encode(Replay(1, [(3, 127), (0, 1000)]))
+        with pytest.raises(ValueError, match='Truncated kektris replay header!'):
+            decode(data[:14])
+        with pytest.raises(ValueError, match='Truncated kektris replay run'):
+            decode(data[:-1])
+        with pytest.raises(ValueError, match='Truncated kektris replay run'):
+            decode(data + bytes([1]))
+        with pytest.raises(ValueError, match='Unknown replay action code'):
+            decode(data + bytes([len(ACTIONS), 1]))
+
+    def test_save_load(self, tmp_path) -> None:
+        """Test replay file
+        """
+        replay = Replay(5, [(0, 10), (1, 2)])
+        path = str(tmp_path / 'game.replay')
+        save(replay, path)
+        assert load(path) == replay, 'wrong loaded'
+
+    def test_idle(self) -> None:
+        """Test idle is the same as steps without actions
+        """
+        engine, idle = Engine(seed=3), Engine(seed=3)
+        for _ in range(5000):
+            engine.step()
+        idle.idle(5000)
+        assert idle.score == engine.score, 'wrong score'
+        assert idle.frame_count_from_last_move == engine.frame_count_from_last_move, \
+            'wrong frames'
+        assert idle.figure.window.top_left == engine.figure.window.top_left, \
+            'wrong figure'
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_simulate(self, seed: int) -> None:
+        """Test replay reproduces the game
+        """
+        engine, replay = record_random_game(seed)
+        simulated = simulate(decode(encode(replay)))
+        assert simulated.grid.cells == const.CELLS, 'wrong board'
+        assert simulated.is_game_over, 'not ended'
+        assert simulated.score == engine.score, 'wrong score'
+        assert [c.pos for c in simulated.grid.get_frozen] \
+            == [c.pos for c in engine.grid.get_frozen], 'wrong board'
+
+    def test_simulate_board_size(self) -> None:
+        """Test replay reproduces the game on board of recorded cells
+        """
+        engine, replay = record_random_game(1, 20)
+        simulated = simulate(decode(encode(replay)))
+        assert simulated.grid.cells == 20, 'wrong board'
+        assert simulated.score == engine.score, 'wrong score'
+        assert [c.pos for c in simulated.grid.get_frozen] \
+            == [c.pos for c in engine.grid.get_frozen], 'wrong board'
+
+    def test_action_codes(self) -> None:
+        """Test action codes
+        """
+        assert ACTIONS[0] is None, 'wrong no action'
+        for action in Action:
+            assert ACTIONS[action.value] == action, 'wrong code'
@@ -0,0 +1,82 @@
+import pytest
+from runner import (
+    GameResult,
+    play_game,
+    run,
+    aggregate,
+    get_agent_factory,
+    random_agent,
+    main,
+        )
+
+
+class TestRunner:
+    """Test self-play runner
+    """
+
+    def test_play_game_is_reproducible(self) -> None:
+        """Test game with the same seed is the same
+        """
+        result = play_game(5, 'random')
+        assert isinstance(result, GameResult), 'wrong result'
+        assert result.game_over, 'not ended'
+        assert play_game(5, 'random') == result, 'not reproducible'
+        assert play_game(6, 'random') != result, 'not seeded'
+
+    def test_run_is_independent_of_workers(self) -> None:
+        """Test games results don't depend on process pool
+        """
+        single = run(6, seed=10, agent='random', workers=1)
+        pooled = run(6, seed=10, agent='random', workers=2)
+        assert single == pooled, 'different results'
+        assert [result.seed for result in pooled] == list(range(10, 16)), \
+            'wrong seeds'
+
+    def test_get_agent_factory(self) -> None:
+        """Test agent lookup
+        """
+        assert get_agent_factory('random') is random_agent, 'wrong agent'
+        assert get_agent_factory('runner:random_agent') is random_agent, \
+            'wrong import'
+        with pytest.raises(ValueError, match='Unknown agent'):
+            get_agent_factory('wrong')
+
+    def test_aggregate(self) -> None:
+        """Test statistics aggregation
+        """
+        results = [
+            GameResult(0, 60, 0, 6, 100, True),
+            GameResult(1, 180, 1, 6, 300, False),
+                ]
+        stats = aggregate(results)
+        assert stats['score'] == {'mean': 120, 'stdev': 60, 'min': 60, 'max': 180}, \
+            'wrong score'
+        assert stats['steps']['mean'] == 200, 'wrong steps'
+        assert stats['games'] == {'played': 2, 'ended': 1}, 'wrong games'
+        assert aggregate([]) == {'games': {'played': 0, 'ended': 0}}, \
+            'wrong empty stats'
+
+    @pytest.mark.parametrize('games', ['0', '-1'])
+    def test_main_without_games(self, games: str, capsys) -> None:
+        """Test command line rejects less than one game
+        """
+        with pytest.raises(SystemExit):
+            main(['--games', games])
+        assert 'not a positive int' in capsys.readouterr().err, 'wrong error'
+
+    def test_main(self, capsys) -> None:
+        """Test command line
+        """
+        stats = main(['--games', '2', '--workers', '1', '--max-steps', '50'])
+        assert stats['games'] == {'played': 2, 'ended': 0}, 'wrong games'
+        assert '"score"' in capsys.readouterr().out, 'not printed'
+
+    def test_large_board(self) -> None:
+        """Test games are played on board of given size
+        """
+        result = play_game(5, 'random', 2000, cells=128)
+        assert result.line_lenght == 22, 'wrong line lenght'
+        assert not result.game_over, 'ended'
+        assert run(2, 5, 'random', 1, 2000, 128)[0] == result, 'wrong run'
+        stats = main(['--games', '1', '--workers', '1', '--max-steps', '50', '--cells', '64'])
+        assert stats['line_lenght']['mean'] == 11, 'wrong cells'